@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI分析结果缓存
+把市场状态量化为离散特征（价格档位、RSI档位、MACD方向和幅度档位、交易模式），
+相同量化状态在有效期内直接复用上一次的DeepSeek分析结果，并持久化到SQLite
+"""
+
+import json
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+def quantize_features(price_data: Dict, trading_mode: str, price_step: float = 0.0025,
+                      rsi_step: float = 5.0) -> Tuple:
+    """把市场快照量化为缓存键
+
+    Args:
+        price_step: 价格档位的相对宽度（0.0025 即 0.25%，按对数等比分档）
+        rsi_step: RSI档位宽度
+    """
+    technical = price_data['technical_data']
+    price = float(price_data['price'])
+    price_bucket = int(math.floor(math.log(price) / math.log1p(price_step))) if price > 0 else 0
+
+    rsi = technical.get('rsi')
+    rsi_bucket = int(rsi // rsi_step) if rsi is not None and not math.isnan(rsi) else -1
+
+    macd = float(technical.get('macd') or 0.0)
+    macd_sign = (macd > 0) - (macd < 0)
+    # 幅度以相对价格的基点计，按2的幂分档
+    macd_bps = abs(macd) / price * 1e4 if price > 0 else 0.0
+    macd_bucket = int(math.floor(math.log2(1 + macd_bps)))
+
+    return price_bucket, rsi_bucket, macd_sign, macd_bucket, trading_mode
+
+
+class AnalysisCache:
+    """带TTL和容量上限的分析结果缓存（内存LRU + SQLite持久化）"""
+
+    def __init__(self, db_path: str = 'dashboard.db', ttl: float = 900, maxsize: int = 256):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'saved_seconds': 0.0}
+        self._init_table()
+        self._load()
+
+    def _init_table(self):
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    signal_data TEXT NOT NULL,
+                    latency REAL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ 分析缓存表初始化失败: {e}")
+
+    def _load(self):
+        """启动时载入未过期的缓存项"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('DELETE FROM analysis_cache WHERE created_at < ?', (time.time() - self.ttl,))
+            rows = conn.execute('''
+                SELECT cache_key, signal_data, latency, created_at FROM analysis_cache
+                ORDER BY last_used DESC LIMIT ?
+            ''', (self.maxsize,)).fetchall()
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ 分析缓存载入失败: {e}")
+            return
+
+        for key, signal_data, latency, created_at in reversed(rows):
+            self._entries[key] = {
+                'signal_data': json.loads(signal_data),
+                'latency': latency or 0.0,
+                'created_at': created_at,
+            }
+        if rows:
+            print(f"💾 已载入 {len(rows)} 条AI分析缓存")
+
+    @staticmethod
+    def make_key(features: Tuple) -> str:
+        return json.dumps(list(features), ensure_ascii=False)
+
+    def get(self, features: Tuple) -> Optional[Dict]:
+        """查找缓存，命中时返回 (分析结果副本, 当初调用耗时)"""
+        key = self.make_key(features)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry['created_at'] > self.ttl:
+                del self._entries[key]
+                self._delete(key)
+                entry = None
+
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            self.stats['saved_seconds'] += entry['latency']
+            self._touch(key, now)
+            return {'signal_data': dict(entry['signal_data']), 'latency': entry['latency']}
+
+    def put(self, features: Tuple, signal_data: Dict, latency: float = 0.0):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        key = self.make_key(features)
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {'signal_data': dict(signal_data), 'latency': latency, 'created_at': now}
+            self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.maxsize:
+                evicted.append(self._entries.popitem(last=False)[0])
+
+            try:
+                conn = sqlite3.connect(self.db_path)
+                conn.execute('''
+                    INSERT OR REPLACE INTO analysis_cache (cache_key, signal_data, latency, created_at, last_used)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (key, json.dumps(signal_data, ensure_ascii=False), latency, now, now))
+                conn.executemany('DELETE FROM analysis_cache WHERE cache_key = ?', [(k,) for k in evicted])
+                conn.commit()
+                conn.close()
+            except Exception as e:
+                print(f"⚠️ 分析缓存写入失败: {e}")
+
+    def _touch(self, key: str, now: float):
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('UPDATE analysis_cache SET last_used = ? WHERE cache_key = ?', (now, key))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ 分析缓存更新失败: {e}")
+
+    def _delete(self, key: str):
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('DELETE FROM analysis_cache WHERE cache_key = ?', (key,))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ 分析缓存删除失败: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._delete_all()
+
+    def _delete_all(self):
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('DELETE FROM analysis_cache')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ 分析缓存清空失败: {e}")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            total = self.stats['hits'] + self.stats['misses']
+            return dict(self.stats, size=len(self._entries),
+                        hit_rate=self.stats['hits'] / total if total else 0.0)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+技术指标性能基准
+对比原 pandas 实现与 indicators.py 的 NumPy 实现的耗时和数值一致性
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+COLUMNS = ['sma_5', 'sma_20', 'sma_50', 'rsi', 'macd', 'macd_signal', 'bb_upper', 'bb_lower', 'atr', 'vwap']
+
+
+def generate_candles(count: int, seed: int = 42) -> pd.DataFrame:
+    """生成随机游走K线"""
+    rng = np.random.default_rng(seed)
+    close = 60000 * np.exp(np.cumsum(rng.normal(0, 0.002, count)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.001, count)) * close
+    return pd.DataFrame({
+        'timestamp': np.arange(count, dtype=np.int64) * 900000,
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(1, 100, count),
+    })
+
+
+def pandas_reference(df: pd.DataFrame) -> pd.DataFrame:
+    """原 calculate_technical_indicators 的 pandas 实现（外加ATR和VWAP）"""
+    df['sma_5'] = df['close'].rolling(window=5, min_periods=1).mean()
+    df['sma_20'] = df['close'].rolling(window=20, min_periods=1).mean()
+    df['sma_50'] = df['close'].rolling(window=50, min_periods=1).mean()
+
+    delta = df['close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    rs = gain / loss
+    df['rsi'] = 100 - (100 / (1 + rs))
+
+    df['ema_12'] = df['close'].ewm(span=12).mean()
+    df['ema_26'] = df['close'].ewm(span=26).mean()
+    df['macd'] = df['ema_12'] - df['ema_26']
+    df['macd_signal'] = df['macd'].ewm(span=9).mean()
+
+    df['bb_middle'] = df['close'].rolling(20).mean()
+    bb_std = df['close'].rolling(20).std()
+    df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
+    df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
+
+    previous_close = df['close'].shift()
+    true_range = pd.concat([df['high'] - df['low'],
+                            (df['high'] - previous_close).abs(),
+                            (df['low'] - previous_close).abs()], axis=1).max(axis=1)
+    df['atr'] = true_range.ewm(alpha=1 / 14, adjust=False).mean()
+
+    typical = (df['high'] + df['low'] + df['close']) / 3
+    df['vwap'] = (typical * df['volume']).cumsum() / df['volume'].cumsum()
+
+    return df.bfill().ffill()
+
+
+def time_call(func, repeat: int) -> float:
+    """多次运行取最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(size: int, repeat: int):
+    candles = generate_candles(size)
+
+    # 与交易机器人一致：pandas 路径包含构建DataFrame和时间戳转换
+    raw = candles.values.tolist()
+
+    def pandas_path():
+        df = pd.DataFrame(raw, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return pandas_reference(df)
+
+    close = candles['close'].to_numpy()
+    high = candles['high'].to_numpy()
+    low = candles['low'].to_numpy()
+    volume = candles['volume'].to_numpy()
+
+    def numpy_path():
+        return indicators.compute_indicators(close, high, low, volume)
+
+    pandas_time = time_call(pandas_path, repeat)
+    numpy_time = time_call(numpy_path, repeat)
+
+    expected = pandas_path()
+    actual = pd.DataFrame(numpy_path()).bfill().ffill()
+    max_rel_error = 0.0
+    for column in COLUMNS:
+        reference = expected[column].to_numpy()
+        diff = np.abs(actual[column].to_numpy() - reference)
+        scale = np.maximum(np.abs(reference), 1.0)
+        column_error = np.nanmax(diff / scale) if len(diff) else 0.0
+        max_rel_error = max(max_rel_error, float(column_error))
+
+    print(f"{size:>9,} | pandas: {pandas_time * 1000:9.2f} ms | numpy: {numpy_time * 1000:9.2f} ms | "
+          f"加速: {pandas_time / numpy_time:6.1f}x | 最大相对误差: {max_rel_error:.2e}")
+    return max_rel_error
+
+
+def run_batch_benchmark(symbols: int, size: int, repeat: int):
+    """多个交易对：逐个计算 vs 一次二维批量计算"""
+    ohlcv_by_symbol = {f"SYM{index}": generate_candles(size, seed=index).values.tolist()
+                       for index in range(symbols)}
+    matrix = indicators.stack_ohlcv(ohlcv_by_symbol)
+
+    def loop_path():
+        return [indicators.compute_indicators(matrix['close'][row], matrix['high'][row],
+                                              matrix['low'][row], matrix['volume'][row])
+                for row in range(symbols)]
+
+    def batch_path():
+        return indicators.compute_indicators_batch(matrix['close'], matrix['high'], matrix['low'],
+                                                   matrix['volume'], matrix['symbols'])
+
+    loop_time = time_call(loop_path, repeat)
+    batch_time = time_call(batch_path, repeat)
+
+    batch = indicators.technical_data_batch(batch_path())
+    max_rel_error = 0.0
+    for row, columns in enumerate(loop_path()):
+        expected = {key: indicators.last_valid(columns[key]) for key in indicators.TECHNICAL_DATA_KEYS}
+        for key, value in batch[matrix['symbols'][row]].items():
+            max_rel_error = max(max_rel_error, abs(value - expected[key]) / max(abs(expected[key]), 1.0))
+
+    print(f"{symbols:>4} x {size:<6,} | 逐个: {loop_time * 1000:9.2f} ms | 批量: {batch_time * 1000:9.2f} ms | "
+          f"加速: {loop_time / batch_time:6.1f}x | 最大相对误差: {max_rel_error:.2e}")
+    return max_rel_error
+
+
+def main():
+    parser = argparse.ArgumentParser(description='技术指标性能基准')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[96, 10_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=1e-8)
+    parser.add_argument('--symbols', type=int, default=50, help='批量计算的交易对数量，0表示跳过')
+    args = parser.parse_args()
+
+    print("📊 技术指标基准: pandas vs NumPy")
+    print("=" * 100)
+    worst = 0.0
+    for size in args.sizes:
+        worst = max(worst, run_benchmark(size, args.repeat if size < 1_000_000 else 1))
+    if args.symbols:
+        print("-" * 100)
+        worst = max(worst, run_batch_benchmark(args.symbols, 96, args.repeat))
+    print("=" * 100)
+
+    if worst <= args.tolerance:
+        print(f"✅ 数值一致 (最大相对误差 {worst:.2e} <= {args.tolerance:.0e})")
+    else:
+        print(f"❌ 数值不一致 (最大相对误差 {worst:.2e} > {args.tolerance:.0e})")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
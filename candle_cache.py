@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+增量K线缓存
+按 (数据源, 交易对, 周期) 缓存K线，每轮只向交易所请求上次之后的新K线
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class CandleRingBuffer:
+    """固定容量的K线环形缓冲区"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self):
+        """清空缓冲区"""
+        self._slots = [None] * self.capacity
+        self._start = 0
+        self._size = 0
+
+    def append(self, candle: List[float]):
+        """追加一根K线，缓冲区满时覆盖最旧的一根"""
+        index = (self._start + self._size) % self.capacity
+        self._slots[index] = candle
+        if self._size < self.capacity:
+            self._size += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+
+    def replace_last(self, candle: List[float]):
+        """原位替换最后一根K线（尚未收盘的K线）"""
+        if self._size == 0:
+            self.append(candle)
+            return
+        self._slots[(self._start + self._size - 1) % self.capacity] = candle
+
+    def last(self) -> Optional[List[float]]:
+        """最后一根K线"""
+        if self._size == 0:
+            return None
+        return self._slots[(self._start + self._size - 1) % self.capacity]
+
+    def to_list(self) -> List[List[float]]:
+        """按时间顺序返回全部K线"""
+        return [self._slots[(self._start + i) % self.capacity] for i in range(self._size)]
+
+
+class OHLCVCache:
+    """增量K线缓存
+
+    首次请求时全量获取；之后只从缓冲区中最后一根K线（上次请求时
+    尚未收盘）的时间戳开始请求，用返回结果原位替换该K线并追加新K线。
+    检测到缺口（停机过久、返回数据不连续）时回退为全量获取。
+    """
+
+    def __init__(self, capacity: int = 96):
+        self.capacity = capacity
+        self.buffers: Dict[Tuple[str, str, str], CandleRingBuffer] = {}
+        self.stats = {'full_fetches': 0, 'incremental_fetches': 0, 'candles_fetched': 0}
+
+    def get_buffer(self, source_name: str, symbol: str, timeframe: str) -> CandleRingBuffer:
+        """获取（或创建）指定键的环形缓冲区"""
+        key = (source_name, symbol, timeframe)
+        if key not in self.buffers:
+            self.buffers[key] = CandleRingBuffer(self.capacity)
+        return self.buffers[key]
+
+    def invalidate(self, source_name: str = None):
+        """清空缓存，指定数据源时只清空该数据源"""
+        for key in list(self.buffers):
+            if source_name is None or key[0] == source_name:
+                del self.buffers[key]
+
+    def fetch_ohlcv(self, exchange, source_name: str, symbol: str, timeframe: str,
+                    limit: int = 96) -> List[List[float]]:
+        """获取最近 limit 根K线，尽量只请求增量部分"""
+        buffer = self.get_buffer(source_name, symbol, timeframe)
+        last_candle = buffer.last()
+
+        if last_candle is not None and len(buffer) >= limit:
+            timeframe_ms = exchange.parse_timeframe(timeframe) * 1000
+            since = int(last_candle[0])
+            now_ms = int(time.time() * 1000)
+            # 额外多请求1根，容纳交易所时钟略快时提前出现的新K线
+            expected = max(int((now_ms - since) // timeframe_ms), 0) + 2
+
+            if expected <= limit:
+                ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=expected)
+                if self._merge(buffer, ohlcv, since, timeframe_ms, now_ms):
+                    self.stats['incremental_fetches'] += 1
+                    self.stats['candles_fetched'] += len(ohlcv)
+                    return buffer.to_list()[-limit:]
+
+            print(f"⚠️ {source_name} {symbol} {timeframe} K线缓存出现缺口，全量获取")
+
+        ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+        buffer.clear()
+        for candle in ohlcv:
+            buffer.append(candle)
+        self.stats['full_fetches'] += 1
+        self.stats['candles_fetched'] += len(ohlcv)
+        return buffer.to_list()[-limit:]
+
+    @staticmethod
+    def _merge(buffer: CandleRingBuffer, ohlcv: List[List[float]], since: int,
+               timeframe_ms: int, now_ms: int) -> bool:
+        """把增量K线合并进缓冲区，数据不连续时返回False
+
+        连续性按时间戳判断：首根必须是 since，之后逐根相差一个周期，
+        最后一根须落在本地时钟所在K线的前后一根之内（容忍交易所时钟
+        在K线边界处略快或略慢），否则视为返回被截断或数据异常。
+        """
+        if not ohlcv or ohlcv[0][0] != since:
+            return False
+
+        previous_timestamp = since - timeframe_ms
+        for candle in ohlcv:
+            if candle[0] != previous_timestamp + timeframe_ms:
+                return False
+            previous_timestamp = candle[0]
+
+        current_bar = now_ms - now_ms % timeframe_ms
+        if not current_bar - timeframe_ms <= previous_timestamp <= current_bar + timeframe_ms:
+            return False
+
+        buffer.replace_last(ohlcv[0])
+        for candle in ohlcv[1:]:
+            buffer.append(candle)
+        return True
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地列式K线存储
+每个交易所/交易对/周期一个目录，每列一个定长、只追加的二进制文件，
+读取时通过内存映射得到零拷贝的NumPy视图
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# 列名 -> 数据类型；timestamp 为毫秒时间戳
+COLUMNS = {
+    'timestamp': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.float64,
+}
+
+
+class CandleStore:
+    """内存映射的列式K线存储
+
+    - 写入：时间戳大于最后一条记录的K线追加到各列文件末尾；
+      时间戳等于最后一条记录的K线（未收盘K线更新）原位覆盖最后一行
+    - 读取：np.memmap 只读映射，按时间戳二分查找（O(log n)）返回切片视图
+    - 不同交易所的K线各自成序列，数据源切换或对冲时不会交错写入同一序列
+    """
+
+    def __init__(self, root: str = 'candle_store'):
+        self.root = root
+        self._lock = threading.Lock()
+        self._maps: Dict[str, Dict] = {}
+
+    def _series_dir(self, exchange_id: str, symbol: str, timeframe: str) -> str:
+        safe_symbol = re.sub(r'[^A-Za-z0-9]+', '_', symbol).strip('_')
+        return os.path.join(self.root, exchange_id, safe_symbol, timeframe)
+
+    def _column_path(self, series_dir: str, column: str) -> str:
+        return os.path.join(series_dir, f"{column}.bin")
+
+    def _length(self, series_dir: str) -> int:
+        """记录条数；各列长度不一致（写入中断）时以最短列为准"""
+        lengths = []
+        for column, dtype in COLUMNS.items():
+            path = self._column_path(series_dir, column)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            lengths.append(size // np.dtype(dtype).itemsize)
+        return min(lengths)
+
+    def _repair(self, series_dir: str, length: int):
+        """截断写入中断留下的多余字节，保证各列等长"""
+        for column, dtype in COLUMNS.items():
+            path = self._column_path(series_dir, column)
+            expected = length * np.dtype(dtype).itemsize
+            if os.path.exists(path) and os.path.getsize(path) != expected:
+                with open(path, 'r+b') as f:
+                    f.truncate(expected)
+
+    def _get_maps(self, exchange_id: str, symbol: str, timeframe: str) -> Optional[Dict[str, np.ndarray]]:
+        """获取各列的只读内存映射，文件长度变化时重新映射"""
+        series_dir = self._series_dir(exchange_id, symbol, timeframe)
+        length = self._length(series_dir) if os.path.isdir(series_dir) else 0
+        if length == 0:
+            return None
+
+        cached = self._maps.get(series_dir)
+        if cached and cached['length'] == length:
+            return cached['columns']
+
+        columns = {
+            column: np.memmap(self._column_path(series_dir, column), dtype=dtype, mode='r', shape=(length,))
+            for column, dtype in COLUMNS.items()
+        }
+        self._maps[series_dir] = {'length': length, 'columns': columns}
+        return columns
+
+    def last_timestamp(self, exchange_id: str, symbol: str, timeframe: str) -> Optional[int]:
+        """最后一条记录的时间戳"""
+        maps = self._get_maps(exchange_id, symbol, timeframe)
+        if maps is None:
+            return None
+        return int(maps['timestamp'][-1])
+
+    def exchanges(self, symbol: str, timeframe: str) -> List[str]:
+        """存有该交易对/周期K线的交易所，按最后一条记录的时间从新到旧排列"""
+        if not os.path.isdir(self.root):
+            return []
+        latest = {}
+        for exchange_id in os.listdir(self.root):
+            last_ts = self.last_timestamp(exchange_id, symbol, timeframe)
+            if last_ts is not None:
+                latest[exchange_id] = last_ts
+        return sorted(latest, key=latest.get, reverse=True)
+
+    def append(self, exchange_id: str, symbol: str, timeframe: str, ohlcv: List[List[float]]) -> int:
+        """写入K线，返回新增记录数"""
+        if not ohlcv:
+            return 0
+
+        with self._lock:
+            series_dir = self._series_dir(exchange_id, symbol, timeframe)
+            os.makedirs(series_dir, exist_ok=True)
+            length = self._length(series_dir)
+            self._repair(series_dir, length)
+
+            last_ts = self.last_timestamp(exchange_id, symbol, timeframe) if length else None
+            rows = []
+            for candle in ohlcv:
+                ts = int(candle[0])
+                if last_ts is not None and ts < last_ts:
+                    continue
+                if last_ts is not None and ts == last_ts:
+                    if not rows:
+                        self._overwrite_last(series_dir, length, candle)
+                    continue
+                rows.append(candle)
+                last_ts = ts
+
+            if rows:
+                data = np.asarray([row[:6] for row in rows], dtype=np.float64)
+                for index, (column, dtype) in enumerate(COLUMNS.items()):
+                    with open(self._column_path(series_dir, column), 'ab') as f:
+                        f.write(data[:, index].astype(dtype).tobytes())
+
+            return len(rows)
+
+    def _overwrite_last(self, series_dir: str, length: int, candle: List[float]):
+        """原位覆盖最后一行（定长记录，无需移动数据）"""
+        for index, (column, dtype) in enumerate(COLUMNS.items()):
+            itemsize = np.dtype(dtype).itemsize
+            with open(self._column_path(series_dir, column), 'r+b') as f:
+                f.seek((length - 1) * itemsize)
+                f.write(np.asarray([candle[index]]).astype(dtype).tobytes())
+
+    @staticmethod
+    def _empty() -> Dict[str, np.ndarray]:
+        return {column: np.empty(0, dtype=dtype) for column, dtype in COLUMNS.items()}
+
+    def get_range(self, exchange_id: str, symbol: str, timeframe: str, start_ms: int = None,
+                  end_ms: int = None) -> Dict[str, np.ndarray]:
+        """按时间戳区间 [start_ms, end_ms] 读取，返回各列的零拷贝视图"""
+        maps = self._get_maps(exchange_id, symbol, timeframe)
+        if maps is None:
+            return self._empty()
+
+        timestamps = maps['timestamp']
+        start = 0 if start_ms is None else int(np.searchsorted(timestamps, start_ms, side='left'))
+        end = len(timestamps) if end_ms is None else int(np.searchsorted(timestamps, end_ms, side='right'))
+        return {column: values[start:end] for column, values in maps.items()}
+
+    def tail(self, exchange_id: str, symbol: str, timeframe: str, count: int) -> Dict[str, np.ndarray]:
+        """读取最近 count 条记录（零拷贝视图），count <= 0 时返回空结果"""
+        maps = self._get_maps(exchange_id, symbol, timeframe)
+        if maps is None or count <= 0:
+            return self._empty()
+        return {column: values[-count:] for column, values in maps.items()}
+
+    @staticmethod
+    def contiguous_tail(columns: Dict[str, np.ndarray], period_ms: int) -> Dict[str, np.ndarray]:
+        """只保留最后一段连续的K线（相邻时间戳间隔恰好为一个周期）
+
+        存储只追加，停机期间缺失的K线会在序列中留下缺口；用带缺口的历史
+        预热指标会得到错误的均线和RSI，因此只取缺口之后的部分。
+        """
+        timestamps = columns['timestamp']
+        if len(timestamps) < 2:
+            return columns
+        gaps = np.flatnonzero(np.diff(timestamps) != period_ms)
+        if not len(gaps):
+            return columns
+        start = int(gaps[-1]) + 1
+        return {column: values[start:] for column, values in columns.items()}
+
+    @staticmethod
+    def to_ohlcv(columns: Dict[str, np.ndarray]) -> List[List[float]]:
+        """把列视图转换为ccxt格式的K线列表"""
+        return [
+            [int(ts), float(o), float(h), float(l), float(c), float(v)]
+            for ts, o, h, l, c, v in zip(columns['timestamp'], columns['open'], columns['high'],
+                                         columns['low'], columns['close'], columns['volume'])
+        ]
+
+    def backfill(self, exchange, symbol: str, timeframe: str, since_ms: int,
+                 until_ms: int = None, batch_size: int = 1000) -> int:
+        """从交易所分页批量回填历史K线，返回新增记录数"""
+        timeframe_ms = exchange.parse_timeframe(timeframe) * 1000
+        until_ms = until_ms or int(time.time() * 1000)
+        last_ts = self.last_timestamp(exchange.id, symbol, timeframe)
+        since = max(since_ms, last_ts) if last_ts is not None else since_ms
+        total = 0
+
+        while since <= until_ms:
+            ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=batch_size)
+            ohlcv = [candle for candle in ohlcv if candle[0] <= until_ms]
+            if not ohlcv:
+                break
+            total += self.append(exchange.id, symbol, timeframe, ohlcv)
+            next_since = int(ohlcv[-1][0]) + timeframe_ms
+            if next_since <= since:
+                break
+            since = next_since
+            print(f"📥 {exchange.id} {symbol} {timeframe} 已回填至 "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.gmtime(ohlcv[-1][0] / 1000))} (新增 {total} 条)")
+
+        return total
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from exchange_pool import exchange_pool
+
+    parser = argparse.ArgumentParser(description='K线存储批量回填')
+    parser.add_argument('--exchange', default='binance')
+    parser.add_argument('--symbol', default='BTC/USDT')
+    parser.add_argument('--timeframe', default='15m')
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--root', default=os.getenv('CANDLE_STORE_PATH', 'candle_store'))
+    args = parser.parse_args()
+
+    store = CandleStore(args.root)
+    exchange = exchange_pool.get(args.exchange, {'enableRateLimit': True, 'options': {'defaultType': 'swap'}})
+    since = int((time.time() - args.days * 86400) * 1000)
+    added = store.backfill(exchange, args.symbol, args.timeframe, since)
+    print(f"✅ 回填完成，新增 {added} 条K线")
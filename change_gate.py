@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI分析变化检测闸门
+与上一次实际分析时的市场特征比较，价格、RSI、MACD都没有实质变化时
+跳过DeepSeek调用，复用上一次的分析信号
+"""
+
+import math
+from typing import Dict, Optional, Tuple
+
+NUMERIC_FEATURES = ('price', 'rsi', 'macd', 'macd_signal')
+
+
+class ChangeDetectionGate:
+    """判断本轮是否需要重新调用AI分析
+
+    任一条件满足即重新分析：
+    - 尚无分析记录，或交易模式变化
+    - 本轮或上次分析的特征含 NaN/inf（无法比较，按已变化处理）
+    - 价格相对上次分析变化超过 price_change_pct（百分比）
+    - RSI变化超过 rsi_delta
+    - MACD与信号线发生交叉
+    - 已连续跳过 max_skips 轮（避免长期使用过时信号）
+    """
+
+    def __init__(self, price_change_pct: float = 0.3, rsi_delta: float = 3.0, max_skips: int = 3):
+        self.price_change_pct = price_change_pct
+        self.rsi_delta = rsi_delta
+        self.max_skips = max_skips
+        self.last_features: Optional[Dict] = None
+        self.skipped = 0
+
+    @staticmethod
+    def extract(price_data: Dict, trading_mode: str) -> Dict:
+        technical = price_data['technical_data']
+        return {
+            'price': float(price_data['price']),
+            'rsi': float(technical['rsi']),
+            'macd': float(technical['macd']),
+            'macd_signal': float(technical['macd_signal']),
+            'mode': trading_mode,
+        }
+
+    def evaluate(self, price_data: Dict, trading_mode: str) -> Tuple[bool, str]:
+        """返回 (是否需要分析, 原因)"""
+        last = self.last_features
+        if last is None:
+            return True, "首次分析"
+
+        current = self.extract(price_data, trading_mode)
+        if current['mode'] != last['mode']:
+            return True, f"交易模式变化: {last['mode']} -> {current['mode']}"
+        if self.skipped >= self.max_skips:
+            return True, f"已连续跳过 {self.skipped} 轮，强制分析"
+
+        invalid = [name for name in NUMERIC_FEATURES
+                   if not (math.isfinite(current[name]) and math.isfinite(last[name]))]
+        if invalid:
+            return True, f"特征值无效（{', '.join(invalid)}），无法比较"
+
+        price_change = (current['price'] - last['price']) / last['price'] * 100 if last['price'] else 0.0
+        if abs(price_change) >= self.price_change_pct:
+            return True, f"价格变化 {price_change:+.2f}% 超过阈值 {self.price_change_pct}%"
+
+        rsi_change = current['rsi'] - last['rsi']
+        if abs(rsi_change) >= self.rsi_delta:
+            return True, f"RSI变化 {rsi_change:+.1f} 超过阈值 {self.rsi_delta}"
+
+        last_side = last['macd'] > last['macd_signal']
+        current_side = current['macd'] > current['macd_signal']
+        if last_side != current_side:
+            return True, f"MACD{'金叉' if current_side else '死叉'}"
+
+        return False, (f"市场无实质变化: 价格 {price_change:+.2f}%，RSI {rsi_change:+.1f}，"
+                       f"MACD未交叉")
+
+    def mark_analyzed(self, price_data: Dict, trading_mode: str):
+        """记录本轮实际分析时的特征"""
+        self.last_features = self.extract(price_data, trading_mode)
+        self.skipped = 0
+
+    def mark_skipped(self):
+        self.skipped += 1
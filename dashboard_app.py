@@ -16,6 +16,7 @@ sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 import eventlet
 eventlet.monkey_patch()
 
+import os
 import sqlite3
 import json
 from datetime import datetime, timedelta
@@ -25,6 +26,9 @@ from flask import Flask, render_template, jsonify, request
 from flask_socketio import SocketIO, emit, join_room, leave_room
 import plotly.graph_objs as go
 import plotly.utils
+import numpy as np
+from candle_store import CandleStore
+from indicator_registry import IndicatorMemo, indicator_registry
 
 app = Flask(__name__)
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
@@ -98,10 +102,27 @@ class DashboardManager:
     def get_latest_position(self) -> Optional[Dict]:
         """获取最新持仓 - 使用database_manager"""
         return self.db_manager.get_current_position()
+    
+    def get_llm_stats(self, days: int = 7) -> List[Dict]:
+        """获取LLM调用的每日延迟分位数和费用 - 使用database_manager"""
+        return self.db_manager.get_llm_call_stats(days, LLM_PRICING)
+
+# LLM单价（美元/百万token），默认为DeepSeek deepseek-chat 的官方价格
+LLM_PRICING = {
+    'cache_hit': float(os.getenv('LLM_PRICE_CACHE_HIT', '0.028')),
+    'cache_miss': float(os.getenv('LLM_PRICE_CACHE_MISS', '0.28')),
+    'output': float(os.getenv('LLM_PRICE_OUTPUT', '0.42')),
+}
 
 # 初始化Dashboard管理器
 dashboard = DashboardManager()
 
+# 本地K线存储（与交易机器人共用同一目录）
+candle_store = CandleStore(os.getenv('CANDLE_STORE_PATH', 'candle_store'))
+
+# 图表轮询反复读取同一K线区间，按窗口内容记忆已算过的指标
+indicator_memo = IndicatorMemo(indicator_registry)
+
 @app.route('/')
 def index():
     """主页"""
@@ -144,6 +165,13 @@ def api_current_position():
     data = dashboard.get_latest_position()
     return jsonify(data)
 
+@app.route('/api/llm_stats')
+def api_llm_stats():
+    """获取LLM调用统计API：每日p50/p95/p99延迟、首token耗时、token用量、解析失败和费用"""
+    days = request.args.get('days', 7, type=int)
+    data = dashboard.get_llm_stats(days)
+    return jsonify(data)
+
 @app.route('/api/equity_chart')
 def api_equity_chart():
     """获取净值图表数据"""
@@ -163,6 +191,48 @@ def api_equity_chart():
         'pnl': pnl
     })
 
+@app.route('/api/candles')
+def api_candles():
+    """获取本地K线存储中的K线数据
+
+    indicators 参数（逗号分隔，如 rsi,macd）指定需要叠加的技术指标，
+    只计算所请求的指标；exchange 参数指定读取哪个交易所的K线序列
+    """
+    symbol = request.args.get('symbol', 'BTC/USDT')
+    timeframe = request.args.get('timeframe', '15m')
+    hours = request.args.get('hours', 24, type=int)
+    features = [name for name in request.args.get('indicators', '').split(',') if name]
+    
+    # 未指定交易所时使用最近写入过该序列的交易所
+    exchange_id = request.args.get('exchange')
+    if not exchange_id:
+        exchanges = candle_store.exchanges(symbol, timeframe)
+        exchange_id = exchanges[0] if exchanges else 'binance'
+    
+    start_ms = int((datetime.now() - timedelta(hours=hours)).timestamp() * 1000)
+    data = candle_store.get_range(exchange_id, symbol, timeframe, start_ms)
+    
+    indicator_values = {}
+    if features and len(data['close']):
+        try:
+            values = indicator_memo.compute(symbol, timeframe, features, data['timestamp'], data['close'],
+                                            data['high'], data['low'], data['volume'])
+            indicator_values = {name: [None if np.isnan(value) else float(value) for value in series]
+                                for name, series in values.items()}
+        except (KeyError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'timestamps': [datetime.fromtimestamp(ts / 1000).isoformat() for ts in data['timestamp'].tolist()],
+        'open': data['open'].tolist(),
+        'high': data['high'].tolist(),
+        'low': data['low'].tolist(),
+        'close': data['close'].tolist(),
+        'volume': data['volume'].tolist(),
+        'exchange': exchange_id,
+        'indicators': indicator_values
+    })
+
 @app.route('/api/webhook', methods=['POST'])
 def api_webhook():
     """接收WebSocket推送的webhook端点"""
@@ -15,6 +15,7 @@ import os
 import threading
 import time
 import requests
+import numpy as np
 
 class DatabaseManager:
     """数据库管理器 - 增强版：集成WebSocket推送"""
@@ -126,6 +127,39 @@ class DatabaseManager:
                 )
             ''')
             
+            # 创建LLM调用记录表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS llm_calls (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    purpose TEXT,
+                    latency REAL,
+                    prompt_tokens INTEGER DEFAULT 0,
+                    completion_tokens INTEGER DEFAULT 0,
+                    cached_tokens INTEGER DEFAULT 0,
+                    ttft REAL,
+                    parse_success INTEGER DEFAULT 1,
+                    status TEXT DEFAULT 'OK',
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # 旧数据库升级：AI分析表增加分析决策字段
+            cursor.execute("PRAGMA table_info(ai_analysis)")
+            existing_columns = {row[1] for row in cursor.fetchall()}
+            for column, definition in (('decision', "TEXT DEFAULT 'ANALYZED'"), ('decision_reason', 'TEXT')):
+                if column not in existing_columns:
+                    cursor.execute(f"ALTER TABLE ai_analysis ADD COLUMN {column} {definition}")
+            
+            # 旧数据库升级：LLM调用表增加首token耗时、解析结果和调用状态
+            cursor.execute("PRAGMA table_info(llm_calls)")
+            existing_columns = {row[1] for row in cursor.fetchall()}
+            for column, definition in (('ttft', 'REAL'), ('parse_success', 'INTEGER DEFAULT 1'),
+                                       ('status', "TEXT DEFAULT 'OK'")):
+                if column not in existing_columns:
+                    cursor.execute(f"ALTER TABLE llm_calls ADD COLUMN {column} {definition}")
+            
             conn.commit()
             conn.close()
             print("✅ 数据库初始化成功")
@@ -168,8 +202,9 @@ class DatabaseManager:
             
             cursor.execute('''
                 INSERT INTO ai_analysis 
-                (timestamp, signal, confidence, reason, technical_data, sentiment_data, stop_loss, take_profit)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                (timestamp, signal, confidence, reason, technical_data, sentiment_data, stop_loss, take_profit,
+                 decision, decision_reason)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 analysis_data.get('timestamp', datetime.now().isoformat()),
                 analysis_data.get('signal', 'HOLD'),
@@ -178,7 +213,9 @@ class DatabaseManager:
                 json.dumps(analysis_data.get('technical_data', {})),
                 json.dumps(analysis_data.get('sentiment_data', {})),
                 analysis_data.get('stop_loss', 0),
-                analysis_data.get('take_profit', 0)
+                analysis_data.get('take_profit', 0),
+                analysis_data.get('decision', 'ANALYZED'),
+                analysis_data.get('decision_reason', '')
             ))
             
             conn.commit()
@@ -337,6 +374,102 @@ class DatabaseManager:
             print(f"❌ 保存系统健康数据失败: {e}")
             raise
     
+    def save_llm_call(self, call_data: Dict):
+        """保存单次LLM调用的遥测数据
+
+        status: OK（截止时间内返回）、LATE（超过截止时间后返回）、ERROR（请求失败）；
+        parse_success 表示回复能否解析出有效信号
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO llm_calls 
+                (timestamp, model, purpose, latency, prompt_tokens, completion_tokens, cached_tokens,
+                 ttft, parse_success, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                call_data.get('timestamp', datetime.now().isoformat()),
+                call_data.get('model', ''),
+                call_data.get('purpose', ''),
+                call_data.get('latency', 0),
+                call_data.get('prompt_tokens', 0),
+                call_data.get('completion_tokens', 0),
+                call_data.get('cached_tokens', 0),
+                call_data.get('ttft'),
+                1 if call_data.get('parse_success', True) else 0,
+                call_data.get('status', 'OK')
+            ))
+            
+            conn.commit()
+            conn.close()
+            
+        except Exception as e:
+            print(f"❌ 保存LLM调用记录失败: {e}")
+            raise
+    
+    def get_llm_call_stats(self, days: int = 7, pricing: Optional[Dict] = None) -> List[Dict]:
+        """按天汇总LLM调用：延迟分位数、首token耗时、token用量、失败率和费用
+
+        timestamp 以本地时间写入，统计窗口同样按本地日期计算。
+
+        Args:
+            pricing: 每百万token单价 {'cache_hit', 'cache_miss', 'output'}，不传则不计算费用
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT date(timestamp), latency, ttft, prompt_tokens, completion_tokens, cached_tokens,
+                       parse_success, status
+                FROM llm_calls 
+                WHERE timestamp >= date('now', 'localtime', '-{} days')
+                ORDER BY timestamp ASC
+            '''.format(int(days)))
+            rows = cursor.fetchall()
+            conn.close()
+        except Exception as e:
+            print(f"❌ 获取LLM调用统计失败: {e}")
+            return []
+        
+        by_day: Dict[str, List] = {}
+        for row in rows:
+            by_day.setdefault(row[0], []).append(row[1:])
+        
+        stats = []
+        for day, calls in sorted(by_day.items()):
+            latencies = np.array([call[0] for call in calls if call[0] is not None], dtype=float)
+            ttfts = np.array([call[1] for call in calls if call[1] is not None], dtype=float)
+            prompt_tokens = sum(call[2] or 0 for call in calls)
+            completion_tokens = sum(call[3] or 0 for call in calls)
+            cached_tokens = sum(call[4] or 0 for call in calls)
+            answered = [call for call in calls if call[6] != 'ERROR']
+            
+            day_stats = {
+                'date': day,
+                'calls': len(calls),
+                'errors': sum(1 for call in calls if call[6] == 'ERROR'),
+                'late': sum(1 for call in calls if call[6] == 'LATE'),
+                'parse_failures': sum(1 for call in answered if not call[5]),
+                'latency_p50': float(np.percentile(latencies, 50)) if latencies.size else None,
+                'latency_p95': float(np.percentile(latencies, 95)) if latencies.size else None,
+                'latency_p99': float(np.percentile(latencies, 99)) if latencies.size else None,
+                'ttft_p50': float(np.percentile(ttfts, 50)) if ttfts.size else None,
+                'ttft_p95': float(np.percentile(ttfts, 95)) if ttfts.size else None,
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'cached_tokens': cached_tokens,
+                'cache_hit_rate': cached_tokens / prompt_tokens if prompt_tokens else 0.0,
+            }
+            if pricing:
+                day_stats['cost'] = (cached_tokens * pricing['cache_hit']
+                                     + (prompt_tokens - cached_tokens) * pricing['cache_miss']
+                                     + completion_tokens * pricing['output']) / 1e6
+            stats.append(day_stats)
+        return stats
+    
     def get_recent_analysis(self, limit: int = 10) -> List[Dict]:
         """获取最近的AI分析结果"""
         try:
@@ -477,6 +610,10 @@ class DatabaseManager:
                 DELETE FROM system_health WHERE created_at < datetime('now', '-{} days')
             '''.format(days))
             
+            cursor.execute('''
+                DELETE FROM llm_calls WHERE created_at < datetime('now', '-{} days')
+            '''.format(days))
+            
             conn.commit()
             conn.close()
             print(f"✅ 已清理 {days} 天前的旧数据")
@@ -500,6 +637,10 @@ def save_equity_history(equity_data: Dict):
     """保存净值历史 - 兼容性函数"""
     db_manager.save_equity_history(equity_data)
 
+def save_llm_call(call_data: Dict):
+    """保存LLM调用记录 - 兼容性函数"""
+    db_manager.save_llm_call(call_data)
+
 def save_to_dashboard(analysis_data: Optional[Dict] = None, action_data: Optional[Dict] = None):
     """保存数据到dashboard - 兼容性函数"""
     if analysis_data:
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ccxt交易所客户端连接池
+长期复用客户端，保留HTTP会话、TLS连接、限频状态和已加载的市场信息
+"""
+
+import threading
+import time
+from typing import Dict
+
+import ccxt
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class ExchangeClientPool:
+    """按 exchange_id 复用的ccxt客户端池
+
+    所有客户端共用一个带连接池的 requests.Session，保持keep-alive连接；
+    客户端首次创建时加载一次市场信息。连续失败达到阈值或空闲过久的
+    客户端会被淘汰，下次使用时重新创建。
+    """
+
+    def __init__(self, max_failures: int = 3, max_idle_seconds: float = 3600,
+                 pool_maxsize: int = 10):
+        self.max_failures = max_failures
+        self.max_idle_seconds = max_idle_seconds
+        self.clients: Dict[str, Dict] = {}
+        self._lock = threading.RLock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, exchange_id: str, config: Dict):
+        """获取（或创建）交易所客户端"""
+        self.evict_idle()
+        with self._lock:
+            entry = self.clients.get(exchange_id)
+
+        if entry is None:
+            # 在锁外创建，避免加载市场信息时阻塞其他交易所
+            created = self._create(exchange_id, config)
+            with self._lock:
+                entry = self.clients.setdefault(exchange_id, created)
+
+        entry['last_used'] = time.time()
+        return entry['client']
+
+    def _create(self, exchange_id: str, config: Dict) -> Dict:
+        """创建客户端并加载市场信息"""
+        exchange_class = getattr(ccxt, exchange_id)
+        client = exchange_class(dict(config, session=self.session))
+        client.load_markets()
+        print(f"🔌 已创建 {exchange_id} 客户端并加载市场信息")
+        return {
+            'client': client,
+            'created_at': time.time(),
+            'last_used': time.time(),
+            'failures': 0,
+        }
+
+    def throttle(self, exchange_id: str):
+        """按交易所的 rateLimit 间隔为并发请求分配发送时间
+
+        只串行化“发送时间”的分配，请求本身可以并发在途。
+        """
+        with self._lock:
+            entry = self.clients.get(exchange_id)
+            if entry is None:
+                return
+            interval = entry['client'].rateLimit / 1000
+            now = time.time()
+            send_at = max(now, entry.get('next_request_time', now))
+            entry['next_request_time'] = send_at + interval
+
+        if send_at > now:
+            time.sleep(send_at - now)
+
+    def record_success(self, exchange_id: str):
+        """记录一次成功调用，清零失败计数"""
+        with self._lock:
+            entry = self.clients.get(exchange_id)
+            if entry:
+                entry['failures'] = 0
+
+    def record_failure(self, exchange_id: str):
+        """记录一次失败调用，连续失败达到阈值时淘汰客户端"""
+        with self._lock:
+            entry = self.clients.get(exchange_id)
+            if not entry:
+                return
+            entry['failures'] += 1
+            if entry['failures'] >= self.max_failures:
+                self.evict(exchange_id)
+
+    def is_healthy(self, exchange_id: str) -> bool:
+        """客户端是否存在且未连续失败"""
+        with self._lock:
+            entry = self.clients.get(exchange_id)
+            return entry is not None and entry['failures'] == 0
+
+    def health_check(self, exchange_id: str) -> bool:
+        """用轻量请求检查客户端是否可用"""
+        with self._lock:
+            entry = self.clients.get(exchange_id)
+        if entry is None:
+            return False
+
+        try:
+            entry['client'].fetch_time()
+            self.record_success(exchange_id)
+            return True
+        except Exception as e:
+            print(f"⚠️ {exchange_id} 健康检查失败: {e}")
+            self.record_failure(exchange_id)
+            return False
+
+    def evict(self, exchange_id: str):
+        """淘汰指定客户端"""
+        with self._lock:
+            if self.clients.pop(exchange_id, None) is not None:
+                print(f"♻️ 已淘汰 {exchange_id} 客户端")
+
+    def evict_idle(self):
+        """淘汰空闲过久的客户端"""
+        now = time.time()
+        with self._lock:
+            for exchange_id, entry in list(self.clients.items()):
+                if now - entry['last_used'] > self.max_idle_seconds:
+                    self.evict(exchange_id)
+
+    def get_status(self) -> Dict[str, Dict]:
+        """连接池状态"""
+        with self._lock:
+            return {
+                exchange_id: {
+                    'created_at': entry['created_at'],
+                    'last_used': entry['last_used'],
+                    'failures': entry['failures'],
+                }
+                for exchange_id, entry in self.clients.items()
+            }
+
+    def close(self):
+        """清空连接池并关闭共享会话"""
+        with self._lock:
+            self.clients.clear()
+            self.session.close()
+
+
+# 全局连接池实例
+exchange_pool = ExchangeClientPool()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+流式技术指标引擎
+每根新K线只做常数量的计算，替代每轮用pandas对整个DataFrame重算
+"""
+
+import math
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# 窗口参数与批量计算核心 indicators.py 共用，两者结果一致
+from indicators import (BB_STD_MULTIPLIER, BB_WINDOW, EMA_FAST_SPAN, EMA_SLOW_SPAN, MACD_SIGNAL_SPAN,
+                        RSI_PERIOD, SMA_WINDOWS)
+
+KLINE_TAIL = 5
+
+
+class _RunningEMA:
+    """与 pandas ewm(span=n, adjust=True).mean() 等价的递推EMA"""
+
+    def __init__(self, span: int):
+        self.decay = 1 - 2 / (span + 1)
+        self.numerator = 0.0
+        self.denominator = 0.0
+
+    def update(self, value: float) -> float:
+        self.numerator = value + self.decay * self.numerator
+        self.denominator = 1 + self.decay * self.denominator
+        return self.numerator / self.denominator
+
+    def copy(self) -> '_RunningEMA':
+        clone = _RunningEMA.__new__(_RunningEMA)
+        clone.decay = self.decay
+        clone.numerator = self.numerator
+        clone.denominator = self.denominator
+        return clone
+
+
+class _IndicatorState:
+    """引擎的全部可变状态，便于在替换未收盘K线时整体回滚"""
+
+    def __init__(self):
+        # 收盘价窗口：长度为最大SMA窗口+1，用于得到被移出的值
+        self.closes = deque(maxlen=max(SMA_WINDOWS) + 1)
+        self.sma_sums = {window: 0.0 for window in SMA_WINDOWS}
+
+        # RSI：最近14个涨跌幅
+        self.gains = deque(maxlen=RSI_PERIOD + 1)
+        self.losses = deque(maxlen=RSI_PERIOD + 1)
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.last_rsi = math.nan
+
+        # MACD
+        self.ema_fast = _RunningEMA(EMA_FAST_SPAN)
+        self.ema_slow = _RunningEMA(EMA_SLOW_SPAN)
+        self.macd_signal_ema = _RunningEMA(MACD_SIGNAL_SPAN)
+        self.macd = math.nan
+        self.macd_signal = math.nan
+
+        # 布林带：滑动窗口Welford方差
+        self.bb_count = 0
+        self.bb_mean = 0.0
+        self.bb_m2 = 0.0
+
+        # 最近几根K线，用于 price_change 和 kline_data
+        self.candles = deque(maxlen=KLINE_TAIL)
+        self.count = 0
+
+    def copy(self) -> '_IndicatorState':
+        clone = _IndicatorState.__new__(_IndicatorState)
+        clone.closes = deque(self.closes, maxlen=self.closes.maxlen)
+        clone.sma_sums = dict(self.sma_sums)
+        clone.gains = deque(self.gains, maxlen=self.gains.maxlen)
+        clone.losses = deque(self.losses, maxlen=self.losses.maxlen)
+        clone.gain_sum = self.gain_sum
+        clone.loss_sum = self.loss_sum
+        clone.last_rsi = self.last_rsi
+        clone.ema_fast = self.ema_fast.copy()
+        clone.ema_slow = self.ema_slow.copy()
+        clone.macd_signal_ema = self.macd_signal_ema.copy()
+        clone.macd = self.macd
+        clone.macd_signal = self.macd_signal
+        clone.bb_count = self.bb_count
+        clone.bb_mean = self.bb_mean
+        clone.bb_m2 = self.bb_m2
+        clone.candles = deque(self.candles, maxlen=self.candles.maxlen)
+        clone.count = self.count
+        return clone
+
+
+class StreamingIndicatorEngine:
+    """流式技术指标引擎
+
+    用历史K线初始化一次，之后每根K线以O(1)的计算量更新
+    SMA5/20/50、RSI、MACD和布林带。时间戳与最后一根相同的K线
+    （尚未收盘的K线）会在原位置替换，而不是追加。
+
+    注意：EMA基于引擎启动以来的全部历史递推，长时间运行后比只用
+    最近96根K线重算的结果更准确，两者在小数点后数位上会有差异。
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """清空全部状态"""
+        self._state = _IndicatorState()
+        self._committed = None
+        self.last_timestamp = None
+
+    def seed(self, ohlcv: List[List[float]]):
+        """用历史K线重新初始化引擎"""
+        self.reset()
+        for candle in ohlcv:
+            self.update(candle)
+
+    def ingest(self, ohlcv: List[List[float]]) -> int:
+        """增量吸收一批K线，返回新增K线数量
+
+        批次与已有数据没有重叠（出现缺口）时自动重新初始化。
+        """
+        if not ohlcv:
+            return 0
+
+        if self.last_timestamp is None or ohlcv[0][0] > self.last_timestamp:
+            self.seed(ohlcv)
+            return len(ohlcv)
+
+        added = 0
+        for candle in ohlcv:
+            if candle[0] < self.last_timestamp:
+                continue
+            if candle[0] > self.last_timestamp:
+                added += 1
+            self.update(candle)
+        return added
+
+    def update(self, candle: List[float]):
+        """处理一根K线 [timestamp, open, high, low, close, volume]"""
+        timestamp = candle[0]
+
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            return
+
+        if self.last_timestamp is not None and timestamp == self.last_timestamp:
+            # 未收盘K线更新：回滚到上一根K线处理后的状态再重新计算
+            self._state = self._committed.copy()
+        else:
+            self._committed = self._state.copy()
+
+        self._apply(self._state, candle)
+        self.last_timestamp = timestamp
+
+    def _apply(self, state: _IndicatorState, candle: List[float]):
+        """把一根K线应用到状态上"""
+        close = float(candle[4])
+        previous_close = state.closes[-1] if state.closes else None
+
+        # 移动平均线
+        state.closes.append(close)
+        for window in SMA_WINDOWS:
+            state.sma_sums[window] += close
+            if len(state.closes) > window:
+                state.sma_sums[window] -= state.closes[-window - 1]
+
+        # RSI：第一根K线的涨跌记为0，与 delta.where(...) 的行为一致
+        delta = close - previous_close if previous_close is not None else 0.0
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        state.gains.append(gain)
+        state.losses.append(loss)
+        state.gain_sum += gain
+        state.loss_sum += loss
+        if len(state.gains) > RSI_PERIOD:
+            state.gain_sum -= state.gains.popleft()
+            state.loss_sum -= state.losses.popleft()
+        if len(state.gains) == RSI_PERIOD:
+            rsi = self._compute_rsi(state.gain_sum, state.loss_sum)
+            if not math.isnan(rsi):
+                state.last_rsi = rsi
+
+        # MACD
+        state.macd = state.ema_fast.update(close) - state.ema_slow.update(close)
+        state.macd_signal = state.macd_signal_ema.update(state.macd)
+
+        # 布林带：窗口未满时追加，窗口已满时用一进一出的Welford更新
+        if state.bb_count < BB_WINDOW:
+            state.bb_count += 1
+            delta_mean = close - state.bb_mean
+            state.bb_mean += delta_mean / state.bb_count
+            state.bb_m2 += delta_mean * (close - state.bb_mean)
+        else:
+            evicted = state.closes[-BB_WINDOW - 1]
+            old_mean = state.bb_mean
+            state.bb_mean += (close - evicted) / BB_WINDOW
+            state.bb_m2 += (close - evicted) * (close - state.bb_mean + evicted - old_mean)
+            state.bb_m2 = max(state.bb_m2, 0.0)
+
+        state.candles.append([float(value) for value in candle[:6]])
+        state.count += 1
+
+    @staticmethod
+    def _compute_rsi(gain_sum: float, loss_sum: float) -> float:
+        """RSI = 100 - 100 / (1 + RS)，涨跌都为0时返回NaN"""
+        if loss_sum <= 0:
+            return 100.0 if gain_sum > 0 else math.nan
+        return 100 - (100 / (1 + gain_sum / loss_sum))
+
+    def get_technical_data(self) -> Dict[str, float]:
+        """返回最新K线的指标字典，与 indicators.compute_indicators 最后一行的数值一致"""
+        state = self._state
+        length = len(state.closes)
+
+        def sma(window):
+            if length == 0:
+                return math.nan
+            return state.sma_sums[window] / min(window, length)
+
+        if state.bb_count >= BB_WINDOW:
+            bb_std = math.sqrt(state.bb_m2 / (BB_WINDOW - 1))
+            bb_upper = state.bb_mean + bb_std * BB_STD_MULTIPLIER
+            bb_lower = state.bb_mean - bb_std * BB_STD_MULTIPLIER
+        else:
+            bb_upper = bb_lower = math.nan
+
+        result = {f'sma_{window}': sma(window) for window in SMA_WINDOWS}
+        result.update({
+            'rsi': state.last_rsi,
+            'macd': state.macd,
+            'macd_signal': state.macd_signal,
+            'bb_upper': bb_upper,
+            'bb_lower': bb_lower,
+        })
+        return result
+
+    def snapshot(self) -> Optional[Dict]:
+        """生成市场数据字典（不含 timestamp 和 data_source 字段）"""
+        candles = self._state.candles
+        if len(candles) < 2:
+            return None
+        return build_snapshot(candles, self.get_technical_data())
+
+
+def build_snapshot(candles, technical_data: Dict[str, float]) -> Dict:
+    """由最近几根K线和指标字典生成市场数据字典
+
+    candles 至少两根，kline_data 只保留最后 KLINE_TAIL 根。
+    """
+    candles = list(candles)[-KLINE_TAIL:]
+    current_data = candles[-1]
+    previous_data = candles[-2]
+
+    return {
+        'price': current_data[4],
+        'high': current_data[2],
+        'low': current_data[3],
+        'volume': current_data[5],
+        'price_change': ((current_data[4] - previous_data[4]) / previous_data[4]) * 100,
+        'technical_data': technical_data,
+        'kline_data': [
+            {
+                'timestamp': datetime.fromtimestamp(candle[0] / 1000, tz=timezone.utc).replace(tzinfo=None),
+                'open': candle[1],
+                'high': candle[2],
+                'low': candle[3],
+                'close': candle[4],
+                'volume': candle[5],
+            }
+            for candle in candles
+        ],
+    }
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+技术指标注册表
+每个指标声明其依赖的输入列和前置指标，使用方只声明自己需要的指标，
+按依赖图只计算这些指标及其前置指标，结果在同一K线窗口内缓存；
+IndicatorMemo 按K线内容记忆整个窗口，供 Dashboard 这类反复请求同一区间的
+使用方复用（交易主循环使用 O(1) 的流式引擎，不经过这里）
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+import indicators
+
+
+class IndicatorSpec:
+    """单个指标的定义"""
+
+    def __init__(self, name: str, func: Callable, depends: Sequence[str] = (),
+                 inputs: Sequence[str] = ('close',)):
+        self.name = name
+        self.func = func
+        self.depends = tuple(depends)
+        self.inputs = tuple(inputs)
+
+
+class IndicatorRegistry:
+    """指标依赖图"""
+
+    def __init__(self):
+        self._specs: Dict[str, IndicatorSpec] = {}
+
+    def register(self, name: str, depends: Sequence[str] = (), inputs: Sequence[str] = ('close',)):
+        """注册指标的装饰器，被装饰函数接收 IndicatorFrame 并返回与输入同形状的数组"""
+        def decorator(func):
+            self._specs[name] = IndicatorSpec(name, func, depends, inputs)
+            return func
+        return decorator
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def spec(self, name: str) -> IndicatorSpec:
+        if name not in self._specs:
+            raise KeyError(f"未注册的指标: {name}")
+        return self._specs[name]
+
+    def resolve(self, features: Iterable[str]) -> List[str]:
+        """返回计算这些指标所需的全部指标，前置指标排在前面"""
+        order: List[str] = []
+        visiting = set()
+
+        def visit(name):
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"指标依赖存在循环: {name}")
+            visiting.add(name)
+            for dependency in self.spec(name).depends:
+                visit(dependency)
+            visiting.discard(name)
+            order.append(name)
+
+        for feature in features:
+            visit(feature)
+        return order
+
+    def frame(self, close, high=None, low=None, volume=None, open_=None) -> 'IndicatorFrame':
+        """为一个K线窗口创建惰性指标视图"""
+        columns = {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
+        return IndicatorFrame(self, {name: values for name, values in columns.items() if values is not None})
+
+    def compute(self, features: Iterable[str], close, high=None, low=None, volume=None) -> Dict[str, np.ndarray]:
+        """只计算指定指标（及其前置指标），返回指定指标的数组"""
+        return self.frame(close, high, low, volume).require(features)
+
+
+class IndicatorFrame:
+    """单个K线窗口上的惰性指标集合，已计算的指标在本窗口内缓存"""
+
+    def __init__(self, registry: IndicatorRegistry, columns: Dict[str, np.ndarray]):
+        self.registry = registry
+        self.columns = {name: np.ascontiguousarray(values, dtype=np.float64) for name, values in columns.items()}
+        self.values: Dict[str, np.ndarray] = {}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name in self.columns:
+            return self.columns[name]
+        if name not in self.values:
+            self.require([name])
+        return self.values[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns or name in self.values
+
+    def require(self, features: Iterable[str]) -> Dict[str, np.ndarray]:
+        """确保指定指标已计算，返回 {指标名: 数组}"""
+        features = list(features)
+        for name in self.registry.resolve(features):
+            if name in self.values:
+                continue
+            spec = self.registry.spec(name)
+            missing = [column for column in spec.inputs if column not in self.columns]
+            if missing:
+                raise ValueError(f"指标 {name} 缺少输入列: {', '.join(missing)}")
+            self.values[name] = spec.func(self)
+        return {name: self.values[name] for name in features}
+
+
+class IndicatorMemo:
+    """按K线窗口内容记忆 IndicatorFrame 的有界LRU缓存
+
+    键为 (交易对, 周期, 最后一根K线时间戳, 内容哈希)。Dashboard 图表
+    轮询 /api/candles 时，本地存储没有新K线写入前每次读到的是同一窗口，
+    命中同一个 IndicatorFrame，已算过的指标直接复用，新请求的指标只
+    计算一次；写入新K线或未收盘K线更新后内容哈希改变，自然得到新的窗口。
+    """
+
+    def __init__(self, registry: IndicatorRegistry, maxsize: int = 64):
+        self.registry = registry
+        self.maxsize = maxsize
+        self._frames: 'OrderedDict[Tuple, IndicatorFrame]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def make_key(symbol: str, timeframe: str, timestamps, columns: Dict[str, np.ndarray]) -> Tuple:
+        """计算缓存键，内容哈希覆盖时间戳和全部输入列"""
+        timestamps = np.ascontiguousarray(timestamps, dtype=np.int64)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(timestamps.tobytes())
+        for name in sorted(columns):
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(columns[name], dtype=np.float64).tobytes())
+        last_timestamp = int(timestamps[-1]) if len(timestamps) else None
+        return symbol, timeframe, last_timestamp, digest.hexdigest()
+
+    def get_frame(self, symbol: str, timeframe: str, timestamps,
+                  columns: Dict[str, np.ndarray]) -> IndicatorFrame:
+        """返回该窗口的 IndicatorFrame，未命中时新建并按LRU淘汰最久未用的窗口"""
+        key = self.make_key(symbol, timeframe, timestamps, columns)
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is not None:
+                self._frames.move_to_end(key)
+                self.stats['hits'] += 1
+                return frame
+
+            self.stats['misses'] += 1
+            frame = IndicatorFrame(self.registry, columns)
+            self._frames[key] = frame
+            while len(self._frames) > self.maxsize:
+                self._frames.popitem(last=False)
+                self.stats['evictions'] += 1
+            return frame
+
+    def compute(self, symbol: str, timeframe: str, features: Iterable[str], timestamps,
+                close, high=None, low=None, volume=None) -> Dict[str, np.ndarray]:
+        """带记忆的 IndicatorRegistry.compute"""
+        columns = {'high': high, 'low': low, 'close': close, 'volume': volume}
+        columns = {name: values for name, values in columns.items() if values is not None}
+        frame = self.get_frame(symbol, timeframe, timestamps, columns)
+        with self._lock:
+            return frame.require(features)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            total = self.stats['hits'] + self.stats['misses']
+            return dict(self.stats, size=len(self._frames),
+                        hit_rate=self.stats['hits'] / total if total else 0.0)
+
+
+# 默认注册表：与 indicators.compute_indicators 的输出一一对应
+indicator_registry = IndicatorRegistry()
+
+for _window in indicators.SMA_WINDOWS:
+    indicator_registry.register(f'sma_{_window}')(
+        lambda frame, window=_window: indicators.sma(frame['close'], window, min_periods=1))
+
+
+@indicator_registry.register('rsi')
+def _rsi(frame):
+    return indicators.rsi(frame['close'], indicators.RSI_PERIOD)
+
+
+@indicator_registry.register('ema_12')
+def _ema_12(frame):
+    return indicators.ema(frame['close'], indicators.EMA_FAST_SPAN)
+
+
+@indicator_registry.register('ema_26')
+def _ema_26(frame):
+    return indicators.ema(frame['close'], indicators.EMA_SLOW_SPAN)
+
+
+@indicator_registry.register('macd', depends=('ema_12', 'ema_26'))
+def _macd(frame):
+    return frame['ema_12'] - frame['ema_26']
+
+
+@indicator_registry.register('macd_signal', depends=('macd',))
+def _macd_signal(frame):
+    return indicators.ema(frame['macd'], indicators.MACD_SIGNAL_SPAN)
+
+
+@indicator_registry.register('macd_hist', depends=('macd', 'macd_signal'))
+def _macd_hist(frame):
+    return frame['macd'] - frame['macd_signal']
+
+
+@indicator_registry.register('bb_middle')
+def _bb_middle(frame):
+    return indicators.sma(frame['close'], indicators.BB_WINDOW)
+
+
+@indicator_registry.register('bb_std')
+def _bb_std(frame):
+    return indicators.rolling_std(frame['close'], indicators.BB_WINDOW)
+
+
+@indicator_registry.register('bb_upper', depends=('bb_middle', 'bb_std'))
+def _bb_upper(frame):
+    return frame['bb_middle'] + frame['bb_std'] * indicators.BB_STD_MULTIPLIER
+
+
+@indicator_registry.register('bb_lower', depends=('bb_middle', 'bb_std'))
+def _bb_lower(frame):
+    return frame['bb_middle'] - frame['bb_std'] * indicators.BB_STD_MULTIPLIER
+
+
+@indicator_registry.register('atr', inputs=('high', 'low', 'close'))
+def _atr(frame):
+    return indicators.atr(frame['high'], frame['low'], frame['close'])
+
+
+@indicator_registry.register('vwap', inputs=('high', 'low', 'close', 'volume'))
+def _vwap(frame):
+    return indicators.vwap(frame['high'], frame['low'], frame['close'], frame['volume'])
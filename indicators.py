@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NumPy技术指标计算核心
+所有函数接收连续的 float64 数组并返回同形状数组，数据不足的位置为 NaN；
+数值结果与原 pandas rolling/ewm 实现一致。
+一维数组为单个交易对的序列；二维数组 (交易对 × K线) 沿最后一维计算，
+一次向量化运算即可得到所有交易对的指标
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# 指标参数（流式引擎 indicator_engine.py 和指标注册表共用）
+SMA_WINDOWS = (5, 20, 50)
+RSI_PERIOD = 14
+EMA_FAST_SPAN = 12
+EMA_SLOW_SPAN = 26
+MACD_SIGNAL_SPAN = 9
+BB_WINDOW = 20
+BB_STD_MULTIPLIER = 2
+
+
+def _as_float_array(values) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _linear_recurrence(values: np.ndarray, decay: float, gain: float, initial: float) -> np.ndarray:
+    """沿最后一维计算 y[t] = decay * y[t-1] + gain * x[t]，y[-1] = initial
+
+    分块后在块内用累加和展开递推，块长度保证 decay 的幂不会溢出。
+    initial 可以是标量，也可以是与 values[..., 0] 同形状的数组。
+    """
+    n = values.shape[-1]
+    out = np.empty(values.shape, dtype=np.float64)
+    if n == 0:
+        return out
+    if decay <= 0:
+        out[...] = gain * values
+        return out
+
+    block = max(1, int(500 / -math.log(decay))) if decay < 1 else n
+    offsets = np.arange(block, dtype=np.float64)
+    powers = decay ** offsets
+    inverse_powers = decay ** -offsets
+
+    carry = np.broadcast_to(np.asarray(initial, dtype=np.float64), values.shape[:-1])[..., np.newaxis]
+    for start in range(0, n, block):
+        chunk = values[..., start:start + block]
+        size = chunk.shape[-1]
+        accumulated = np.cumsum(gain * chunk * inverse_powers[:size], axis=-1)
+        out[..., start:start + size] = powers[:size] * (decay * carry + accumulated)
+        carry = out[..., start + size - 1:start + size]
+    return out
+
+
+def sma(values, window: int, min_periods: int = None) -> np.ndarray:
+    """简单移动平均，对应 rolling(window, min_periods).mean()"""
+    values = _as_float_array(values)
+    min_periods = window if min_periods is None else min_periods
+    n = values.shape[-1]
+    if n == 0:
+        return values.copy()
+
+    # 先减去首个值再累加，降低长序列累加和的舍入误差
+    base = values[..., :1]
+    zeros = np.zeros(values.shape[:-1] + (1,))
+    cumulative = np.concatenate((zeros, np.cumsum(values - base, axis=-1)), axis=-1)
+    index = np.arange(1, n + 1)
+    start = np.maximum(index - window, 0)
+    counts = index - start
+    out = (cumulative[..., index] - cumulative[..., start]) / counts + base
+    out[..., counts < min_periods] = np.nan
+    return out
+
+
+def rolling_std(values, window: int) -> np.ndarray:
+    """滚动样本标准差（ddof=1），对应 rolling(window).std()"""
+    values = _as_float_array(values)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] >= window and window > 1:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=-1)
+        out[..., window - 1:] = windows.std(axis=-1, ddof=1)
+    return out
+
+
+def ema(values, span: int) -> np.ndarray:
+    """指数移动平均，对应 ewm(span=span, adjust=True).mean()"""
+    values = _as_float_array(values)
+    decay = 1 - 2 / (span + 1)
+    numerator = _linear_recurrence(values, decay, 1.0, 0.0)
+    denominator = _linear_recurrence(np.ones_like(values), decay, 1.0, 0.0)
+    return numerator / denominator
+
+
+def rma(values, period: int) -> np.ndarray:
+    """Wilder平滑，对应 ewm(alpha=1/period, adjust=False).mean()"""
+    values = _as_float_array(values)
+    if values.shape[-1] == 0:
+        return values.copy()
+    alpha = 1 / period
+    # 以 x[0] 作为初值：y[0] = x[0]
+    return _linear_recurrence(values, 1 - alpha, alpha, values[..., 0])
+
+
+def rsi(close, period: int = RSI_PERIOD) -> np.ndarray:
+    """RSI，涨跌幅用简单移动平均（与原实现一致），首根K线涨跌记为0"""
+    close = _as_float_array(close)
+    delta = np.diff(close, prepend=close[..., :1], axis=-1) if close.shape[-1] else close.copy()
+    gain = sma(np.where(delta > 0, delta, 0.0), period)
+    loss = sma(np.where(delta < 0, -delta, 0.0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + gain / loss))
+
+
+def macd(close, fast: int = EMA_FAST_SPAN, slow: int = EMA_SLOW_SPAN,
+         signal: int = MACD_SIGNAL_SPAN) -> Dict[str, np.ndarray]:
+    """MACD线、信号线和柱状图"""
+    ema_fast = ema(close, fast)
+    ema_slow = ema(close, slow)
+    macd_line = ema_fast - ema_slow
+    signal_line = ema(macd_line, signal)
+    return {
+        'ema_fast': ema_fast,
+        'ema_slow': ema_slow,
+        'macd': macd_line,
+        'macd_signal': signal_line,
+        'macd_hist': macd_line - signal_line,
+    }
+
+
+def bollinger(close, window: int = BB_WINDOW, num_std: float = BB_STD_MULTIPLIER) -> Dict[str, np.ndarray]:
+    """布林带"""
+    middle = sma(close, window)
+    std = rolling_std(close, window)
+    return {
+        'bb_middle': middle,
+        'bb_upper': middle + std * num_std,
+        'bb_lower': middle - std * num_std,
+    }
+
+
+def atr(high, low, close, period: int = 14) -> np.ndarray:
+    """平均真实波幅（Wilder平滑）"""
+    high = _as_float_array(high)
+    low = _as_float_array(low)
+    close = _as_float_array(close)
+    if close.shape[-1] == 0:
+        return close.copy()
+
+    previous_close = np.concatenate((np.full(close.shape[:-1] + (1,), np.nan), close[..., :-1]), axis=-1)
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+    return rma(true_range, period)
+
+
+def vwap(high, low, close, volume, window: int = None) -> np.ndarray:
+    """成交量加权平均价（典型价格），window 为空时从序列起点累计"""
+    typical = (_as_float_array(high) + _as_float_array(low) + _as_float_array(close)) / 3
+    volume = _as_float_array(volume)
+    weighted = np.cumsum(typical * volume, axis=-1)
+    total = np.cumsum(volume, axis=-1)
+    if window:
+        weighted[..., window:] = weighted[..., window:] - weighted[..., :-window]
+        total[..., window:] = total[..., window:] - total[..., :-window]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return weighted / total
+
+
+def compute_indicators(close, high=None, low=None, volume=None) -> Dict[str, np.ndarray]:
+    """计算全部技术指标，最后一行与 StreamingIndicatorEngine.get_technical_data 一致"""
+    close = _as_float_array(close)
+    result = {f'sma_{window}': sma(close, window, min_periods=1) for window in SMA_WINDOWS}
+    result['rsi'] = rsi(close, RSI_PERIOD)
+
+    macd_result = macd(close)
+    result['ema_12'] = macd_result['ema_fast']
+    result['ema_26'] = macd_result['ema_slow']
+    result['macd'] = macd_result['macd']
+    result['macd_signal'] = macd_result['macd_signal']
+    result.update(bollinger(close))
+
+    if high is not None and low is not None:
+        result['atr'] = atr(high, low, close)
+        if volume is not None:
+            result['vwap'] = vwap(high, low, close, volume)
+    return result
+
+
+TECHNICAL_DATA_KEYS = ('sma_5', 'sma_20', 'sma_50', 'rsi', 'macd', 'macd_signal', 'bb_upper', 'bb_lower')
+
+
+def last_valid(values: np.ndarray) -> np.ndarray:
+    """沿最后一维取最后一个非NaN值（相当于 ffill 后取最后一行）"""
+    values = _as_float_array(values)
+    valid = ~np.isnan(values)
+    n = values.shape[-1]
+    index = n - 1 - np.argmax(valid[..., ::-1], axis=-1)
+    result = np.take_along_axis(values, index[..., np.newaxis], axis=-1)[..., 0]
+    return np.where(valid.any(axis=-1), result, np.nan)
+
+
+def stack_ohlcv(ohlcv_by_symbol: Dict[str, List[List[float]]],
+                length: int = None) -> Optional[Dict[str, np.ndarray]]:
+    """把 {交易对: K线列表} 对齐为 (交易对 × K线) 矩阵
+
+    每个交易对取最近 length 根K线（默认取各交易对中最短的长度），
+    K线数量不足的交易对会被跳过。
+    """
+    if not ohlcv_by_symbol:
+        return None
+    length = length or min(len(ohlcv) for ohlcv in ohlcv_by_symbol.values())
+    symbols = [symbol for symbol, ohlcv in ohlcv_by_symbol.items() if len(ohlcv) >= length]
+    if not symbols or length == 0:
+        return None
+
+    data = np.array([[candle[:6] for candle in ohlcv_by_symbol[symbol][-length:]] for symbol in symbols],
+                    dtype=np.float64)
+    return {
+        'symbols': symbols,
+        'timestamp': data[:, :, 0].astype(np.int64),
+        'open': np.ascontiguousarray(data[:, :, 1]),
+        'high': np.ascontiguousarray(data[:, :, 2]),
+        'low': np.ascontiguousarray(data[:, :, 3]),
+        'close': np.ascontiguousarray(data[:, :, 4]),
+        'volume': np.ascontiguousarray(data[:, :, 5]),
+    }
+
+
+def compute_indicators_batch(closes, highs=None, lows=None, volumes=None,
+                             symbols: Sequence[str] = None) -> Dict:
+    """一次向量化计算所有交易对的全部指标
+
+    Args:
+        closes/highs/lows/volumes: (交易对 × K线) 矩阵，各行按时间对齐
+        symbols: 与行顺序对应的交易对名称
+
+    Returns:
+        {'symbols': [...], 指标名: (交易对 × K线) 矩阵, ...}
+    """
+    closes = np.atleast_2d(_as_float_array(closes))
+    result = compute_indicators(closes,
+                                None if highs is None else np.atleast_2d(highs),
+                                None if lows is None else np.atleast_2d(lows),
+                                None if volumes is None else np.atleast_2d(volumes))
+    result['symbols'] = list(symbols) if symbols is not None else list(range(closes.shape[0]))
+    return result
+
+
+def technical_data_batch(batch: Dict) -> Dict[str, Dict[str, float]]:
+    """把批量结果切分为 {交易对: technical_data}"""
+    latest = {key: last_valid(batch[key]) for key in TECHNICAL_DATA_KEYS}
+    return {
+        symbol: {key: float(latest[key][row]) for key in TECHNICAL_DATA_KEYS}
+        for row, symbol in enumerate(batch['symbols'])
+    }
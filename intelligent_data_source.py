@@ -6,12 +6,26 @@
 当OKX不可用时，自动切换到其他可用的数据源
 """
 
+import os
 import ccxt
 import requests
 import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeoutError
 from datetime import datetime
-import pandas as pd
-import json
+import indicators
+from indicator_engine import StreamingIndicatorEngine, build_snapshot
+from candle_cache import OHLCVCache
+from exchange_pool import exchange_pool
+from source_health import SourceHealthMonitor, CircuitBreaker
+from candle_store import CandleStore
+from resampler import TIMEFRAME_MS, CandleResampler
+from market_stream import MarketDataStream, DEFAULT_STREAM_URL
+
+# 计入数据源健康状态的异常：网络故障、交易所不可用和超时；
+# BadSymbol 等单个交易对的问题只记录日志，不触发熔断
+SOURCE_FAILURE_ERRORS = (ccxt.NetworkError, ccxt.ExchangeNotAvailable, TimeoutError)
 
 class IntelligentDataSource:
     """智能数据源管理器"""
@@ -101,14 +115,93 @@ class IntelligentDataSource:
         self.last_check_time = 0
         self.check_interval = 300  # 5分钟检查一次
         
+        # 本地K线存储，用于指标预热、回测和Dashboard图表
+        self.candle_store = CandleStore(os.getenv('CANDLE_STORE_PATH', 'candle_store'))
+        self.warmup_candles = 500
+        
+        # 流式指标引擎，按 (数据源, 交易对, 周期) 区分
+        self.indicator_engines = {}
+        
+        # 增量K线缓存，只请求上次之后的新K线
+        self.ohlcv_cache = OHLCVCache(capacity=96)
+        
+        # 长期复用的交易所客户端连接池
+        self.exchange_pool = exchange_pool
+        
+        # 并发探测配置
+        self.probe_deadline = 10  # 探测总截止时间（秒）
+        self.latency_threshold = 1.0  # 达到该响应时间的数据源立即胜出（秒）
+        self._probe_executor = ThreadPoolExecutor(max_workers=len(self.data_sources),
+                                                  thread_name_prefix='source-probe')
+        self._probes_in_flight = {}
+        self._probe_lock = threading.Lock()
+        
+        # 后台健康监控：EWMA延迟/错误率 + 熔断器
+        self.health_monitor = SourceHealthMonitor(self.data_sources, self.probe_source_latency)
+        
+        # 对冲请求配置：主数据源超过其历史延迟分位数仍未返回时，向次优数据源重复请求
+        self.hedge_enabled = True
+        self.hedge_percentile = 0.95
+        self.hedge_min_samples = 10  # 样本不足时使用默认等待时间
+        self.hedge_default_delay = 2.0  # 秒
+        self.hedge_min_delay = 0.2  # 秒
+        self.fetch_latencies = {source['exchange_id']: deque(maxlen=100) for source in self.data_sources}
+        self._fetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='market-data')
+        
+        # 多周期重采样：由1分钟K线本地合成其他周期
+        self.resamplers = {}
+        self.base_refresh_interval = 30  # 秒
+        self.resample_history = 7 * 1440  # 初始化时读取的1分钟历史K线数量
+        
+        # 多交易对K线请求的并发上限
+        self.max_symbol_concurrency = 8
+        self._symbol_executor = ThreadPoolExecutor(max_workers=self.max_symbol_concurrency,
+                                                   thread_name_prefix='symbol-data')
+        
+        # WebSocket实时行情（通过 enable_stream 启用）
+        self.market_stream = None
+        self.stream_source = None
+        self.stream_max_age = 30  # 超过该秒数未收到推送则回退到REST
+        
+    def get_indicator_engine(self, exchange_id, symbol, timeframe):
+        """获取（或创建）指定数据源/交易对/周期的流式指标引擎
+
+        新建的引擎先用本地K线存储中的历史数据预热。
+        """
+        key = (exchange_id, symbol, timeframe)
+        if key not in self.indicator_engines:
+            engine = StreamingIndicatorEngine()
+            history = self.load_history(exchange_id, symbol, timeframe, self.warmup_candles)
+            if history:
+                engine.seed(history)
+            self.indicator_engines[key] = engine
+        return self.indicator_engines[key]
+    
+    def persist_candles(self, exchange_id, symbol, timeframe, ohlcv):
+        """把获取到的K线写入本地存储（按交易所分序列），失败不影响交易流程"""
+        try:
+            self.candle_store.append(exchange_id, symbol, timeframe, ohlcv)
+        except Exception as e:
+            print(f"⚠️ K线存储写入失败: {e}")
+    
+    def load_history(self, exchange_id, symbol, timeframe, count):
+        """从本地K线存储读取最近 count 根K线，只返回最后一个缺口之后的连续部分"""
+        try:
+            columns = self.candle_store.tail(exchange_id, symbol, timeframe, count)
+            if timeframe in TIMEFRAME_MS:
+                columns = CandleStore.contiguous_tail(columns, TIMEFRAME_MS[timeframe])
+            return CandleStore.to_ohlcv(columns)
+        except Exception as e:
+            print(f"⚠️ K线存储读取失败: {e}")
+            return []
+        
     def test_data_source(self, source):
         """测试数据源是否可用"""
         try:
             print(f"🔍 测试数据源: {source['name']}")
             
-            # 创建交易所实例
-            exchange_class = getattr(ccxt, source['exchange_id'])
-            exchange = exchange_class(source['config'])
+            # 从连接池获取交易所实例（首次使用时创建并加载市场信息）
+            exchange = self.exchange_pool.get(source['exchange_id'], source['config'])
             
             # 测试获取服务器时间
             start_time = time.time()
@@ -118,6 +211,7 @@ class IntelligentDataSource:
             # 测试获取BTC价格
             ticker = exchange.fetch_ticker('BTC/USDT')
             
+            self.exchange_pool.record_success(source['exchange_id'])
             print(f"✅ {source['name']} 可用！响应时间: {response_time:.2f}秒")
             print(f"💰 BTC价格: ${ticker['last']:,.2f}")
             
@@ -128,33 +222,97 @@ class IntelligentDataSource:
             
         except Exception as e:
             print(f"❌ {source['name']} 不可用: {e}")
+            self.exchange_pool.record_failure(source['exchange_id'])
             return False, 0, None
     
+    def _record_probe_result(self, source, success, response_time):
+        """记录一次探测结果，更新数据源排名信息"""
+        self.health_monitor.record(source, success, response_time if success else None)
+    
+    def probe_source_latency(self, source):
+        """轻量探测：只请求服务器时间，返回延迟（秒）"""
+        exchange = self.exchange_pool.get(source['exchange_id'], source['config'])
+        start_time = time.time()
+        try:
+            exchange.fetch_time()
+        except Exception:
+            self.exchange_pool.record_failure(source['exchange_id'])
+            raise
+        self.exchange_pool.record_success(source['exchange_id'])
+        return time.time() - start_time
+    
+    def start_health_monitor(self):
+        """启动后台数据源健康监控"""
+        self.health_monitor.start()
+    
+    def stop_health_monitor(self):
+        """停止后台数据源健康监控"""
+        self.health_monitor.stop()
+    
+    def _submit_probe(self, source):
+        """在线程池中探测数据源；同一数据源已有探测在进行时复用该探测"""
+        with self._probe_lock:
+            future = self._probes_in_flight.get(source['exchange_id'])
+            if future is not None and not future.done():
+                return future
+            
+            future = self._probe_executor.submit(self.test_data_source, source)
+            self._probes_in_flight[source['exchange_id']] = future
+        
+        def on_done(done_future):
+            # 慢速探测在后台完成后同样更新排名
+            try:
+                success, response_time, _ = done_future.result()
+            except Exception:
+                success, response_time = False, 0
+            self._record_probe_result(source, success, response_time)
+        
+        future.add_done_callback(on_done)
+        return future
+    
     def find_best_source(self):
-        """找到最佳可用数据源"""
-        print("🔍 搜索最佳数据源...")
+        """找到最佳可用数据源
+
+        并发探测所有数据源：第一个响应时间低于阈值的数据源立即胜出，
+        否则在总截止时间内选择最快的可用数据源。未完成的探测继续在
+        后台运行并更新各数据源的排名。
+        """
+        print("🔍 并发搜索最佳数据源...")
         print("=" * 50)
         
-        available_sources = []
+        futures = {
+            self._submit_probe(source): source
+            for source in sorted(self.data_sources, key=lambda x: x['priority'])
+        }
         
-        # 按优先级测试所有数据源
-        for source in sorted(self.data_sources, key=lambda x: x['priority']):
-            success, response_time, data = self.test_data_source(source)
-            
-            if success:
-                source['available'] = True
-                source['response_time'] = response_time
-                source['last_test_time'] = time.time()
-                available_sources.append(source)
-            else:
-                source['available'] = False
-                source['last_test_time'] = time.time()
+        # 探测结果只在 _submit_probe 的回调中记录一次；这里用本地延迟选择，
+        # 不依赖回调是否已写回 source['response_time']
+        response_times = {}
+        best_source = None
+        try:
+            for future in as_completed(futures, timeout=self.probe_deadline):
+                source = futures[future]
+                success, response_time, data = future.result()
+                if not success:
+                    continue
+                
+                response_times[source['exchange_id']] = response_time
+                if response_time <= self.latency_threshold:
+                    best_source = source
+                    break
+        except FuturesTimeoutError:
+            print(f"⏱️ 探测超过{self.probe_deadline}秒截止时间，剩余数据源在后台继续探测")
         
-        if available_sources:
-            # 选择响应时间最快的
-            best_source = min(available_sources, key=lambda x: x['response_time'])
+        self.last_check_time = time.time()
+        
+        if best_source is None and response_times:
+            # 没有数据源达到延迟阈值，选择截止时间内响应最快的
+            fastest_id = min(response_times, key=response_times.get)
+            best_source = next(source for source in self.data_sources if source['exchange_id'] == fastest_id)
+        
+        if best_source:
             print(f"\n🏆 选择最佳数据源: {best_source['name']}")
-            print(f"⏱️ 响应时间: {best_source['response_time']:.2f}秒")
+            print(f"⏱️ 响应时间: {response_times[best_source['exchange_id']]:.2f}秒")
             print(f"📊 优先级: {best_source['priority']}")
             
             self.current_source = best_source
@@ -165,7 +323,19 @@ class IntelligentDataSource:
             return None
     
     def get_current_data_source(self):
-        """获取当前数据源"""
+        """获取当前数据源
+
+        健康监控运行时只读取其维护的排名，不在交易主循环中探测；
+        排名为空（监控刚启动或全部熔断）时才回退为一次完整探测。
+        """
+        if self.health_monitor.is_running():
+            for source in self.health_monitor.get_ranking():
+                if source.get('available', False):
+                    self.current_source = source
+                    return source
+            print("⚠️ 健康监控暂无可用数据源排名，执行一次完整探测")
+            return self.find_best_source()
+        
         current_time = time.time()
         
         # 如果没有当前源，或者需要重新检查
@@ -177,70 +347,325 @@ class IntelligentDataSource:
         
         return self.current_source
     
-    def create_exchange_client(self):
-        """创建交易所客户端"""
+    def _fetch_ohlcv_from(self, source, symbol, timeframe, limit):
+        """从指定数据源获取K线，并记录延迟和健康状态"""
+        exchange = self.exchange_pool.get(source['exchange_id'], source['config'])
+        start_time = time.time()
+        try:
+            ohlcv = self.ohlcv_cache.fetch_ohlcv(exchange, source['name'], symbol, timeframe, limit=limit)
+        except Exception:
+            self.exchange_pool.record_failure(source['exchange_id'])
+            self.health_monitor.record(source, False)
+            raise
+        
+        latency = time.time() - start_time
+        self.fetch_latencies[source['exchange_id']].append(latency)
+        self.exchange_pool.record_success(source['exchange_id'])
+        self.health_monitor.record(source, True, latency)
+        return source, ohlcv
+    
+    def _get_hedge_delay(self, source):
+        """对冲等待时间：该数据源历史延迟的指定分位数"""
+        samples = sorted(self.fetch_latencies[source['exchange_id']])
+        if len(samples) < self.hedge_min_samples:
+            return self.hedge_default_delay
+        index = min(int(len(samples) * self.hedge_percentile), len(samples) - 1)
+        return max(samples[index], self.hedge_min_delay)
+    
+    def _get_hedge_source(self, primary):
+        """对冲请求使用的数据源：排名中主数据源之后的第一个可用数据源"""
+        if self.health_monitor.is_running():
+            candidates = self.health_monitor.get_ranking()
+        else:
+            candidates = sorted(self.data_sources, key=lambda x: x.get('response_time', float('inf')))
+        
+        for source in candidates:
+            if source is not primary and source.get('available', False):
+                return source
+        return None
+    
+    def fetch_ohlcv_hedged(self, symbol, timeframe, limit):
+        """对冲K线请求
+
+        先向主数据源请求；若在其历史延迟的 hedge_percentile 分位数内
+        没有返回，再向排名第二的数据源发出相同请求，采用先成功返回的
+        结果，另一个请求的结果被忽略。
+
+        Returns:
+            (数据源, K线列表)
+        """
+        primary = self.get_current_data_source()
+        if not primary:
+            raise Exception("没有可用的数据源")
+        
+        primary_future = self._fetch_executor.submit(self._fetch_ohlcv_from, primary, symbol, timeframe, limit)
+        if not self.hedge_enabled:
+            return primary_future.result()
+        
+        done, _ = wait([primary_future], timeout=self._get_hedge_delay(primary))
+        if done:
+            return primary_future.result()
+        
+        hedge_source = self._get_hedge_source(primary)
+        if not hedge_source:
+            return primary_future.result()
+        
+        print(f"🔀 {primary['name']} 响应过慢，向 {hedge_source['name']} 发出对冲请求")
+        pending = {
+            primary_future,
+            self._fetch_executor.submit(self._fetch_ohlcv_from, hedge_source, symbol, timeframe, limit),
+        }
+        
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+        raise last_error
+    
+    @staticmethod
+    def to_ccxt_symbol(symbol):
+        """把 BTCUSDT 形式的交易对转换为ccxt的 BTC/USDT 形式"""
+        if '/' in symbol:
+            return symbol
+        for quote in ('USDT', 'USDC', 'BUSD', 'USD'):
+            if symbol.endswith(quote) and len(symbol) > len(quote):
+                return f"{symbol[:-len(quote)]}/{quote}"
+        return symbol
+    
+    def _fetch_symbol_ohlcv(self, exchange, source_name, symbol, timeframe, limit):
+        """获取单个交易对的K线并写入本地存储"""
+        self.exchange_pool.throttle(exchange.id)
+        ohlcv = self.ohlcv_cache.fetch_ohlcv(exchange, source_name, symbol, timeframe, limit=limit)
+        self.persist_candles(exchange.id, symbol, timeframe, ohlcv)
+        return ohlcv
+    
+    @staticmethod
+    def build_basket_snapshots(ohlcv_by_symbol):
+        """把多个交易对的K线堆叠为 (交易对 × K线) 矩阵，一次向量化计算全部指标
+
+        K线数量相同的交易对放在同一个矩阵中（通常整个观察列表只有一组），
+        新上市等K线较少的交易对单独成组。
+
+        Returns:
+            {交易对: 市场数据快照（不含 symbol/timestamp/data_source 字段）}
+        """
+        groups = {}
+        for symbol, ohlcv in ohlcv_by_symbol.items():
+            if len(ohlcv) < 2:
+                print(f"⚠️ {symbol} K线不足2根（{len(ohlcv)} 根），无法生成市场数据快照")
+                continue
+            groups.setdefault(len(ohlcv), {})[symbol] = ohlcv
+        
+        snapshots = {}
+        for group in groups.values():
+            stacked = indicators.stack_ohlcv(group)
+            batch = indicators.compute_indicators_batch(stacked['close'], symbols=stacked['symbols'])
+            for symbol, technical_data in indicators.technical_data_batch(batch).items():
+                snapshots[symbol] = build_snapshot(group[symbol], technical_data)
+        return snapshots
+    
+    def get_market_data(self, symbols, timeframe='15m', limit=96):
+        """批量获取多个交易对的市场数据
+
+        报价通过一次 fetch_tickers 批量获取；各交易对的K线在有界线程池中
+        并发请求，发送间隔遵守交易所的 rateLimit；全部K线到齐后用二维矩阵
+        一次计算所有交易对的技术指标。
+
+        Returns:
+            {交易对: 市场数据快照}，获取失败的交易对不在结果中
+        """
         source = self.get_current_data_source()
+        if not source:
+            print("❌ 没有可用的数据源")
+            return {}
+        
+        source_name = source['name']
+        exchange = self.exchange_pool.get(source['exchange_id'], source['config'])
+        ccxt_symbols = [self.to_ccxt_symbol(symbol) for symbol in symbols]
+        print(f"📊 从 {source_name} 批量获取 {len(ccxt_symbols)} 个交易对的市场数据...")
+        
+        # 批量报价
+        tickers = {}
+        if exchange.has.get('fetchTickers'):
+            try:
+                self.exchange_pool.throttle(exchange.id)
+                tickers = exchange.fetch_tickers(ccxt_symbols)
+            except Exception as e:
+                print(f"⚠️ 批量获取报价失败: {e}")
+        
+        # 并发获取K线
+        ohlcv_by_symbol = {}
+        futures = {
+            self._symbol_executor.submit(self._fetch_symbol_ohlcv, exchange, source_name,
+                                         symbol, timeframe, limit): symbol
+            for symbol in ccxt_symbols
+        }
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                ohlcv_by_symbol[symbol] = future.result()
+            except SOURCE_FAILURE_ERRORS as e:
+                print(f"❌ {symbol} 市场数据获取失败（数据源故障）: {e}")
+                self.health_monitor.record(source, False)
+            except Exception as e:
+                print(f"❌ {symbol} 市场数据获取失败: {e}")
+        
+        # 批量计算指标
+        results = {}
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for symbol, result in self.build_basket_snapshots(ohlcv_by_symbol).items():
+            result['symbol'] = symbol
+            result['timestamp'] = timestamp
+            result['data_source'] = source_name
+            
+            ticker = tickers.get(symbol)
+            if ticker and ticker.get('last'):
+                result['price'] = float(ticker['last'])
+                result['ticker'] = {
+                    'last': ticker.get('last'),
+                    'bid': ticker.get('bid'),
+                    'ask': ticker.get('ask'),
+                    'quote_volume': ticker.get('quoteVolume'),
+                }
+            results[symbol] = result
+        
+        print(f"✅ 成功获取 {len(results)}/{len(ccxt_symbols)} 个交易对的市场数据")
+        return results
+    
+    def refresh_base_candles(self, symbol):
+        """增量刷新1分钟K线并推入重采样器
+
+        base_refresh_interval 秒内重复调用直接返回已有的重采样器，
+        因此同一轮中请求多个周期只会产生一次网络请求。
+        """
+        entry = self.resamplers.get(symbol)
+        now = time.time()
+        if entry and now - entry['refreshed_at'] < self.base_refresh_interval:
+            return entry['resampler']
         
+        source = self.get_current_data_source()
         if not source:
             raise Exception("没有可用的数据源")
         
-        try:
-            exchange_class = getattr(ccxt, source['exchange_id'])
-            exchange = exchange_class(source['config'])
-            
-            print(f"📡 使用数据源: {source['name']}")
-            return exchange, source['name']
-            
-        except Exception as e:
-            print(f"❌ 创建交易所客户端失败: {e}")
-            # 尝试下一个数据源
-            self.current_source['available'] = False
-            return self.create_exchange_client()
+        exchange = self.exchange_pool.get(source['exchange_id'], source['config'])
+        ohlcv = self.ohlcv_cache.fetch_ohlcv(exchange, source['name'], symbol, CandleResampler.BASE_TIMEFRAME, limit=96)
+        self.persist_candles(source['exchange_id'], symbol, CandleResampler.BASE_TIMEFRAME, ohlcv)
+        
+        if entry is None or entry['source']['exchange_id'] != source['exchange_id']:
+            # 新建或切换数据源时，用本地存储的1分钟历史重新初始化
+            resampler = CandleResampler(capacity=self.warmup_candles)
+            resampler.seed(self.load_history(source['exchange_id'], symbol, CandleResampler.BASE_TIMEFRAME,
+                                             self.resample_history))
+            entry = {'resampler': resampler, 'source': source}
+            self.resamplers[symbol] = entry
+        
+        entry['resampler'].ingest(ohlcv)
+        entry['refreshed_at'] = now
+        return entry['resampler']
+    
+    def get_timeframe_candles(self, symbol, timeframe, limit=96):
+        """获取由1分钟K线本地合成的指定周期K线（最后一根可能未收盘）"""
+        resampler = self.refresh_base_candles(symbol)
+        return resampler.get_candles(timeframe, limit)
+    
+    def get_timeframe_data(self, symbol, timeframes=('15m', '1h', '4h')):
+        """获取多个周期的市场数据快照，全部周期共用一次1分钟K线请求
+
+        交易主循环目前只使用15分钟K线，不调用本方法；多周期数据供脚本和
+        后续的多周期分析按需使用。
+
+        Returns:
+            {周期: 市场数据快照}
+        """
+        resampler = self.refresh_base_candles(symbol)
+        source = self.resamplers[symbol]['source']
+        
+        results = {}
+        for timeframe in timeframes:
+            candles = resampler.get_candles(timeframe)
+            engine = self.get_indicator_engine(source['exchange_id'], symbol, timeframe)
+            engine.ingest(candles)
+            snapshot = engine.snapshot()
+            if snapshot:
+                snapshot['timeframe'] = timeframe
+                snapshot['partial'] = resampler.is_partial(timeframe)
+                snapshot['data_source'] = source['name']
+                results[timeframe] = snapshot
+        return results
+    
+    def enable_stream(self, url=DEFAULT_STREAM_URL, symbol='BTCUSDT', interval='15m',
+                      exchange_id='binance'):
+        """启用WebSocket实时行情，启用后 get_btc_market_data 优先读取内存快照
+
+        exchange_id 为行情流所属交易所，断线重连后只用该交易所的REST K线
+        重新同步，避免把其他交易所的K线和推送拼接到同一序列中
+        """
+        self.stream_source = next(source for source in self.data_sources
+                                  if source['exchange_id'] == exchange_id)
+        self.market_stream = MarketDataStream(url, symbol, interval, name=f"{self.stream_source['name']} WebSocket")
+        self.market_stream.start()
+        return self.market_stream
+    
+    def get_stream_market_data(self):
+        """从WebSocket行情流读取快照，行情不可用时返回None"""
+        stream = self.market_stream
+        if not stream:
+            return None
+        
+        if stream.connected and stream.needs_resync:
+            # 首次连接或重连后用同一交易所的REST数据补齐K线（不走对冲，避免混入其他交易所）
+            source = self.stream_source
+            symbol = self.to_ccxt_symbol(stream.symbol)
+            try:
+                _, ohlcv = self._fetch_ohlcv_from(source, symbol, stream.interval, 96)
+                self.persist_candles(source['exchange_id'], symbol, stream.interval, ohlcv)
+                history = self.load_history(source['exchange_id'], symbol, stream.interval, self.warmup_candles)
+                stream.seed(history if history and history[-1][0] == ohlcv[-1][0] else ohlcv)
+                print(f"🔄 已用 {source['name']} 的K线同步WebSocket行情")
+            except Exception as e:
+                print(f"⚠️ WebSocket行情同步失败: {e}")
+                return None
+        
+        if not stream.is_fresh(self.stream_max_age):
+            return None
+        return stream.snapshot()
     
     def get_btc_market_data(self):
         """获取BTC市场数据"""
+        # 优先使用WebSocket行情快照（无网络往返）
+        result = self.get_stream_market_data()
+        if result:
+            print(f"⚡ 使用WebSocket实时行情: ${result['price']:,.2f} ({result['price_change']:+.2f}%)")
+            return result
+        
         max_retries = 2  # 减少重试次数，避免浪费时间
         
         for attempt in range(max_retries):
             try:
-                exchange, source_name = self.create_exchange_client()
-                
-                print(f"📊 从 {source_name} 获取BTC市场数据...")
-                
-                # 获取K线数据
-                ohlcv = exchange.fetch_ohlcv('BTC/USDT', '15m', limit=96)
-                print(f"✅ 成功获取{len(ohlcv)}条K线数据")
+                print("📊 获取BTC市场数据...")
                 
-                # 创建DataFrame
-                df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+                # 获取K线数据（主数据源过慢时自动对冲到次优数据源）
+                source, ohlcv = self.fetch_ohlcv_hedged('BTC/USDT', '15m', 96)
+                source_name = source['name']
+                print(f"✅ 从 {source_name} 成功获取{len(ohlcv)}条K线数据")
                 
-                # 计算技术指标
-                df = self.calculate_technical_indicators(df)
+                # 写入本地K线存储（只追加新K线）
+                self.persist_candles(source['exchange_id'], 'BTC/USDT', '15m', ohlcv)
                 
-                current_data = df.iloc[-1]
-                previous_data = df.iloc[-2]
+                # 增量更新技术指标（同一数据源的引擎只在首次或出现缺口时重新初始化）
+                engine = self.get_indicator_engine(source['exchange_id'], 'BTC/USDT', '15m')
+                engine.ingest(ohlcv)
                 
-                result = {
-                    'price': float(current_data['close']),
-                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'high': float(current_data['high']),
-                    'low': float(current_data['low']),
-                    'volume': float(current_data['volume']),
-                    'price_change': float(((current_data['close'] - previous_data['close']) / previous_data['close']) * 100),
-                    'technical_data': {
-                        'sma_5': float(current_data.get('sma_5', 0)),
-                        'sma_20': float(current_data.get('sma_20', 0)),
-                        'sma_50': float(current_data.get('sma_50', 0)),
-                        'rsi': float(current_data.get('rsi', 0)),
-                        'macd': float(current_data.get('macd', 0)),
-                        'macd_signal': float(current_data.get('macd_signal', 0)),
-                        'bb_upper': float(current_data.get('bb_upper', 0)),
-                        'bb_lower': float(current_data.get('bb_lower', 0)),
-                    },
-                    'kline_data': df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].tail(5).to_dict('records'),
-                    'data_source': source_name
-                }
+                result = engine.snapshot()
+                if result is None:
+                    print(f"❌ {source_name} 返回的K线不足2根（{len(ohlcv)} 根），无法计算市场数据")
+                    return None
+                result['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                result['data_source'] = source_name
                 
                 print(f"🎯 数据来源: {source_name}")
                 print(f"💎 BTC价格: ${result['price']:,.2f} ({result['price_change']:+.2f}%)")
@@ -260,38 +685,6 @@ class IntelligentDataSource:
                     print("❌ 所有数据源都失败")
                     return None
     
-    def calculate_technical_indicators(self, df):
-        """计算技术指标"""
-        try:
-            # 移动平均线
-            df['sma_5'] = df['close'].rolling(window=5, min_periods=1).mean()
-            df['sma_20'] = df['close'].rolling(window=20, min_periods=1).mean()
-            df['sma_50'] = df['close'].rolling(window=50, min_periods=1).mean()
-
-            # RSI
-            delta = df['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-            rs = gain / loss
-            df['rsi'] = 100 - (100 / (1 + rs))
-
-            # MACD
-            df['ema_12'] = df['close'].ewm(span=12).mean()
-            df['ema_26'] = df['close'].ewm(span=26).mean()
-            df['macd'] = df['ema_12'] - df['ema_26']
-            df['macd_signal'] = df['macd'].ewm(span=9).mean()
-
-            # 布林带
-            df['bb_middle'] = df['close'].rolling(20).mean()
-            bb_std = df['close'].rolling(20).std()
-            df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
-            df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
-
-            return df.bfill().ffill()
-        except Exception as e:
-            print(f"技术指标计算失败: {e}")
-            return df
-    
     def get_status_report(self):
         """获取数据源状态报告"""
         print("\n📊 数据源状态报告")
@@ -300,6 +693,9 @@ class IntelligentDataSource:
         for source in self.data_sources:
             status = "✅ 可用" if source.get('available', False) else "❌ 不可用"
             response_time = source.get('response_time', 0)
+            ewma_latency = source.get('ewma_latency') or 0
+            error_rate = source.get('error_rate', 0)
+            circuit_state = source.get('circuit_state', CircuitBreaker.CLOSED)
             last_test = source.get('last_test_time', 0)
             
             if last_test > 0:
@@ -307,7 +703,8 @@ class IntelligentDataSource:
             else:
                 last_test_time = "未测试"
             
-            print(f"{source['name']:10} | {status:8} | 响应: {response_time:5.2f}s | 测试: {last_test_time}")
+            print(f"{source['name']:10} | {status:8} | 响应: {response_time:5.2f}s | "
+                  f"EWMA: {ewma_latency:5.2f}s | 错误率: {error_rate:4.0%} | 熔断: {circuit_state:9} | 测试: {last_test_time}")
         
         print("=" * 50)
         if self.current_source:
@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI分析调用辅助模块
+- 在工作线程中执行LLM请求并施加截止时间，超时立即返回，迟到的结果交给回调记录
+- 解析模型回复中的JSON交易信号
+- 基于技术指标的确定性规则信号，作为AI不可用时的兜底
+- 多交易对批量分析：紧凑特征行打包进一次请求，按token预算自动拆分
+- 流式回复的增量JSON解析：signal 和 confidence 一到达即可决策
+- 多模型集成：并发询问多个模型，按信心度加权投票，达到法定人数即返回
+"""
+
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed, wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+VALID_SIGNALS = ('BUY', 'SELL', 'HOLD')
+VALID_CONFIDENCE = ('HIGH', 'MEDIUM', 'LOW')
+
+
+class LLMDeadlineExceeded(Exception):
+    """LLM请求超过截止时间"""
+
+
+class DeadlineRunner:
+    """带截止时间的LLM调用执行器
+
+    请求在独立线程中执行，调用方最多等待 deadline 秒。超时后请求
+    不会被取消（HTTP请求无法安全中断），完成时把结果和实际耗时交给
+    on_late 回调，便于事后评估AI信号与兜底信号的差异。
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'timeouts': 0, 'late_results': 0}
+
+    def run(self, func: Callable, deadline: float, *args,
+            on_late: Optional[Callable] = None, **kwargs):
+        """执行 func(*args, **kwargs)，超过 deadline 秒抛出 LLMDeadlineExceeded"""
+        start = time.time()
+        future = self._executor.submit(func, *args, **kwargs)
+        with self._lock:
+            self.stats['calls'] += 1
+        try:
+            return future.result(timeout=deadline)
+        except FuturesTimeoutError:
+            self._attach_late(future, start, on_late)
+            raise LLMDeadlineExceeded(f"LLM请求超过 {deadline} 秒未返回")
+
+    def submit(self, func: Callable, *args, **kwargs):
+        """提交请求并返回 Future，由调用方自行决定等待方式"""
+        with self._lock:
+            self.stats['calls'] += 1
+        return self._executor.submit(func, *args, **kwargs)
+
+    def run_each(self, func: Callable, calls: Sequence[Dict], deadline: float,
+                 on_late: Optional[Callable] = None) -> List:
+        """并发执行多次 func(**kwargs)，共享同一个截止时间
+
+        Returns:
+            与 calls 顺序对应的结果列表，超时或失败的位置为 None；
+            超时的请求完成后以 on_late(序号, 结果, 耗时) 回调
+        """
+        start = time.time()
+        futures = [self._executor.submit(func, **kwargs) for kwargs in calls]
+        with self._lock:
+            self.stats['calls'] += len(futures)
+        done, _ = wait(futures, timeout=deadline)
+
+        results = []
+        for index, future in enumerate(futures):
+            if future not in done:
+                self._attach_late(future, start, on_late and (
+                    lambda result, latency, index=index: on_late(index, result, latency)))
+                results.append(None)
+            elif future.exception() is not None:
+                print(f"⚠️ 第{index + 1}个LLM请求失败: {future.exception()}")
+                results.append(None)
+            else:
+                results.append(future.result())
+        return results
+
+    def _attach_late(self, future, start: float, on_late: Optional[Callable]):
+        """超时的请求完成后记录迟到结果"""
+        with self._lock:
+            self.stats['timeouts'] += 1
+
+        def _on_done(done):
+            latency = time.time() - start
+            if done.exception() is not None:
+                print(f"⚠️ 超时的LLM请求最终失败 ({latency:.1f}秒): {done.exception()}")
+                return
+            with self._lock:
+                self.stats['late_results'] += 1
+            if on_late:
+                try:
+                    on_late(done.result(), latency)
+                except Exception as e:
+                    print(f"⚠️ 迟到结果处理失败: {e}")
+
+        future.add_done_callback(_on_done)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def timed_call(func: Callable, on_error: Optional[Callable] = None) -> Callable:
+    """包装LLM请求函数，返回 (结果, 本次请求耗时)
+
+    耗时在工作线程内单独计时，并发请求之间互不影响；请求抛出异常时
+    先以 on_error(异常, 耗时) 回调再向上抛出。
+    """
+    def wrapper(*args, **kwargs):
+        start = time.time()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if on_error:
+                on_error(e, time.time() - start)
+            raise
+        return result, time.time() - start
+    return wrapper
+
+
+class IncrementalJSONParser:
+    """增量解析JSON对象的顶层字段
+
+    每次 feed 一段文本，返回本次新完成的顶层字段名。字符串值在闭合引号处
+    立即完成，其他值在随后的逗号或右花括号处完成；第一个左花括号之前的
+    文本（如 ```json）会被忽略。
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.fields: Dict = {}
+        self.complete = False
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._state = 'key'  # key -> colon -> value -> comma
+        self._token_start: Optional[int] = None
+        self._key: Optional[str] = None
+
+    def feed(self, chunk: str) -> List[str]:
+        self.text += chunk
+        completed: List[str] = []
+        text = self.text
+        while self._pos < len(text) and not self.complete:
+            index = self._pos
+            char = text[index]
+            self._pos += 1
+
+            if not self._started:
+                if char == '{':
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._state == 'key':
+                        self._key = json.loads(text[self._token_start:index + 1])
+                        self._state = 'colon'
+                    elif self._depth == 1 and self._state == 'value':
+                        self._finish_value(index + 1, completed)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._state in ('key', 'value') and self._token_start is None:
+                    self._token_start = index
+            elif char in '{[':
+                if self._depth == 1 and self._state == 'value' and self._token_start is None:
+                    self._token_start = index
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    if self._state == 'value' and self._token_start is not None:
+                        self._finish_value(index, completed)
+                    self.complete = True
+            elif self._depth == 1:
+                if char == ':' and self._state == 'colon':
+                    self._state = 'value'
+                    self._token_start = None
+                elif char == ',':
+                    if self._state == 'value' and self._token_start is not None:
+                        self._finish_value(index, completed)
+                    self._state = 'key'
+                    self._token_start = None
+                elif self._state == 'value' and self._token_start is None and not char.isspace():
+                    self._token_start = index
+        return completed
+
+    def _finish_value(self, end: int, completed: List[str]):
+        raw = self.text[self._token_start:end].strip()
+        try:
+            self.fields[self._key] = json.loads(raw)
+        except json.JSONDecodeError:
+            self.fields[self._key] = raw
+        completed.append(self._key)
+        self._state = 'comma'
+        self._token_start = None
+
+
+class StreamingSignal:
+    """流式接收一次分析回复
+
+    在工作线程中调用 consume 读取流；signal 和 confidence 都到达时
+    decided 事件被置位，调用方可以据此提前决策，其余字段继续在后台补全，
+    流结束时 finished 被置位。
+    """
+
+    DECISION_FIELDS = ('signal', 'confidence')
+
+    def __init__(self):
+        self.parser = IncrementalJSONParser()
+        self.decided = threading.Event()
+        self.finished = threading.Event()
+        self.start_time = time.time()
+        self.first_token_latency: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.usage_chunk = None
+        self.model: Optional[str] = None
+
+    def consume(self, create: Callable, **kwargs) -> 'StreamingSignal':
+        """create 为 chat.completions.create，kwargs 为请求参数"""
+        try:
+            stream = create(stream=True, stream_options={'include_usage': True}, **kwargs)
+            for chunk in stream:
+                self.model = getattr(chunk, 'model', None) or self.model
+                if getattr(chunk, 'usage', None):
+                    self.usage_chunk = chunk
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if not content:
+                    continue
+                if self.first_token_latency is None:
+                    self.first_token_latency = time.time() - self.start_time
+                self.parser.feed(content)
+                if self.is_decided():
+                    self.decided.set()
+            return self
+        finally:
+            self.latency = time.time() - self.start_time
+            self.finished.set()
+            self.decided.set()
+
+    @property
+    def fields(self) -> Dict:
+        return self.parser.fields
+
+    @property
+    def text(self) -> str:
+        return self.parser.text
+
+    def is_decided(self) -> bool:
+        fields = self.parser.fields
+        return (str(fields.get('signal', '')).upper() in VALID_SIGNALS
+                and str(fields.get('confidence', '')).upper() in VALID_CONFIDENCE)
+
+    def result(self) -> Optional[Dict]:
+        """流结束后的完整信号（已校验），解析失败返回None"""
+        return validate_signal(self.parser.fields) or validate_signal(parse_signal_json(self.parser.text))
+
+
+def parse_signal_json(text: str) -> Optional[Dict]:
+    """从模型回复中提取JSON信号，失败返回None"""
+    if not text:
+        return None
+    start_idx = text.find('{')
+    end_idx = text.rfind('}') + 1
+    if start_idx == -1 or end_idx == 0:
+        return None
+    try:
+        return json.loads(text[start_idx:end_idx])
+    except json.JSONDecodeError:
+        return None
+
+
+def extract_usage(response) -> Dict[str, int]:
+    """读取响应中的token用量
+
+    cached_tokens 兼容 DeepSeek 的 prompt_cache_hit_tokens 和 OpenAI 的
+    prompt_tokens_details.cached_tokens 两种字段。
+    """
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return {'prompt_tokens': 0, 'completion_tokens': 0, 'cached_tokens': 0}
+
+    cached = getattr(usage, 'prompt_cache_hit_tokens', None)
+    if cached is None:
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached = getattr(details, 'cached_tokens', None) if details is not None else None
+    if cached is None and hasattr(usage, 'model_extra') and usage.model_extra:
+        cached = usage.model_extra.get('prompt_cache_hit_tokens')
+    return {
+        'prompt_tokens': getattr(usage, 'prompt_tokens', 0) or 0,
+        'completion_tokens': getattr(usage, 'completion_tokens', 0) or 0,
+        'cached_tokens': cached or 0,
+    }
+
+
+def validate_signal(data) -> Optional[Dict]:
+    """校验并规范化单个信号，字段缺失或取值非法时返回None"""
+    if not isinstance(data, dict):
+        return None
+    signal = str(data.get('signal', '')).upper()
+    confidence = str(data.get('confidence', '')).upper()
+    if signal not in VALID_SIGNALS or confidence not in VALID_CONFIDENCE:
+        return None
+    try:
+        stop_loss = float(data.get('stop_loss') or 0)
+        take_profit = float(data.get('take_profit') or 0)
+    except (TypeError, ValueError):
+        return None
+    return dict(data, signal=signal, confidence=confidence, stop_loss=stop_loss,
+                take_profit=take_profit, reason=str(data.get('reason', '')))
+
+
+def estimate_tokens(text: str) -> int:
+    """本地估算token数：中日韩字符约0.6个token，其余字符约0.3个token"""
+    cjk = sum(1 for char in text if '\u2e80' <= char <= '\u9fff' or '\uf900' <= char <= '\ufaff')
+    return int(math.ceil(cjk * 0.6 + (len(text) - cjk) * 0.3))
+
+
+BATCH_COLUMNS = 'symbol,price,change_pct,rsi,macd,macd_signal'
+
+# 固定前缀（可命中服务端前缀缓存），可变的表格和交易模式放在user消息中
+BATCH_SYSTEM_PROMPT = """你是专业的加密货币交易分析师，根据用户提供的多个交易对的技术指标分别给出交易信号。
+
+用户消息包含一个CSV表格，表头: {columns}，之后是交易模式和最低信心度要求。
+
+只返回一个JSON数组，表中每个交易对一个元素，不要输出任何其他文字，格式：
+[{{"symbol": "交易对", "signal": "BUY|SELL|HOLD", "confidence": "HIGH|MEDIUM|LOW", "reason": "简要理由", "stop_loss": 价格, "take_profit": 价格}}]
+证据不足时输出HOLD；BUY的止损低于当前价格，SELL的止损高于当前价格。""".format(columns=BATCH_COLUMNS)
+
+BATCH_SUFFIX = """{columns}
+{rows}
+mode={trading_mode}
+min_confidence={min_confidence}"""
+
+
+def batch_row(symbol: str, price_data: Dict) -> str:
+    """单个交易对的紧凑特征行"""
+    technical = price_data['technical_data']
+    return (f"{symbol},{price_data['price']:.6g},{price_data['price_change']:.2f},"
+            f"{technical['rsi']:.1f},{technical['macd']:.6g},{technical['macd_signal']:.6g}")
+
+
+def build_batch_messages(rows: Sequence[str], trading_mode: str, min_confidence: str) -> List[Dict]:
+    """把多行特征打包成一次请求的消息"""
+    content = BATCH_SUFFIX.format(columns=BATCH_COLUMNS, rows='\n'.join(rows),
+                                  trading_mode=trading_mode, min_confidence=min_confidence)
+    return [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": content},
+    ]
+
+
+def split_batches(rows: Sequence[str], token_budget: int, trading_mode: str = '',
+                  min_confidence: str = '', output_tokens_per_row: int = 80) -> List[List[str]]:
+    """按token预算把特征行分组
+
+    每组的提示词加上预计输出（每个交易对约 output_tokens_per_row 个token）
+    不超过预算；单行本身就超出预算时单独成组。
+    """
+    base_tokens = sum(estimate_tokens(message['content'])
+                      for message in build_batch_messages([], trading_mode, min_confidence))
+    batches: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = base_tokens
+    for row in rows:
+        row_tokens = estimate_tokens(row) + 1 + output_tokens_per_row
+        if current and current_tokens + row_tokens > token_budget:
+            batches.append(current)
+            current, current_tokens = [], base_tokens
+        current.append(row)
+        current_tokens += row_tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_signals(text: str, symbols: Sequence[str]) -> Dict[str, Dict]:
+    """解析批量回复中的JSON数组，返回 {交易对: 信号}
+
+    只保留请求中出现过、字段合法的交易对；缺失或非法的交易对不在结果中。
+    """
+    if not text:
+        return {}
+    start_idx = text.find('[')
+    end_idx = text.rfind(']') + 1
+    items = None
+    if start_idx != -1 and end_idx != 0:
+        try:
+            items = json.loads(text[start_idx:end_idx])
+        except json.JSONDecodeError:
+            items = None
+    if items is None:
+        wrapper = parse_signal_json(text)
+        items = wrapper.get('signals') if isinstance(wrapper, dict) else None
+    if not isinstance(items, list):
+        return {}
+
+    wanted = {symbol.upper(): symbol for symbol in symbols}
+    results = {}
+    for item in items:
+        signal = validate_signal(item)
+        if not signal:
+            continue
+        symbol = wanted.get(str(item.get('symbol', '')).upper())
+        if symbol and symbol not in results:
+            results[symbol] = signal
+    return results
+
+
+def rule_based_signal(price_data: Dict, reason: str = '规则信号') -> Dict:
+    """基于RSI和MACD的确定性信号
+
+    - RSI超卖（<30）且MACD在信号线上方：BUY
+    - RSI超买（>70）且MACD在信号线下方：SELL
+    - 其余情况：HOLD
+    信心度固定为LOW，只有最低信心度要求为LOW时才会据此开仓。
+    """
+    technical = price_data['technical_data']
+    price = float(price_data['price'])
+    rsi = technical.get('rsi', 50)
+    bullish = technical.get('macd', 0) > technical.get('macd_signal', 0)
+
+    if rsi < 30 and bullish:
+        signal, stop_loss, take_profit = 'BUY', price * 0.98, price * 1.02
+        detail = f"RSI超卖({rsi:.1f})且MACD在信号线上方"
+    elif rsi > 70 and not bullish:
+        signal, stop_loss, take_profit = 'SELL', price * 1.02, price * 0.98
+        detail = f"RSI超买({rsi:.1f})且MACD在信号线下方"
+    else:
+        signal, stop_loss, take_profit = 'HOLD', price * 0.98, price * 1.02
+        detail = f"RSI {rsi:.1f}，MACD{'多头' if bullish else '空头'}，无明确信号"
+
+    return {
+        'signal': signal,
+        'reason': f"{reason}: {detail}",
+        'stop_loss': stop_loss,
+        'take_profit': take_profit,
+        'confidence': 'LOW',
+        'timestamp': price_data.get('timestamp'),
+    }
+
+
+CONFIDENCE_WEIGHTS = {'HIGH': 3, 'MEDIUM': 2, 'LOW': 1}
+
+
+def parse_ensemble_members(spec: str, default_model: str = 'deepseek-chat') -> List[Dict]:
+    """解析集成成员配置
+
+    逗号分隔，每个成员为 模型@温度[@API地址]，如
+    "deepseek-chat@0.1,deepseek-chat@0.7,deepseek-reasoner@0"；
+    省略API地址时使用默认客户端。
+    """
+    members = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        parts = item.split('@', 2)
+        members.append({
+            'model': parts[0] or default_model,
+            'temperature': float(parts[1]) if len(parts) > 1 and parts[1] else 0.1,
+            'base_url': parts[2] if len(parts) > 2 and parts[2] else None,
+        })
+    return members
+
+
+def tally_votes(votes: Sequence[Dict]) -> Dict[str, float]:
+    """按信心度加权统计各信号的票数（HIGH=3, MEDIUM=2, LOW=1）"""
+    tally = {signal: 0.0 for signal in VALID_SIGNALS}
+    for vote in votes:
+        tally[vote['signal']] += CONFIDENCE_WEIGHTS.get(vote['confidence'], 1)
+    return tally
+
+
+def quorum_signal(votes: Sequence[Dict], quorum: int) -> Optional[str]:
+    """已有 quorum 个成员给出同一信号且该信号加权票数领先时返回该信号"""
+    tally = tally_votes(votes)
+    for signal in VALID_SIGNALS:
+        agreeing = sum(1 for vote in votes if vote['signal'] == signal)
+        if agreeing >= quorum and all(tally[signal] > score for other, score in tally.items() if other != signal):
+            return signal
+    return None
+
+
+def combine_votes(votes: Sequence[Dict], members: int) -> Optional[Dict]:
+    """按信心度加权投票合并多个成员的信号
+
+    - 加权票数最高的信号胜出，并列时保守地输出HOLD
+    - 信心度取胜出方成员的平均权重；收到的票不一致时再降一级
+    - 止损止盈取胜出方成员的中位数
+    """
+    if not votes:
+        return None
+    tally = tally_votes(votes)
+    best = max(tally.values())
+    leaders = [signal for signal, score in tally.items() if score == best]
+    signal = leaders[0] if len(leaders) == 1 else 'HOLD'
+    agreeing = [vote for vote in votes if vote['signal'] == signal]
+
+    if agreeing:
+        weight = round(sum(CONFIDENCE_WEIGHTS.get(vote['confidence'], 1) for vote in agreeing) / len(agreeing))
+        if len(agreeing) < len(votes):
+            weight -= 1
+        confidence = {3: 'HIGH', 2: 'MEDIUM'}.get(weight, 'LOW')
+        stop_loss = sorted(vote['stop_loss'] for vote in agreeing)[len(agreeing) // 2]
+        take_profit = sorted(vote['take_profit'] for vote in agreeing)[len(agreeing) // 2]
+        lead = max(agreeing, key=lambda vote: CONFIDENCE_WEIGHTS.get(vote['confidence'], 1))
+        reason = lead['reason']
+    else:
+        # 并列且没有成员投HOLD：沿用第一个成员的止损止盈
+        confidence, stop_loss, take_profit = 'LOW', votes[0]['stop_loss'], votes[0]['take_profit']
+        reason = '成员意见分歧'
+
+    summary = ', '.join(f"{vote.get('member', '?')}={vote['signal']}/{vote['confidence']}" for vote in votes)
+    return {
+        'signal': signal,
+        'confidence': confidence,
+        'reason': f"{reason}（集成投票 {len(agreeing)}/{members}: {summary}）",
+        'stop_loss': stop_loss,
+        'take_profit': take_profit,
+        'votes': {key: value for key, value in tally.items() if value},
+    }
+
+
+def run_ensemble(runner: DeadlineRunner, calls: Sequence[Callable], deadline: float,
+                 quorum: int) -> Tuple[List[Dict], bool]:
+    """并发执行各成员的请求，达到法定人数或截止时间即返回
+
+    calls 中每个函数返回已校验的信号（失败返回None），未完成的请求继续在
+    后台运行，由函数自身负责记录。
+
+    Returns:
+        (已收到的有效信号列表, 是否因达到法定人数提前返回)
+    """
+    futures = [runner.submit(call) for call in calls]
+    votes: List[Dict] = []
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            if future.exception() is not None:
+                print(f"⚠️ 集成成员请求失败: {future.exception()}")
+                continue
+            vote = future.result()
+            if vote is None:
+                continue
+            votes.append(vote)
+            if quorum_signal(votes, quorum):
+                return votes, True
+    except FuturesTimeoutError:
+        pass
+    return votes, False
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI分析链路压测
+对LLM替身服务器（或任何OpenAI兼容地址）并发发起大量分析请求，走与交易机器人
+相同的提示词构建、截止时间、流式提前决策、JSON解析和规则兜底逻辑，
+统计决策延迟分位数以及超时/解析失败/请求失败的比例。
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+from openai import OpenAI
+
+from llm_analyzer import (DeadlineRunner, LLMDeadlineExceeded, StreamingSignal, extract_usage,
+                          parse_signal_json, rule_based_signal, validate_signal)
+from llm_stub_server import add_server_arguments, server_from_args
+from prompt_builder import build_analysis_messages, build_compact_messages
+
+
+def random_price_data(rng: random.Random) -> Dict:
+    """随机行情快照，覆盖超买、超卖和中性区间"""
+    price = rng.uniform(20000, 120000)
+    macd_signal = rng.gauss(0, price * 5e-4)
+    closes = [price * (1 + rng.gauss(0, 0.003) * (5 - i)) for i in range(5)]
+    return {
+        'price': price,
+        'price_change': rng.gauss(0, 0.8),
+        'technical_data': {
+            'rsi': rng.uniform(10, 90),
+            'macd': macd_signal + rng.gauss(0, price * 2e-4),
+            'macd_signal': macd_signal,
+            'sma_5': price * rng.uniform(0.99, 1.01),
+            'sma_20': price * rng.uniform(0.97, 1.03),
+            'sma_50': price * rng.uniform(0.95, 1.05),
+            'bb_upper': price * rng.uniform(1.005, 1.03),
+            'bb_lower': price * rng.uniform(0.97, 0.995),
+        },
+        'kline_data': [{'open': close * 0.999, 'high': close * 1.002, 'low': close * 0.997, 'close': close,
+                        'volume': rng.uniform(100, 2000)} for close in closes],
+    }
+
+
+class LoadTest:
+    """并发驱动分析调用并汇总结果"""
+
+    def __init__(self, base_url: str, deadline: float, stream: bool, http_timeout: float,
+                 max_retries: int, runner_workers: int, model: str = 'deepseek-chat',
+                 prompt_format: str = 'kv', token_budget: Optional[int] = None):
+        self.client = OpenAI(api_key='stub', base_url=base_url, timeout=http_timeout, max_retries=max_retries)
+        self.runner = DeadlineRunner(max_workers=runner_workers)
+        self.deadline = deadline
+        self.stream = stream
+        self.model = model
+        self.prompt_format = prompt_format
+        self.token_budget = token_budget
+        self._lock = threading.Lock()
+        self.records: List[Dict] = []
+
+    def _request_kwargs(self, price_data: Dict) -> Dict:
+        if self.prompt_format == 'compact':
+            messages, _ = build_compact_messages(price_data, '模拟交易', 'MEDIUM', self.token_budget)
+        else:
+            messages = build_analysis_messages(price_data, '模拟交易', 'MEDIUM')
+        return {
+            'model': self.model,
+            'messages': messages,
+            'temperature': 0.1,
+            'max_tokens': 500,
+        }
+
+    def analyze(self, price_data: Dict) -> Dict:
+        """单次分析，返回 {'outcome', 'latency', 'signal', ...}"""
+        start = time.time()
+        try:
+            if self.stream:
+                record = self._analyze_streaming(price_data, start)
+            else:
+                record = self._analyze_blocking(price_data, start)
+        except LLMDeadlineExceeded:
+            record = {'outcome': 'timeout', 'signal': rule_based_signal(price_data, 'AI分析超时')['signal']}
+        except Exception as e:
+            record = {'outcome': 'error', 'signal': 'HOLD', 'error': type(e).__name__}
+        record['latency'] = time.time() - start
+        with self._lock:
+            self.records.append(record)
+        return record
+
+    def _analyze_blocking(self, price_data: Dict, start: float) -> Dict:
+        response = self.runner.run(self.client.chat.completions.create, self.deadline,
+                                   **self._request_kwargs(price_data))
+        usage = extract_usage(response)
+        signal = validate_signal(parse_signal_json(response.choices[0].message.content))
+        if signal is None:
+            return {'outcome': 'parse_fail', 'signal': 'HOLD', 'usage': usage}
+        return {'outcome': 'ai', 'signal': signal['signal'], 'usage': usage}
+
+    def _analyze_streaming(self, price_data: Dict, start: float) -> Dict:
+        session = StreamingSignal()
+        future = self.runner.submit(session.consume, self.client.chat.completions.create,
+                                    **self._request_kwargs(price_data))
+        if not session.decided.wait(timeout=self.deadline):
+            raise LLMDeadlineExceeded(f"流式分析超过 {self.deadline} 秒未给出信号")
+
+        if not session.is_decided():
+            # 流已结束但没有信号：区分请求失败和回复无法解析
+            # （finished 在 consume 的 finally 中置位，Future 随后才完成）
+            if future.exception(timeout=1.0) is not None:
+                raise future.exception()
+            signal = session.result()
+            if signal is None:
+                return {'outcome': 'parse_fail', 'signal': 'HOLD', 'ttft': session.first_token_latency}
+            return {'outcome': 'ai', 'signal': signal['signal'], 'ttft': session.first_token_latency}
+
+        decided_latency = time.time() - start
+        signal = str(session.fields['signal']).upper()
+        if signal != 'HOLD':
+            # 可交易信号需要止损止盈，等待流结束（仍受截止时间约束）
+            if not session.finished.wait(timeout=max(0.0, self.deadline - decided_latency)):
+                raise LLMDeadlineExceeded("流式分析未在截止时间内给出止损止盈")
+        return {'outcome': 'ai', 'signal': signal, 'ttft': session.first_token_latency,
+                'decided': decided_latency}
+
+    def run(self, calls: int, concurrency: int, seed: int = 42) -> Dict:
+        rng = random.Random(seed)
+        snapshots = [random_price_data(rng) for _ in range(calls)]
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='load') as pool:
+            list(pool.map(self.analyze, snapshots))
+        elapsed = time.time() - start
+        return self.summarize(elapsed)
+
+    def summarize(self, elapsed: float) -> Dict:
+        records = list(self.records)
+        outcomes: Dict[str, int] = {}
+        for record in records:
+            outcomes[record['outcome']] = outcomes.get(record['outcome'], 0) + 1
+
+        latencies = np.array([record['latency'] for record in records]) if records else np.zeros(1)
+        ttfts = np.array([record['ttft'] for record in records if record.get('ttft') is not None])
+        prompt_tokens = sum(record.get('usage', {}).get('prompt_tokens', 0) for record in records)
+        cached_tokens = sum(record.get('usage', {}).get('cached_tokens', 0) for record in records)
+        return {
+            'calls': len(records),
+            'elapsed': elapsed,
+            'throughput': len(records) / elapsed if elapsed else 0.0,
+            'outcomes': outcomes,
+            'latency': {f"p{q}": float(np.percentile(latencies, q)) for q in (50, 95, 99)},
+            'ttft': {f"p{q}": float(np.percentile(ttfts, q)) for q in (50, 95, 99)} if ttfts.size else {},
+            'cache_ratio': cached_tokens / prompt_tokens if prompt_tokens else 0.0,
+            'runner': dict(self.runner.stats),
+        }
+
+
+def print_summary(summary: Dict):
+    print(f"\n📊 压测结果: {summary['calls']} 次分析，耗时 {summary['elapsed']:.1f}秒，"
+          f"吞吐 {summary['throughput']:.1f} 次/秒")
+    for outcome, count in sorted(summary['outcomes'].items()):
+        print(f"   {outcome:<10} {count:>6} ({count / summary['calls']:.1%})")
+    latency = summary['latency']
+    print(f"   决策延迟  p50 {latency['p50']:.2f}s  p95 {latency['p95']:.2f}s  p99 {latency['p99']:.2f}s")
+    if summary['ttft']:
+        ttft = summary['ttft']
+        print(f"   首token   p50 {ttft['p50']:.2f}s  p95 {ttft['p95']:.2f}s  p99 {ttft['p99']:.2f}s")
+    if summary['cache_ratio']:
+        print(f"   前缀缓存命中率 {summary['cache_ratio']:.1%}")
+    print(f"   执行器统计 {summary['runner']}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='AI分析链路压测')
+    parser.add_argument('--url', help='已运行的OpenAI兼容服务地址；不指定则在本进程内启动替身服务器')
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--deadline', type=float, default=5.0, help='每次分析的截止时间（秒）')
+    parser.add_argument('--stream', action='store_true', help='使用流式提前决策')
+    parser.add_argument('--http-timeout', type=float, default=60.0)
+    parser.add_argument('--max-retries', type=int, default=2, help='OpenAI客户端自动重试次数（与机器人一致）')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--prompt-format', choices=('kv', 'compact'), default='kv')
+    parser.add_argument('--token-budget', type=int, help='compact格式的提示词token预算')
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        args.port = 0 if args.port == 8900 else args.port
+        server = server_from_args(args)
+        server.start()
+        base_url = server.base_url
+
+    test = LoadTest(base_url, args.deadline, args.stream, args.http_timeout, args.max_retries,
+                    runner_workers=args.concurrency * 2, prompt_format=args.prompt_format,
+                    token_budget=args.token_budget)
+    print(f"🚀 开始压测: {args.calls} 次分析，并发 {args.concurrency}，截止时间 {args.deadline}秒，"
+          f"{'流式' if args.stream else '非流式'}")
+    try:
+        print_summary(test.run(args.calls, args.concurrency, args.seed))
+        if server:
+            print(f"   替身服务器统计 {server.stats}")
+    finally:
+        test.runner.shutdown()
+        if server:
+            server.stop()
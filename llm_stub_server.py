@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地OpenAI兼容的LLM替身服务器
+实现 POST /chat/completions（含 /v1 前缀），deepseek_client 的 base_url 指向本服务
+即可离线测试，不消耗付费额度。支持：
+- 可配置的延迟分布（固定/均匀/对数正态）和逐token流式输出（SSE）
+- 按比例注入HTTP错误、超长挂起和无法解析的回复
+- 按脚本文件依次返回信号，或根据提示词中的指标用规则生成信号
+- 模拟服务端前缀缓存：相同的system消息再次出现时计入 prompt_cache_hit_tokens
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from llm_analyzer import estimate_tokens, rule_based_signal
+
+
+class LatencyModel:
+    """延迟分布，规格字符串：
+    - fixed:1.5          固定1.5秒
+    - uniform:0.5,3      0.5~3秒均匀分布
+    - lognormal:1.2,0.5  中位数1.2秒、对数标准差0.5的对数正态分布
+    """
+
+    def __init__(self, spec: str = 'fixed:0', rng: random.Random = random):
+        self.spec = spec
+        kind, _, params = spec.partition(':')
+        values = [float(value) for value in params.split(',') if value]
+        if kind == 'fixed':
+            self._sample = lambda: values[0] if values else 0.0
+        elif kind == 'uniform':
+            self._sample = lambda: rng.uniform(values[0], values[1])
+        elif kind == 'lognormal':
+            median, sigma = values[0], values[1] if len(values) > 1 else 0.5
+            self._sample = lambda: rng.lognormvariate(0, sigma) * median
+        else:
+            raise ValueError(f"未知的延迟分布: {spec}")
+
+    def sample(self) -> float:
+        return max(0.0, self._sample())
+
+
+def _parse_key_values(text: str) -> Dict[str, str]:
+    return dict(re.findall(r'^([a-z_]+)=(.*)$', text, re.MULTILINE))
+
+
+def rule_reply(messages: List[Dict], rng: random.Random = random) -> str:
+    """根据最后一条user消息中的行情数据，用规则信号生成回复文本
+
+    支持单交易对的 key=value 格式和紧凑CSV格式，以及批量分析的CSV表格格式。
+    """
+    content = messages[-1].get('content', '') if messages else ''
+    lines = [line.strip() for line in content.splitlines() if line.strip()]
+
+    if lines and lines[0].startswith('symbol,'):
+        header = lines[0].split(',')
+        signals = []
+        for line in lines[1:]:
+            if '=' in line:
+                break
+            row = dict(zip(header, line.split(',')))
+            price_data = {
+                'price': float(row['price']),
+                'technical_data': {'rsi': float(row['rsi']), 'macd': float(row['macd']),
+                                   'macd_signal': float(row['macd_signal'])},
+            }
+            signals.append(_signal_object(price_data, rng, row['symbol']))
+        return json.dumps(signals, ensure_ascii=False)
+
+    values = _parse_key_values(content)
+    if lines and lines[0].startswith('price,') and len(lines) > 1:
+        # 紧凑CSV格式：表头 + 一行数值
+        values = dict(zip(lines[0].split(','), lines[1].split(',')))
+        values['macd_signal'] = values.get('macd_sig', 0)
+    try:
+        price_data = {
+            'price': float(values.get('price', 0)),
+            'technical_data': {'rsi': float(values.get('rsi', 50)), 'macd': float(values.get('macd', 0)),
+                               'macd_signal': float(values.get('macd_signal', 0))},
+        }
+    except ValueError:
+        price_data = {'price': 0.0, 'technical_data': {'rsi': 50, 'macd': 0, 'macd_signal': 0}}
+    return json.dumps(_signal_object(price_data, rng), ensure_ascii=False)
+
+
+def _signal_object(price_data: Dict, rng: random.Random, symbol: Optional[str] = None) -> Dict:
+    signal = rule_based_signal(price_data, '替身服务器规则信号')
+    result = {'symbol': symbol} if symbol else {}
+    # 与提示词约定一致：signal 和 confidence 在最前面
+    result.update({
+        'signal': signal['signal'],
+        'confidence': rng.choice(('HIGH', 'MEDIUM', 'LOW')) if signal['signal'] != 'HOLD' else 'LOW',
+        'reason': signal['reason'],
+        'stop_loss': round(signal['stop_loss'], 2),
+        'take_profit': round(signal['take_profit'], 2),
+    })
+    return result
+
+
+class StubLLMServer:
+    """OpenAI兼容的LLM替身服务器"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8900, latency: str = 'fixed:0',
+                 token_delay: float = 0.0, error_rate: float = 0.0, error_codes=(500, 429),
+                 hang_rate: float = 0.0, hang_seconds: float = 120.0, malformed_rate: float = 0.0,
+                 script: Optional[List[str]] = None, chunk_chars: int = 4, seed: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.rng = random.Random(seed)
+        self.latency = LatencyModel(latency, self.rng)
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.error_codes = tuple(error_codes)
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.malformed_rate = malformed_rate
+        self.script = script or []
+        self.chunk_chars = chunk_chars
+        self._script_index = 0
+        self._seen_prefixes = set()
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'hangs': 0, 'malformed': 0, 'streams': 0}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def _next_reply(self, messages: List[Dict]) -> str:
+        with self._lock:
+            if self.script:
+                reply = self.script[self._script_index % len(self.script)]
+                self._script_index += 1
+                return reply
+        return rule_reply(messages, self.rng)
+
+    def _usage(self, messages: List[Dict], reply: str) -> Dict:
+        prompt_tokens = sum(estimate_tokens(message.get('content', '')) for message in messages)
+        cached = 0
+        if messages and messages[0].get('role') == 'system':
+            prefix = messages[0].get('content', '')
+            digest = hashlib.sha256(prefix.encode('utf-8')).hexdigest()
+            with self._lock:
+                if digest in self._seen_prefixes:
+                    # DeepSeek按64 token为单位缓存前缀
+                    cached = estimate_tokens(prefix) // 64 * 64
+                self._seen_prefixes.add(digest)
+        completion_tokens = estimate_tokens(reply)
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+            'prompt_cache_hit_tokens': cached,
+            'prompt_cache_miss_tokens': prompt_tokens - cached,
+        }
+
+    def handle_completion(self, handler: BaseHTTPRequestHandler, request: Dict):
+        with self._lock:
+            self.stats['requests'] += 1
+        messages = request.get('messages', [])
+        model = request.get('model', 'deepseek-chat')
+
+        roll = self.rng.random()
+        if roll < self.error_rate:
+            with self._lock:
+                self.stats['errors'] += 1
+            status = self.rng.choice(self.error_codes)
+            time.sleep(self.latency.sample() * 0.2)
+            handler.send_json(status, {'error': {'message': f'stub injected error {status}', 'type': 'server_error'}})
+            return
+        if roll < self.error_rate + self.hang_rate:
+            with self._lock:
+                self.stats['hangs'] += 1
+            time.sleep(self.hang_seconds)
+
+        reply = self._next_reply(messages)
+        if self.rng.random() < self.malformed_rate:
+            with self._lock:
+                self.stats['malformed'] += 1
+            reply = '抱歉，我无法给出明确的交易信号。'
+
+        usage = self._usage(messages, reply)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        time.sleep(self.latency.sample())
+
+        if not request.get('stream'):
+            handler.send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': reply}}],
+                'usage': usage,
+            })
+            return
+
+        with self._lock:
+            self.stats['streams'] += 1
+        handler.start_sse()
+
+        def chunk(delta: Dict, finish_reason=None, usage_data=None, choices=True) -> Dict:
+            data = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                    'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}] if choices else []}
+            if usage_data:
+                data['usage'] = usage_data
+            return data
+
+        handler.send_event(chunk({'role': 'assistant', 'content': ''}))
+        for start in range(0, len(reply), self.chunk_chars):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            handler.send_event(chunk({'content': reply[start:start + self.chunk_chars]}))
+        handler.send_event(chunk({}, finish_reason='stop'))
+        if (request.get('stream_options') or {}).get('include_usage'):
+            handler.send_event(chunk({}, usage_data=usage, choices=False))
+        handler.send_done()
+
+    def start(self):
+        """在后台线程启动服务器"""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status: int, payload: Dict):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def start_sse(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+
+            def send_event(self, data: Dict):
+                self.wfile.write(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+
+            def send_done(self):
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path.rstrip('/') in ('/models', '/v1/models'):
+                    self.send_json(200, {'object': 'list', 'data': [{'id': 'deepseek-chat', 'object': 'model'}]})
+                elif self.path.rstrip('/') == '/stats':
+                    self.send_json(200, stub.stats)
+                else:
+                    self.send_json(404, {'error': {'message': 'not found'}})
+
+            def do_POST(self):
+                if self.path.rstrip('/') not in ('/chat/completions', '/v1/chat/completions'):
+                    self.send_json(404, {'error': {'message': 'not found'}})
+                    return
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    request = json.loads(self.rfile.read(length) or b'{}')
+                except json.JSONDecodeError:
+                    self.send_json(400, {'error': {'message': 'invalid json'}})
+                    return
+                try:
+                    stub.handle_completion(self, request)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='llm-stub', daemon=True)
+        self._thread.start()
+        print(f"🤖 LLM替身服务器已启动: {self.base_url} (延迟 {self.latency.spec}, 错误率 {self.error_rate:.0%})")
+
+    def stop(self):
+        """停止服务器"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+def load_script(path: str) -> List[str]:
+    """读取脚本文件：每行一个回复文本（通常是JSON信号）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+def add_server_arguments(parser):
+    """服务器参数（压测脚本复用）"""
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', default='lognormal:1.5,0.6', help='fixed:S | uniform:A,B | lognormal:中位数,sigma')
+    parser.add_argument('--token-delay', type=float, default=0.01, help='流式输出每个分片的间隔（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='请求挂起的比例')
+    parser.add_argument('--hang-seconds', type=float, default=120.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='返回无法解析回复的比例')
+    parser.add_argument('--script', help='按行依次返回的回复文件，不指定则按规则生成信号')
+    parser.add_argument('--server-seed', type=int, help='随机种子（延迟、错误注入和信心度），便于复现')
+
+
+def server_from_args(args) -> StubLLMServer:
+    return StubLLMServer(args.host, args.port, args.latency, args.token_delay, args.error_rate,
+                         hang_rate=args.hang_rate, hang_seconds=args.hang_seconds,
+                         malformed_rate=args.malformed_rate,
+                         script=load_script(args.script) if args.script else None, seed=args.server_seed)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='本地OpenAI兼容的LLM替身服务器')
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_args(args)
+    server.start()
+    print(f"💡 设置 DEEPSEEK_BASE_URL={server.base_url} 让交易机器人使用替身服务器")
+    print("⏹️ 按 Ctrl+C 停止")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+WebSocket实时行情订阅
+订阅K线和Ticker频道，在内存中维护最新K线和技术指标，
+get_btc_market_data 可直接读取快照而无需网络往返
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from websockets.sync.client import connect
+
+from candle_cache import CandleRingBuffer
+from indicator_engine import StreamingIndicatorEngine
+
+# Binance U本位合约行情地址（Binance兼容的订阅协议）
+DEFAULT_STREAM_URL = 'wss://fstream.binance.com/ws'
+
+
+class MarketDataStream:
+    """WebSocket K线/Ticker 行情流
+
+    使用Binance兼容的 SUBSCRIBE 协议订阅 <symbol>@kline_<interval> 和
+    <symbol>@ticker。断线后按指数退避重连并重新订阅；重连后可能漏掉K线，
+    因此会置位 needs_resync，由调用方用REST数据重新初始化。
+    """
+
+    def __init__(self, url: str = DEFAULT_STREAM_URL, symbol: str = 'BTCUSDT',
+                 interval: str = '15m', capacity: int = 96,
+                 max_reconnect_delay: float = 30, name: str = 'WebSocket'):
+        self.url = url
+        self.symbol = symbol
+        self.interval = interval
+        self.name = name
+        self.max_reconnect_delay = max_reconnect_delay
+        self.streams = [f"{symbol.lower()}@kline_{interval}", f"{symbol.lower()}@ticker"]
+
+        self.candles = CandleRingBuffer(capacity)
+        self.engine = StreamingIndicatorEngine()
+        self.ticker: Dict = {}
+        self.last_message_time = 0.0
+        self.connected = False
+        self.needs_resync = True
+        self.reconnect_count = 0
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._connection = None
+        self._request_id = 0
+
+    def start(self):
+        """启动后台订阅线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='market-stream', daemon=True)
+        self._thread.start()
+        print(f"📡 WebSocket行情订阅已启动: {self.url} {self.streams}")
+
+    def stop(self):
+        """停止订阅并关闭连接"""
+        self._stop_event.set()
+        if self._connection:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def seed(self, ohlcv: List[List[float]]):
+        """用REST获取的历史K线初始化（或重新同步）内存数据"""
+        candles = [[float(value) for value in candle[:6]] for candle in ohlcv]
+        with self._lock:
+            self.candles.clear()
+            for candle in candles:
+                self.candles.append(candle)
+            # 引擎用全部历史预热，缓冲区只保留最近 capacity 根
+            self.engine.seed(candles)
+            self.needs_resync = False
+
+    def is_fresh(self, max_age: float = 30) -> bool:
+        """行情是否可直接使用：已连接、已同步且最近收到过消息"""
+        return (self.connected and not self.needs_resync and len(self.candles) >= 2
+                and time.time() - self.last_message_time <= max_age)
+
+    def _run(self):
+        delay = 1
+        while not self._stop_event.is_set():
+            try:
+                with connect(self.url, open_timeout=10, close_timeout=2) as connection:
+                    self._connection = connection
+                    self._subscribe(connection)
+                    self.connected = True
+                    delay = 1
+                    print(f"✅ WebSocket已连接: {self.url}")
+
+                    for message in connection:
+                        self._handle_message(message)
+                        if self._stop_event.is_set():
+                            break
+
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    print(f"⚠️ WebSocket连接断开: {e}")
+            finally:
+                self._connection = None
+                if self.connected:
+                    # 断线期间可能漏掉K线，重连后需要用REST重新同步
+                    self.connected = False
+                    self.needs_resync = True
+
+            if self._stop_event.is_set():
+                break
+            self.reconnect_count += 1
+            print(f"⏳ {delay}秒后重连WebSocket...")
+            self._stop_event.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _subscribe(self, connection):
+        """发送订阅请求（每次重连都会重新订阅）"""
+        self._request_id += 1
+        connection.send(json.dumps({
+            'method': 'SUBSCRIBE',
+            'params': self.streams,
+            'id': self._request_id,
+        }))
+
+    def _handle_message(self, message):
+        try:
+            payload = json.loads(message)
+        except (TypeError, ValueError):
+            return
+
+        # 组合流格式: {"stream": ..., "data": {...}}
+        if isinstance(payload, dict) and 'data' in payload and 'stream' in payload:
+            payload = payload['data']
+        if not isinstance(payload, dict):
+            return
+
+        event = payload.get('e')
+        if event == 'kline':
+            self._handle_kline(payload['k'])
+        elif event == '24hrTicker':
+            self.ticker = {
+                'last': float(payload['c']),
+                'price_change_percent': float(payload.get('P', 0)),
+                'volume': float(payload.get('v', 0)),
+                'event_time': payload.get('E'),
+            }
+        else:
+            return
+        self.last_message_time = time.time()
+
+    def _handle_kline(self, kline: Dict):
+        """K线推送：同一根K线原位替换，新K线追加"""
+        candle = [
+            float(kline['t']),
+            float(kline['o']),
+            float(kline['h']),
+            float(kline['l']),
+            float(kline['c']),
+            float(kline['v']),
+        ]
+        with self._lock:
+            last_candle = self.candles.last()
+            if last_candle is not None and candle[0] < last_candle[0]:
+                return
+            if last_candle is not None and candle[0] == last_candle[0]:
+                self.candles.replace_last(candle)
+            else:
+                self.candles.append(candle)
+            self.engine.update(candle)
+
+    def snapshot(self) -> Optional[Dict]:
+        """生成与 get_btc_market_data 相同结构的市场数据（无网络请求）"""
+        with self._lock:
+            result = self.engine.snapshot()
+        if not result:
+            return None
+        result['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        result['data_source'] = self.name
+        return result
+
+
+def record_frames(url: str, streams: List[str], output_path: str, count: int = 500):
+    """从真实行情地址录制原始帧，供 ws_replay_server.py 离线回放"""
+    with connect(url, open_timeout=10) as connection:
+        connection.send(json.dumps({'method': 'SUBSCRIBE', 'params': streams, 'id': 1}))
+        last_time = time.time()
+        recorded = 0
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for message in connection:
+                payload = json.loads(message)
+                if 'result' in payload and 'id' in payload:
+                    continue
+                now = time.time()
+                f.write(json.dumps({'delay': round(now - last_time, 3), 'frame': payload}) + '\n')
+                last_time = now
+                recorded += 1
+                if recorded >= count:
+                    break
+    print(f"✅ 已录制 {recorded} 帧到 {output_path}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='WebSocket行情订阅/录制')
+    parser.add_argument('--url', default=DEFAULT_STREAM_URL)
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--record', help='录制原始帧到指定文件')
+    parser.add_argument('--count', type=int, default=500)
+    args = parser.parse_args()
+
+    if args.record:
+        record_frames(args.url, [f"{args.symbol.lower()}@kline_{args.interval}",
+                                 f"{args.symbol.lower()}@ticker"], args.record, args.count)
+    else:
+        stream = MarketDataStream(args.url, args.symbol, args.interval)
+        stream.needs_resync = False
+        stream.start()
+        try:
+            while True:
+                time.sleep(5)
+                print(f"📊 K线数: {len(stream.candles)} | Ticker: {stream.ticker} | 重连次数: {stream.reconnect_count}")
+        except KeyboardInterrupt:
+            stream.stop()
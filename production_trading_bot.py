@@ -10,7 +10,6 @@ import os
 import time
 import schedule
 from openai import OpenAI
-import ccxt
 import pandas as pd
 import re
 from dotenv import load_dotenv
@@ -22,9 +21,22 @@ import sqlite3
 import sys
 import os
 import logging
+import threading
 from typing import Dict, Optional, List
-from database_manager import save_account_info, save_position_info, save_equity_history, save_to_dashboard
+from database_manager import (save_account_info, save_position_info, save_equity_history, save_to_dashboard,
+                              save_llm_call, db_manager)
 from system_monitor import system_monitor, safe_api_call, validate_config
+from indicator_engine import StreamingIndicatorEngine
+from candle_cache import OHLCVCache
+from exchange_pool import exchange_pool
+from analysis_cache import AnalysisCache, quantize_features
+from change_gate import ChangeDetectionGate
+from resampler import TIMEFRAME_MS
+from llm_analyzer import (DeadlineRunner, LLMDeadlineExceeded, StreamingSignal, parse_signal_json,
+                          rule_based_signal, batch_row, build_batch_messages, split_batches,
+                          parse_batch_signals, extract_usage, timed_call, validate_signal,
+                          parse_ensemble_members, combine_votes, run_ensemble)
+from prompt_builder import build_analysis_messages, build_compact_messages
 
 # 生产环境配置管理
 class ProductionConfig:
@@ -52,9 +64,13 @@ class ProductionConfig:
         self.amount = float(os.getenv('MAX_POSITION_SIZE', 0.01))
         self.leverage = int(os.getenv('LEVERAGE', 5))
         self.symbol = 'BTCUSDT'
+        # 观察列表（逗号分隔），用于多交易对行情获取；交易仍只针对 symbol
+        self.symbols = [s.strip().upper() for s in os.getenv('TRADING_SYMBOLS', self.symbol).split(',') if s.strip()]
+        if self.symbol not in self.symbols:
+            self.symbols.insert(0, self.symbol)
         
-        # 数据库配置
-        self.database_path = os.getenv('DATABASE_PATH', 'production_dashboard.db')
+        # 数据库配置：分析记录、LLM调用统计和分析缓存统一写入 db_manager 的数据库
+        self.database_path = db_manager.db_path
         self.backup_enabled = os.getenv('BACKUP_ENABLED', 'true').lower() == 'true'
         
         # 安全检查
@@ -111,12 +127,44 @@ class ProductionConfig:
 # 全局配置
 config = ProductionConfig()
 
-# 初始化DeepSeek客户端
+# 初始化DeepSeek客户端（timeout 限制单次HTTP请求的最长占用时间；
+# DEEPSEEK_BASE_URL 可指向本地 llm_stub_server.py 做离线测试）
 deepseek_client = OpenAI(
     api_key=os.getenv('DEEPSEEK_API_KEY'),
-    base_url="https://api.deepseek.com"
+    base_url=os.getenv('DEEPSEEK_BASE_URL', 'https://api.deepseek.com'),
+    timeout=float(os.getenv('DEEPSEEK_TIMEOUT', '60'))
 )
 
+# AI分析截止时间：超时后本轮使用规则信号，迟到的AI结果仅记录
+LLM_DEADLINE = float(os.getenv('LLM_DEADLINE_SECONDS', '20'))
+
+# 多模型集成：同一提示词并发发给多个模型/温度/API地址，按信心度加权投票，
+# 达到法定人数（默认过半）即返回，不等待慢的成员
+ENSEMBLE_ENABLED = os.getenv('ENSEMBLE_ENABLED', 'false').lower() == 'true'
+ENSEMBLE_MEMBERS = parse_ensemble_members(
+    os.getenv('ENSEMBLE_MEMBERS', 'deepseek-chat@0.1,deepseek-chat@0.5,deepseek-chat@0.9'))
+ENSEMBLE_QUORUM = int(os.getenv('ENSEMBLE_QUORUM', str(len(ENSEMBLE_MEMBERS) // 2 + 1)))
+ensemble_clients = {
+    member['base_url']: OpenAI(api_key=os.getenv('DEEPSEEK_API_KEY'), base_url=member['base_url'],
+                               timeout=float(os.getenv('DEEPSEEK_TIMEOUT', '60')))
+    for member in ENSEMBLE_MEMBERS if member['base_url']
+}
+
+llm_runner = DeadlineRunner(max_workers=max(4, 2 * len(ENSEMBLE_MEMBERS)) if ENSEMBLE_ENABLED else 4)
+
+# 流式接收AI回复：signal 和 confidence 到达即可决策，其余字段后台补全
+LLM_STREAM_ENABLED = os.getenv('LLM_STREAM_ENABLED', 'false').lower() == 'true'
+
+# 提示词格式：kv 为逐行 键=值 的基本指标（默认）；compact 为固定列顺序的CSV
+# （含最近几根K线），按token预算丢弃低优先级特征，需在 .env 中显式开启
+PROMPT_FORMAT = os.getenv('PROMPT_FORMAT', 'kv').lower()
+LLM_PROMPT_TOKEN_BUDGET = int(os.getenv('LLM_PROMPT_TOKEN_BUDGET', '700'))
+
+# 观察列表批量分析：多个交易对打包进一次请求，超出token预算时自动拆分；
+# 结果仅供参考，不参与下单
+BATCH_ANALYSIS_ENABLED = os.getenv('BATCH_ANALYSIS_ENABLED', 'false').lower() == 'true'
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv('LLM_BATCH_TOKEN_BUDGET', '3000'))
+
 # 初始化交易所客户端（仅Aster）
 aster_client = None
 
@@ -150,13 +198,52 @@ TRADE_CONFIG = {
     'data_points': 96,
 }
 
+# AI分析缓存：量化后的市场状态相同时复用上次分析结果
+analysis_cache = AnalysisCache(
+    db_path=config.database_path,
+    ttl=int(os.getenv('ANALYSIS_CACHE_TTL', '900')),
+    maxsize=int(os.getenv('ANALYSIS_CACHE_SIZE', '256')),
+)
+
+# 变化检测闸门：市场无实质变化时跳过AI分析，复用上一轮信号
+analysis_gate = ChangeDetectionGate(
+    price_change_pct=float(os.getenv('GATE_PRICE_CHANGE_PCT', '0.3')),
+    rsi_delta=float(os.getenv('GATE_RSI_DELTA', '3')),
+    max_skips=int(os.getenv('GATE_MAX_SKIPS', '3')),
+)
+ANALYSIS_GATE_ENABLED = os.getenv('ANALYSIS_GATE_ENABLED', 'false').lower() == 'true'
+
+# 收盘前预分析：在K线收盘前 SPECULATIVE_LEAD_SECONDS 秒用未收盘K线完成AI分析，
+# 收盘时量化特征档位不变则立即执行，变化则重新分析，AI延迟不再位于收盘与下单之间
+SPECULATIVE_ENABLED = os.getenv('SPECULATIVE_ANALYSIS_ENABLED', 'false').lower() == 'true'
+SPECULATIVE_LEAD_SECONDS = float(os.getenv('SPECULATIVE_LEAD_SECONDS', '60'))
+SPECULATIVE_CLOSE_GRACE = float(os.getenv('SPECULATIVE_CLOSE_GRACE_SECONDS', '2'))
+BAR_SECONDS = TIMEFRAME_MS[TRADE_CONFIG['timeframe']] / 1000
+
 # 全局变量
 price_history = []
 signal_history = []
+# 流式分析的补全在工作线程中替换历史记录，所有读写都持有该锁
+signal_history_lock = threading.Lock()
 position = None
 daily_loss = 0
 daily_trade_count = 0
 
+def append_signal_history(signal_data):
+    """把本轮信号加入历史，最多保留30条"""
+    with signal_history_lock:
+        signal_history.append(signal_data)
+        if len(signal_history) > 30:
+            signal_history.pop(0)
+
+def replace_signal_history(old, new):
+    """用 new 替换历史中的 old（按对象身份查找），old 已被挤出历史时忽略"""
+    with signal_history_lock:
+        for index in range(len(signal_history) - 1, -1, -1):
+            if signal_history[index] is old:
+                signal_history[index] = new
+                break
+
 # 设置日志系统
 def setup_logging():
     """设置日志系统"""
@@ -205,6 +292,9 @@ def get_safe_trading_status():
 try:
     from intelligent_data_source import IntelligentDataSource
     intelligent_data_manager = IntelligentDataSource()
+    intelligent_data_manager.start_health_monitor()
+    if os.getenv('MARKET_STREAM_ENABLED', 'false').lower() == 'true':
+        intelligent_data_manager.enable_stream(os.getenv('MARKET_STREAM_URL', 'wss://fstream.binance.com/ws'))
     USE_INTELLIGENT_SOURCE = True
     print("✅ 智能数据源管理器已启用")
 except ImportError as e:
@@ -212,6 +302,10 @@ except ImportError as e:
     intelligent_data_manager = None
     USE_INTELLIGENT_SOURCE = False
 
+# 传统OKX路径使用的流式指标引擎和K线缓存
+legacy_indicator_engine = StreamingIndicatorEngine()
+legacy_ohlcv_cache = OHLCVCache(capacity=96)
+
 def get_btc_market_data():
     """获取BTC市场数据 - 使用智能数据源选择器"""
     global USE_INTELLIGENT_SOURCE, intelligent_data_manager
@@ -254,44 +348,26 @@ def get_btc_market_data():
                 },
             }
             
-            exchange = ccxt.okx(okx_config)
+            exchange = exchange_pool.get('okx', okx_config)
             
             # 获取K线数据
-            ohlcv = exchange.fetch_ohlcv('BTC/USDT', '15m', limit=96)
+            ohlcv = legacy_ohlcv_cache.fetch_ohlcv(exchange, 'okx', 'BTC/USDT', '15m', limit=96)
             print(f"✅ OKX API连接成功！获取到{len(ohlcv)}条数据")
             
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            
-            # 计算技术指标
-            df = calculate_technical_indicators(df)
+            # 增量更新技术指标
+            legacy_indicator_engine.ingest(ohlcv)
             
-            current_data = df.iloc[-1]
-            previous_data = df.iloc[-2]
-            
-            return {
-                'price': float(current_data['close']),
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'high': float(current_data['high']),
-                'low': float(current_data['low']),
-                'volume': float(current_data['volume']),
-                'price_change': float(((current_data['close'] - previous_data['close']) / previous_data['close']) * 100),
-                'technical_data': {
-                    'sma_5': float(current_data.get('sma_5', 0)),
-                    'sma_20': float(current_data.get('sma_20', 0)),
-                    'sma_50': float(current_data.get('sma_50', 0)),
-                    'rsi': float(current_data.get('rsi', 0)),
-                    'macd': float(current_data.get('macd', 0)),
-                    'macd_signal': float(current_data.get('macd_signal', 0)),
-                    'bb_upper': float(current_data.get('bb_upper', 0)),
-                    'bb_lower': float(current_data.get('bb_lower', 0)),
-                },
-                'kline_data': df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].tail(5).to_dict('records'),
-                'data_source': 'okx'
-            }
+            result = legacy_indicator_engine.snapshot()
+            if result is None:
+                print(f"❌ OKX返回的K线不足2根（{len(ohlcv)} 根），无法计算市场数据")
+                return None
+            result['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            result['data_source'] = 'okx'
+            return result
             
         except Exception as e:
             print(f"❌ 第{attempt + 1}次尝试失败: {e}")
+            exchange_pool.record_failure('okx')
             if attempt < max_retries - 1:
                 print(f"⏳ {retry_delay}秒后重试...")
                 time.sleep(retry_delay)
@@ -300,37 +376,17 @@ def get_btc_market_data():
                 print(f"❌ 所有尝试都失败，无法获取市场数据")
                 return None
 
-def calculate_technical_indicators(df):
-    """计算技术指标"""
+def get_basket_market_data():
+    """获取观察列表中所有交易对的市场数据，返回 {交易对: 快照}"""
+    if not (USE_INTELLIGENT_SOURCE and intelligent_data_manager):
+        return {}
+    
     try:
-        # 移动平均线
-        df['sma_5'] = df['close'].rolling(window=5, min_periods=1).mean()
-        df['sma_20'] = df['close'].rolling(window=20, min_periods=1).mean()
-        df['sma_50'] = df['close'].rolling(window=50, min_periods=1).mean()
-
-        # RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
-
-        # MACD
-        df['ema_12'] = df['close'].ewm(span=12).mean()
-        df['ema_26'] = df['close'].ewm(span=26).mean()
-        df['macd'] = df['ema_12'] - df['ema_26']
-        df['macd_signal'] = df['macd'].ewm(span=9).mean()
-
-        # 布林带
-        df['bb_middle'] = df['close'].rolling(20).mean()
-        bb_std = df['close'].rolling(20).std()
-        df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
-        df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
-
-        return df.bfill().ffill()
+        return intelligent_data_manager.get_market_data(config.symbols, TRADE_CONFIG['timeframe'],
+                                                        TRADE_CONFIG['data_points'])
     except Exception as e:
-        print(f"技术指标计算失败: {e}")
-        return df
+        print(f"⚠️ 观察列表行情获取失败: {e}")
+        return {}
 
 def get_current_position():
     """获取当前持仓（仅Aster）"""
@@ -384,54 +440,60 @@ def get_current_position():
 
 def analyze_with_deepseek(price_data):
     """使用DeepSeek分析市场"""
+    # 量化后的市场状态命中缓存时直接复用，省去一次API调用
+    cache_features = quantize_features(price_data, config.get_trading_mode())
+    cached = analysis_cache.get(cache_features)
+    system_monitor.record_cache_lookup(cached is not None, cached['latency'] if cached else 0.0)
+    if cached:
+        signal_data = cached['signal_data']
+        signal_data['timestamp'] = price_data['timestamp']
+        signal_data['decision'] = 'CACHED'
+        print(f"💾 命中AI分析缓存 (节省 {cached['latency']:.1f} 秒)")
+        append_signal_history(signal_data)
+        return signal_data
+    
     try:
-        # 构建分析提示
-        prompt = f"""
-        你是一个专业的BTC/USDT交易分析师。基于以下数据进行分析：
-
-        当前价格: ${price_data['price']:,.2f}
-        价格变化: {price_data['price_change']:+.2f}%
-        RSI: {price_data['technical_data']['rsi']:.1f}
-        MACD: {price_data['technical_data']['macd']:.4f}
-        信号线: {price_data['technical_data']['macd_signal']:.4f}
-
-        交易模式: {config.get_trading_mode()}
-        最低信心度要求: {config.min_confidence_level}
-
-        请给出明确的交易信号，JSON格式：
-        {{
-            "signal": "BUY|SELL|HOLD",
-            "reason": "分析理由",
-            "stop_loss": 具体价格,
-            "take_profit": 具体价格,
-            "confidence": "HIGH|MEDIUM|LOW"
-        }}
-        """
-
-        response = deepseek_client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": f"你是专业的BTC交易员，交易模式：{config.get_trading_mode()}"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1
-        )
-
-        result = response.choices[0].message.content
-        start_idx = result.find('{')
-        end_idx = result.rfind('}') + 1
-
-        if start_idx != -1 and end_idx != 0:
-            json_str = result[start_idx:end_idx]
-            signal_data = json.loads(json_str)
-            
+        # 固定前缀 + 本轮行情后缀，前缀可命中DeepSeek的上下文缓存
+        if PROMPT_FORMAT == 'compact':
+            messages, dropped = build_compact_messages(price_data, config.get_trading_mode(),
+                                                       config.min_confidence_level, LLM_PROMPT_TOKEN_BUDGET)
+            if dropped:
+                print(f"✂️ 提示词超出 {LLM_PROMPT_TOKEN_BUDGET} token 预算，省略: {', '.join(dropped)}")
+        else:
+            messages = build_analysis_messages(price_data, config.get_trading_mode(), config.min_confidence_level)
+
+        if ENSEMBLE_ENABLED:
+            return analyze_with_ensemble(messages, price_data, cache_features)
+        
+        if LLM_STREAM_ENABLED:
+            return analyze_streaming(messages, price_data, cache_features)
+
+        create = timed_call(deepseek_client.chat.completions.create,
+                            on_error=lambda error, latency: record_llm_call('analysis', latency, status='ERROR'))
+        try:
+            response, latency = llm_runner.run(
+                create,
+                LLM_DEADLINE,
+                model="deepseek-chat",
+                messages=messages,
+                temperature=0.1,
+                on_late=lambda late_result, _: on_late_response(*late_result, price_data, cache_features)
+            )
+        except LLMDeadlineExceeded:
+            print(f"⏰ DeepSeek超过 {LLM_DEADLINE:.0f} 秒未响应，本轮使用规则信号")
+            signal_data = rule_based_signal(price_data, 'AI超时，规则信号')
+            signal_data['decision'] = 'FALLBACK'
+            return signal_data
+
+        signal_data = parse_signal_json(response.choices[0].message.content)
+        record_llm_call('analysis', latency, response, parse_success=signal_data is not None)
+        if signal_data:
             # 添加时间戳
             signal_data['timestamp'] = price_data['timestamp']
+            analysis_cache.put(cache_features, signal_data, latency)
             
             # 保存到历史
-            signal_history.append(signal_data)
-            if len(signal_history) > 30:
-                signal_history.pop(0)
+            append_signal_history(signal_data)
             
             return signal_data
 
@@ -453,6 +515,295 @@ def analyze_with_deepseek(price_data):
             "confidence": "LOW"
         }
 
+def analyze_streaming(messages, price_data, cache_features):
+    """流式AI分析
+
+    signal 和 confidence 一到达就判断：HOLD或信心度不满足交易条件时立即
+    返回；需要交易时在截止时间内继续等待止损止盈，未到达则按当前价格的
+    默认比例设置。返回后才到达的完整回复不修改已返回的字典，而是生成
+    补全后的副本，替换信号历史中的对应记录并另存一条分析记录。
+    """
+    session = StreamingSignal()
+    future = llm_runner.submit(session.consume, deepseek_client.chat.completions.create,
+                               model="deepseek-chat", messages=messages, temperature=0.1)
+    signal_data = {}
+    state_lock = threading.Lock()
+    state = {'timed_out': False, 'pending': None}
+    
+    def on_finished(done):
+        if done.exception() is not None:
+            print(f"⚠️ 流式AI分析失败: {done.exception()}")
+            record_llm_call('analysis_stream', session.latency, ttft=session.first_token_latency, status='ERROR')
+            return
+        final = session.result()
+        with state_lock:
+            timed_out = state['timed_out']
+            pending = state['pending']
+        record_llm_call('analysis_stream', session.latency, session.usage_chunk, ttft=session.first_token_latency,
+                        parse_success=final is not None, status='LATE' if timed_out and final else 'OK')
+        if timed_out:
+            log_late_analysis(final, session.latency, price_data, cache_features)
+            return
+        if not final:
+            return
+        
+        final['timestamp'] = price_data['timestamp']
+        analysis_cache.put(cache_features, final, session.latency)
+        if pending is not None:
+            complete_streamed_signal(pending, final, price_data, session.latency)
+    
+    future.add_done_callback(on_finished)
+    
+    session.decided.wait(LLM_DEADLINE)
+    with state_lock:
+        if not session.is_decided():
+            state['timed_out'] = True
+            if session.finished.is_set():
+                print("❌ 流式AI回复失败或无法解析，保守策略")
+                return {
+                    "signal": "HOLD",
+                    "reason": "分析失败，保守策略",
+                    "stop_loss": price_data['price'] * 0.98,
+                    "take_profit": price_data['price'] * 1.02,
+                    "confidence": "LOW"
+                }
+            print(f"⏰ DeepSeek超过 {LLM_DEADLINE:.0f} 秒未给出信号，本轮使用规则信号")
+            fallback = rule_based_signal(price_data, 'AI超时，规则信号')
+            fallback['decision'] = 'FALLBACK'
+            return fallback
+        
+        signal_data['signal'] = str(session.fields['signal']).upper()
+        signal_data['confidence'] = str(session.fields['confidence']).upper()
+        signal_data['timestamp'] = price_data['timestamp']
+    
+    decided_after = time.time() - session.start_time
+    can_trade, _ = config.should_execute_trade(signal_data['confidence'])
+    if signal_data['signal'] != 'HOLD' and can_trade:
+        # 需要下单：等待止损止盈
+        session.finished.wait(max(0.0, LLM_DEADLINE - decided_after))
+        print(f"⚡ 信号 {signal_data['signal']} 在 {decided_after:.2f} 秒确定，"
+              f"完整回复 {'已' if session.finished.is_set() else '未'}到达")
+    else:
+        print(f"⚡ 信号 {signal_data['signal']} ({signal_data['confidence']}) 在 {decided_after:.2f} 秒确定，"
+              f"无需等待完整回复")
+    
+    with state_lock:
+        # finished 在回调之前置位：回调已执行时这里一定能读到完整回复
+        final = session.result() if session.finished.is_set() else None
+        if final:
+            for key in ('reason', 'stop_loss', 'take_profit'):
+                signal_data[key] = final[key]
+        else:
+            # 完整回复到达后由回调补全副本，不再修改已返回的 signal_data
+            state['pending'] = signal_data
+        price = price_data['price']
+        is_sell = signal_data['signal'] == 'SELL'
+        signal_data.setdefault('reason', str(session.fields.get('reason', '（理由生成中）')))
+        signal_data.setdefault('stop_loss', price * (1.02 if is_sell else 0.98))
+        signal_data.setdefault('take_profit', price * (0.98 if is_sell else 1.02))
+    
+    append_signal_history(signal_data)
+    return signal_data
+
+def complete_streamed_signal(returned, final, price_data, latency):
+    """流式分析返回后才到达的完整回复：生成补全副本并持久化
+
+    已返回的信号可能正被主线程读取，只在副本上补全理由和止损止盈，
+    替换信号历史中的原记录，并以 COMPLETED 另存一条分析记录。
+    """
+    completed = dict(returned)
+    for key in ('reason', 'stop_loss', 'take_profit'):
+        completed[key] = final[key]
+    completed['decision'] = 'COMPLETED'
+    completed['decision_reason'] = f"流式回复在 {latency:.1f} 秒后补全"
+    
+    replace_signal_history(returned, completed)
+    save_analysis_record(completed, price_data)
+    print(f"📝 流式AI分析已补全: {completed['signal']} | {completed['reason'][:60]}")
+
+def analyze_with_ensemble(messages, price_data, cache_features):
+    """多模型集成分析
+
+    所有成员并发请求（非流式），按信心度加权投票；过半成员意见一致且
+    加权票数领先时立即返回，其余成员在后台完成并各自记录调用遥测。
+    截止时间内没有有效回复时使用规则信号。
+    """
+    def make_call(member):
+        client = ensemble_clients.get(member['base_url'], deepseek_client)
+        label = f"{member['model']}@{member['temperature']:g}"
+        create = timed_call(client.chat.completions.create,
+                            on_error=lambda error, latency: record_llm_call('ensemble', latency, status='ERROR'))
+        
+        def call():
+            response, latency = create(model=member['model'], messages=messages,
+                                       temperature=member['temperature'])
+            vote = validate_signal(parse_signal_json(response.choices[0].message.content))
+            record_llm_call('ensemble', latency, response, parse_success=vote is not None,
+                            status='LATE' if latency > LLM_DEADLINE else 'OK')
+            if vote:
+                vote['member'] = label
+            return vote
+        return call
+    
+    request_start = time.time()
+    votes, early = run_ensemble(llm_runner, [make_call(member) for member in ENSEMBLE_MEMBERS],
+                                LLM_DEADLINE, ENSEMBLE_QUORUM)
+    elapsed = time.time() - request_start
+    
+    signal_data = combine_votes(votes, len(ENSEMBLE_MEMBERS))
+    if signal_data is None:
+        print(f"⏰ 集成成员在 {LLM_DEADLINE:.0f} 秒内均未给出有效信号，本轮使用规则信号")
+        signal_data = rule_based_signal(price_data, 'AI集成无有效回复，规则信号')
+        signal_data['decision'] = 'FALLBACK'
+        return signal_data
+    
+    print(f"🗳️ 集成投票: {signal_data['signal']} ({signal_data['confidence']}) | "
+          f"{len(votes)}/{len(ENSEMBLE_MEMBERS)} 个成员回复，"
+          f"{'达到法定人数提前' if early else '截止或全部完成后'}返回，耗时 {elapsed:.2f}秒")
+    signal_data['timestamp'] = price_data['timestamp']
+    signal_data['decision'] = 'ENSEMBLE'
+    analysis_cache.put(cache_features, signal_data, elapsed)
+    
+    append_signal_history(signal_data)
+    return signal_data
+
+def analyze_basket_with_deepseek(basket_data):
+    """一次请求分析观察列表中的多个交易对
+
+    返回的信号仅供参考：主循环只打印，不写入信号历史、不下单；
+    实际交易只依据 analyze_with_gate 对主交易对的单独分析。
+
+    Args:
+        basket_data: {交易对: 市场数据快照}
+
+    Returns:
+        {交易对: signal_data}，AI未返回有效信号的交易对使用规则信号
+    """
+    if not basket_data:
+        return {}
+    
+    trading_mode = config.get_trading_mode()
+    rows = {batch_row(symbol, snapshot): symbol for symbol, snapshot in basket_data.items()}
+    batches = split_batches(list(rows), LLM_BATCH_TOKEN_BUDGET, trading_mode, config.min_confidence_level)
+    print(f"🧠 批量分析 {len(basket_data)} 个交易对（{len(batches)} 个请求）")
+    
+    calls = [{
+        'model': "deepseek-chat",
+        'messages': build_batch_messages(batch, trading_mode, config.min_confidence_level),
+        'temperature': 0.1,
+    } for batch in batches]
+    create = timed_call(deepseek_client.chat.completions.create,
+                        on_error=lambda error, latency: record_llm_call('batch', latency, status='ERROR'))
+    
+    def on_late(index, late_result, _):
+        response, latency = late_result
+        symbols = [rows[row] for row in batches[index]]
+        parsed = parse_batch_signals(response.choices[0].message.content, symbols)
+        record_llm_call('batch', latency, response, parse_success=len(parsed) == len(symbols), status='LATE')
+    
+    # 每个请求在各自的工作线程内计时，耗时不受同批其他请求影响
+    results_with_latency = llm_runner.run_each(create, calls, LLM_DEADLINE, on_late=on_late)
+    
+    results = {}
+    for batch, result in zip(batches, results_with_latency):
+        symbols = [rows[row] for row in batch]
+        response = result[0] if result else None
+        parsed = parse_batch_signals(response.choices[0].message.content, symbols) if response else {}
+        if response:
+            record_llm_call('batch', result[1], response, parse_success=len(parsed) == len(symbols))
+        for symbol in symbols:
+            snapshot = basket_data[symbol]
+            signal_data = parsed.get(symbol)
+            if signal_data:
+                signal_data['decision'] = 'ANALYZED'
+            else:
+                reason = 'AI超时，规则信号' if response is None else 'AI未返回有效信号，规则信号'
+                signal_data = rule_based_signal(snapshot, reason)
+                signal_data['decision'] = 'FALLBACK'
+            signal_data['symbol'] = symbol
+            signal_data['timestamp'] = snapshot['timestamp']
+            results[symbol] = signal_data
+    return results
+
+def record_llm_call(purpose, latency, response=None, ttft=None, parse_success=True, status='OK'):
+    """记录单次LLM调用的遥测数据：耗时、首token耗时、token用量（含前缀缓存命中）、
+    解析是否成功和调用状态（OK / LATE / ERROR）
+
+    每次HTTP请求恰好记录一次；请求失败时 response 为None，token数记为0
+    """
+    try:
+        usage = extract_usage(response)
+        prompt_tokens = usage['prompt_tokens']
+        cache_ratio = usage['cached_tokens'] / prompt_tokens * 100 if prompt_tokens else 0
+        print(f"🧾 tokens: 输入 {prompt_tokens} (缓存命中 {usage['cached_tokens']}, {cache_ratio:.0f}%) | "
+              f"输出 {usage['completion_tokens']} | 耗时 {latency:.2f}秒"
+              f"{f' | 首token {ttft:.2f}秒' if ttft is not None else ''}"
+              f"{'' if parse_success else ' | 解析失败'}{'' if status == 'OK' else f' | {status}'}")
+        save_llm_call({
+            'timestamp': datetime.now().isoformat(),
+            'model': getattr(response, 'model', '') or 'deepseek-chat',
+            'purpose': purpose,
+            'latency': latency,
+            'ttft': ttft,
+            'parse_success': parse_success,
+            'status': status,
+            **usage
+        })
+    except Exception as e:
+        print(f"⚠️ LLM调用记录失败: {e}")
+
+def on_late_response(response, latency, price_data, cache_features):
+    """非流式请求超时后返回的处理"""
+    signal_data = parse_signal_json(response.choices[0].message.content)
+    record_llm_call('analysis', latency, response, parse_success=signal_data is not None, status='LATE')
+    log_late_analysis(signal_data, latency, price_data, cache_features)
+
+def log_late_analysis(signal_data, latency, price_data, cache_features):
+    """记录超过截止时间才返回的AI分析，用于事后与规则信号对比"""
+    logger = logging.getLogger(__name__)
+    logger.info("迟到的AI分析 (%.1f秒, 截止 %.0f秒): %s | 当时价格: %.2f",
+                latency, LLM_DEADLINE, json.dumps(signal_data, ensure_ascii=False), price_data['price'])
+    print(f"🐢 迟到的AI分析 ({latency:.1f}秒): "
+          f"{signal_data['signal'] if signal_data else '解析失败'}")
+    if signal_data:
+        # 市场状态未变时下一轮可直接命中缓存
+        signal_data['timestamp'] = price_data['timestamp']
+        analysis_cache.put(cache_features, signal_data, latency)
+
+def analyze_with_gate(price_data, force_reason=None):
+    """经过变化检测闸门的AI分析：市场无实质变化时复用上一轮信号
+
+    force_reason 非空时绕过闸门直接分析（如收盘前预分析被否决：闸门的比较
+    基准和上一轮信号此时都来自被否决的预分析，不能据此跳过）
+    """
+    trading_mode = config.get_trading_mode()
+    if force_reason:
+        should_analyze, gate_reason = True, force_reason
+    else:
+        should_analyze, gate_reason = analysis_gate.evaluate(price_data, trading_mode)
+    
+    with signal_history_lock:
+        previous = signal_history[-1] if signal_history else None
+    
+    if ANALYSIS_GATE_ENABLED and not should_analyze and previous is not None:
+        signal_data = dict(previous)
+        signal_data['timestamp'] = price_data['timestamp']
+        signal_data['decision'] = 'SKIPPED'
+        signal_data['decision_reason'] = gate_reason
+        analysis_gate.mark_skipped()
+        print(f"⏭️ 跳过AI分析: {gate_reason}")
+        return signal_data
+    
+    signal_data = analyze_with_deepseek(price_data)
+    signal_data.setdefault('decision', 'ANALYZED')
+    signal_data['decision_reason'] = gate_reason
+    # 只有得到有效分析（已写入信号历史）时才更新比较基准
+    with signal_history_lock:
+        recorded = bool(signal_history) and signal_history[-1] is signal_data
+    if recorded:
+        analysis_gate.mark_analyzed(price_data, trading_mode)
+    return signal_data
+
 def execute_production_trade(signal_data, price_data):
     """执行生产环境交易"""
     global daily_loss, daily_trade_count
@@ -465,6 +816,11 @@ def execute_production_trade(signal_data, price_data):
         print(f"🚨 紧急停止: {status['reason']}")
         return
     
+    # 闸门跳过的轮次复用的是上一轮信号，保持当前持仓，不据此再次下单
+    if signal_data.get('decision') == 'SKIPPED':
+        print(f"⏸️ 本轮跳过AI分析，保持当前持仓: {signal_data.get('decision_reason', '')}")
+        return
+    
     # 检查是否应该执行交易
     can_trade, reason = config.should_execute_trade(signal_data['confidence'])
     if not can_trade:
@@ -548,22 +904,28 @@ def execute_real_trade(signal_data, price_data, current_position):
     except Exception as e:
         print(f"❌ 交易执行失败: {e}")
 
-def save_trading_record(trading_record, signal_data, price_data):
-    """保存标准化交易记录"""
+def save_analysis_record(signal_data, price_data):
+    """保存本轮AI分析结果（包括复用上一轮信号的跳过轮次）"""
     try:
-        # 保存AI分析结果
         analysis_data = {
-            'timestamp': trading_record['timestamp'],
+            'timestamp': datetime.now().isoformat(),
             'signal': signal_data['signal'],
             'confidence': signal_data['confidence'],
             'reason': signal_data['reason'],
             'technical_data': price_data['technical_data'],
             'sentiment_data': {},
             'stop_loss': signal_data['stop_loss'],
-            'take_profit': signal_data['take_profit']
+            'take_profit': signal_data['take_profit'],
+            'decision': signal_data.get('decision', 'ANALYZED'),
+            'decision_reason': signal_data.get('decision_reason', '')
         }
         save_to_dashboard(analysis_data)
-        
+    except Exception as e:
+        print(f"❌ AI分析记录保存失败: {e}")
+
+def save_trading_record(trading_record, signal_data, price_data):
+    """保存标准化交易记录"""
+    try:
         # 保存持仓信息
         position_data = {
             'timestamp': datetime.now().isoformat(),
@@ -624,8 +986,59 @@ def save_trading_record(trading_record, signal_data, price_data):
     except Exception as e:
         print(f"❌ 交易记录保存失败: {e}")
 
-def production_trading_bot():
-    """生产环境主交易函数"""
+def next_bar_close(now=None):
+    """下一根K线的收盘时间（Unix秒）"""
+    now = time.time() if now is None else now
+    return (now // BAR_SECONDS + 1) * BAR_SECONDS
+
+def speculative_pre_analysis():
+    """收盘前用未收盘K线预先完成AI分析
+    
+    Returns:
+        {'features': 量化特征档位, 'signal_data': 预分析信号, 'price': 预分析时价格}，失败返回None
+    """
+    if get_safe_trading_status()['emergency_stop']:
+        return None
+    
+    price_data = get_btc_market_data()
+    if not price_data:
+        print("⚠️ 预分析无法获取市场数据，收盘时正常分析")
+        return None
+    
+    request_start = time.time()
+    signal_data = analyze_with_gate(price_data)
+    print(f"🔮 收盘前预分析: {signal_data['signal']} ({signal_data['confidence']}) | "
+          f"价格 ${price_data['price']:,.2f} | 耗时 {time.time() - request_start:.1f}秒")
+    return {
+        'features': quantize_features(price_data, config.get_trading_mode()),
+        'signal_data': signal_data,
+        'price': price_data['price'],
+    }
+
+def resolve_speculation(speculation, price_data):
+    """收盘时复核预分析：量化特征档位不变时复用预分析信号，否则返回None以重新分析"""
+    if speculation['signal_data'].get('decision') == 'FALLBACK':
+        print("🔁 预分析使用的是规则信号，收盘时重新分析")
+        return None
+    
+    features = quantize_features(price_data, config.get_trading_mode())
+    if features != speculation['features']:
+        print(f"🔁 收盘特征档位变化 (价格 ${speculation['price']:,.2f} -> ${price_data['price']:,.2f})，重新分析")
+        return None
+    
+    signal_data = dict(speculation['signal_data'])
+    signal_data['timestamp'] = price_data['timestamp']
+    signal_data['decision'] = 'SPECULATIVE'
+    signal_data['decision_reason'] = f"收盘前{SPECULATIVE_LEAD_SECONDS:.0f}秒预分析，收盘特征档位未变"
+    print("⚡ 收盘特征档位未变，直接使用预分析信号")
+    return signal_data
+
+def production_trading_bot(speculation=None):
+    """生产环境主交易函数
+    
+    Args:
+        speculation: 收盘前预分析结果（见 speculative_pre_analysis），None时正常分析
+    """
     print("\n" + "=" * 60)
     print(f"🤖 生产环境交易机器人 - {config.get_trading_mode()}")
     print(f"⏰ 执行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -653,11 +1066,29 @@ def production_trading_bot():
     
     print(f"💎 BTC价格: ${price_data['price']:,.2f} ({price_data['price_change']:+.2f}%)")
     
-    # AI分析
-    signal_data = analyze_with_deepseek(price_data)
+    # 观察列表行情
+    if len(config.symbols) > 1:
+        basket_data = get_basket_market_data()
+        for symbol, snapshot in basket_data.items():
+            print(f"👀 {symbol:12} ${snapshot['price']:,.4f} ({snapshot['price_change']:+.2f}%) "
+                  f"RSI: {snapshot['technical_data']['rsi']:.1f}")
+        
+        if BATCH_ANALYSIS_ENABLED:
+            basket_signals = analyze_basket_with_deepseek(basket_data)
+            print("📎 以下观察列表信号仅供参考，不参与下单")
+            for symbol, basket_signal in basket_signals.items():
+                print(f"🧠 {symbol:12} {basket_signal['signal']:4} | 信心: {basket_signal['confidence']:6} | "
+                      f"{basket_signal['reason'][:60]}")
+    
+    # AI分析（收盘前预分析仍然有效时直接复用，否则经变化检测闸门判断是否需要重新分析）
+    signal_data = resolve_speculation(speculation, price_data) if speculation else None
+    if signal_data is None:
+        signal_data = analyze_with_gate(price_data, "收盘前预分析被否决，重新分析" if speculation else None)
     print(f"🧠 AI信号: {signal_data['signal']} | 信心: {signal_data['confidence']}")
     print(f"💭 理由: {signal_data['reason'][:100]}...")
     
+    save_analysis_record(signal_data, price_data)
+    
     # 执行交易
     execute_production_trade(signal_data, price_data)
     
@@ -686,16 +1117,30 @@ def main():
     
     # 主循环
     print("🔄 开始交易循环...")
+    if SPECULATIVE_ENABLED:
+        print(f"🔮 收盘前预分析已启用: 收盘前 {SPECULATIVE_LEAD_SECONDS:.0f} 秒分析，收盘时执行")
     while True:
+        speculation = None
+        if SPECULATIVE_ENABLED:
+            # 对齐K线收盘：收盘前预分析，收盘后（留出交易所换线时间）复核并执行
+            close_at = next_bar_close()
+            time.sleep(max(0.0, close_at - SPECULATIVE_LEAD_SECONDS - time.time()))
+            try:
+                speculation = speculative_pre_analysis()
+            except Exception as e:
+                print(f"⚠️ 收盘前预分析失败: {e}")
+            time.sleep(max(0.0, close_at + SPECULATIVE_CLOSE_GRACE - time.time()))
+        
         try:
-            production_trading_bot()
+            production_trading_bot(speculation)
         except Exception as e:
             print(f"❌ 交易循环错误: {e}")
             import traceback
             traceback.print_exc()
         
-        # 等待下一个周期（15分钟）
-        time.sleep(900)  # 15分钟 = 900秒
+        if not SPECULATIVE_ENABLED:
+            # 等待下一个周期（15分钟）
+            time.sleep(900)  # 15分钟 = 900秒
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI分析提示词构建
+提示词分为两部分：
+- 固定前缀：角色、输出格式、分析规则和示例，逐字节不变，可命中服务端前缀缓存
+- 可变后缀：本轮的行情数据和交易模式，尽量紧凑
+任何会随轮次变化的内容（价格、指标、交易模式、时间）都不能放进前缀
+
+紧凑格式（build_compact_messages）把特征编码为固定列顺序的CSV，并可附带最近几根K线；
+按本地token估算执行预算，超出时先丢弃低优先级的特征
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from llm_analyzer import estimate_tokens
+
+ANALYSIS_SYSTEM_PROMPT = """你是专业的BTC/USDT永续合约交易分析师，根据用户提供的行情数据给出交易信号。
+
+## 输出格式
+只输出一个JSON对象，不要输出任何其他文字：
+{"signal": "BUY|SELL|HOLD", "confidence": "HIGH|MEDIUM|LOW", "reason": "分析理由", "stop_loss": 具体价格, "take_profit": 具体价格}
+字段按上面的顺序输出，signal 和 confidence 必须在最前面。
+
+## 输入格式
+用户消息为若干 键=值 行：
+- price: 当前价格（USDT）
+- change_pct: 最近一根K线的价格变化（%）
+- rsi: 14周期RSI
+- macd / macd_signal: MACD线和信号线
+- mode: 交易模式（真实交易或模拟交易）
+- min_confidence: 执行交易所需的最低信心度
+
+## 分析规则
+1. RSI低于30为超卖，高于70为超买；30-70之间结合MACD判断趋势
+2. MACD在信号线上方且差值扩大为多头动能，反之为空头动能
+3. 信号与动能方向矛盾或证据不足时输出HOLD
+4. BUY的止损低于当前价格、止盈高于当前价格；SELL相反；止损幅度一般为1%-3%
+5. 信心度反映证据强弱；信心度低于 min_confidence 的信号不会被执行，不必为了执行而抬高信心度
+6. 真实交易模式下更加保守
+
+## 示例
+输入:
+price=60000.00
+change_pct=-1.20
+rsi=27.5
+macd=-35.2000
+macd_signal=-48.9000
+mode=模拟交易
+min_confidence=MEDIUM
+输出:
+{"signal": "BUY", "confidence": "MEDIUM", "reason": "RSI超卖且MACD在信号线上方，空头动能减弱，存在反弹机会", "stop_loss": 58800, "take_profit": 61800}
+
+输入:
+price=61250.00
+change_pct=0.15
+rsi=52.3
+macd=4.1000
+macd_signal=3.8000
+mode=真实交易
+min_confidence=MEDIUM
+输出:
+{"signal": "HOLD", "confidence": "LOW", "reason": "RSI中性，MACD与信号线几乎重合，无明确方向", "stop_loss": 60025, "take_profit": 62475}"""
+
+
+def build_analysis_suffix(price_data: Dict, trading_mode: str, min_confidence: str) -> str:
+    """本轮的可变行情数据"""
+    technical = price_data['technical_data']
+    return '\n'.join([
+        f"price={price_data['price']:.2f}",
+        f"change_pct={price_data['price_change']:.2f}",
+        f"rsi={technical['rsi']:.1f}",
+        f"macd={technical['macd']:.4f}",
+        f"macd_signal={technical['macd_signal']:.4f}",
+        f"mode={trading_mode}",
+        f"min_confidence={min_confidence}",
+    ])
+
+
+def build_analysis_messages(price_data: Dict, trading_mode: str, min_confidence: str) -> List[Dict]:
+    """固定前缀的system消息 + 可变后缀的user消息"""
+    return [
+        {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+        {"role": "user", "content": build_analysis_suffix(price_data, trading_mode, min_confidence)},
+    ]
+
+
+COMPACT_ANALYSIS_SYSTEM_PROMPT = """你是专业的BTC/USDT永续合约交易分析师，根据用户提供的行情数据给出交易信号。
+
+## 输出格式
+只输出一个JSON对象，不要输出任何其他文字：
+{"signal": "BUY|SELL|HOLD", "confidence": "HIGH|MEDIUM|LOW", "reason": "分析理由", "stop_loss": 具体价格, "take_profit": 具体价格}
+字段按上面的顺序输出，signal 和 confidence 必须在最前面。
+
+## 输入格式
+用户消息为紧凑的CSV，列顺序固定；超出长度预算时可选列和K线会被省略：
+1. 第一行为表头，第二行为对应数值：
+- price: 当前价格（USDT）
+- chg: 最近一根K线的价格变化（%）
+- rsi: 14周期RSI
+- macd / macd_sig: MACD线和信号线
+- sma5 / sma20 / sma50: 简单移动平均线（可选）
+- bb_up / bb_lo: 布林带上下轨（可选）
+2. 可选的K线段：kline:o,h,l,c,v 之后每行一根K线（开、高、低、收、成交量），从旧到新，最后一行为当前K线
+3. 最后两行为 mode（交易模式）和 min_confidence（执行交易所需的最低信心度）
+
+## 分析规则
+1. RSI低于30为超卖，高于70为超买；30-70之间结合MACD判断趋势
+2. MACD在信号线上方且差值扩大为多头动能，反之为空头动能
+3. 价格相对均线和布林带的位置、K线形态可作为辅助证据
+4. 信号与动能方向矛盾或证据不足时输出HOLD
+5. BUY的止损低于当前价格、止盈高于当前价格；SELL相反；止损幅度一般为1%-3%
+6. 信心度反映证据强弱；信心度低于 min_confidence 的信号不会被执行，不必为了执行而抬高信心度
+7. 真实交易模式下更加保守
+
+## 示例
+输入:
+price,chg,rsi,macd,macd_sig,sma5,sma20
+60000,-1.20,27.5,-35.2,-48.9,60310,61020
+kline:o,h,l,c,v
+60850,60900,60480,60520,655.2
+60520,60610,59880,60000,812.4
+mode=模拟交易
+min_confidence=MEDIUM
+输出:
+{"signal": "BUY", "confidence": "MEDIUM", "reason": "RSI超卖且MACD在信号线上方，空头动能减弱，存在反弹机会", "stop_loss": 58800, "take_profit": 61800}
+
+输入:
+price,chg,rsi,macd,macd_sig
+61250,0.15,52.3,4.1,3.8
+mode=真实交易
+min_confidence=MEDIUM
+输出:
+{"signal": "HOLD", "confidence": "LOW", "reason": "RSI中性，MACD与信号线几乎重合，无明确方向", "stop_loss": 60025, "take_profit": 62475}"""
+
+# 紧凑格式的列：(列名, technical_data 或 price_data 中的键, 是否必需, 格式)
+COMPACT_COLUMNS = (
+    ('price', 'price', True, '.6g'),
+    ('chg', 'price_change', True, '.2f'),
+    ('rsi', 'rsi', True, '.1f'),
+    ('macd', 'macd', True, '.6g'),
+    ('macd_sig', 'macd_signal', True, '.6g'),
+    ('sma5', 'sma_5', False, '.6g'),
+    ('sma20', 'sma_20', False, '.6g'),
+    ('sma50', 'sma_50', False, '.6g'),
+    ('bb_up', 'bb_upper', False, '.6g'),
+    ('bb_lo', 'bb_lower', False, '.6g'),
+)
+
+# 超出token预算时的丢弃顺序：先逐根丢弃最旧的K线，再丢弃可选指标
+COMPACT_DROP_ORDER = ('kline', 'bb_lo', 'bb_up', 'sma50', 'sma20', 'sma5')
+
+
+def compact_feature_values(price_data: Dict) -> Dict[str, str]:
+    """按固定列顺序提取并格式化特征，缺失或NaN的可选列跳过"""
+    technical = price_data.get('technical_data', {})
+    values = {}
+    for column, key, required, fmt in COMPACT_COLUMNS:
+        value = price_data.get(key, technical.get(key))
+        if value is None or value != value:
+            if required:
+                value = 0.0
+            else:
+                continue
+        values[column] = format(float(value), fmt)
+    return values
+
+
+def compact_kline_rows(price_data: Dict) -> List[str]:
+    """最近几根K线（kline_data，从旧到新）的紧凑行"""
+    return [f"{k['open']:.6g},{k['high']:.6g},{k['low']:.6g},{k['close']:.6g},{k['volume']:.4g}"
+            for k in price_data.get('kline_data') or []]
+
+
+def build_compact_suffix(values: Dict[str, str], kline_rows: List[str], trading_mode: str,
+                         min_confidence: str) -> str:
+    lines = [','.join(values), ','.join(values.values())]
+    if kline_rows:
+        lines.append('kline:o,h,l,c,v')
+        lines.extend(kline_rows)
+    lines.append(f"mode={trading_mode}")
+    lines.append(f"min_confidence={min_confidence}")
+    return '\n'.join(lines)
+
+
+def build_compact_messages(price_data: Dict, trading_mode: str, min_confidence: str,
+                           token_budget: Optional[int] = None) -> Tuple[List[Dict], List[str]]:
+    """紧凑格式的分析消息，整体（前缀+后缀）不超过 token_budget
+
+    超出预算时按 COMPACT_DROP_ORDER 依次丢弃，必需列始终保留；
+    必需列仍超出预算时照常返回。
+
+    Returns:
+        (消息列表, 被丢弃的特征名列表)
+    """
+    values = compact_feature_values(price_data)
+    kline_rows = compact_kline_rows(price_data)
+    prefix_tokens = estimate_tokens(COMPACT_ANALYSIS_SYSTEM_PROMPT)
+
+    def over_budget() -> bool:
+        suffix = build_compact_suffix(values, kline_rows, trading_mode, min_confidence)
+        return token_budget is not None and prefix_tokens + estimate_tokens(suffix) > token_budget
+
+    dropped = []
+    for feature in COMPACT_DROP_ORDER:
+        if not over_budget():
+            break
+        if feature == 'kline':
+            dropped_rows = 0
+            while kline_rows and over_budget():
+                kline_rows.pop(0)
+                dropped_rows += 1
+            if dropped_rows:
+                dropped.append(f"kline×{dropped_rows}")
+        elif feature in values:
+            del values[feature]
+            dropped.append(feature)
+
+    return [
+        {"role": "system", "content": COMPACT_ANALYSIS_SYSTEM_PROMPT},
+        {"role": "user", "content": build_compact_suffix(values, kline_rows, trading_mode, min_confidence)},
+    ], dropped
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多周期K线本地重采样
+由1分钟K线增量合成 5m/15m/1h/4h/1d K线，无需逐个周期向交易所请求
+"""
+
+import time
+from typing import Dict, List, Optional, Sequence
+
+from candle_cache import CandleRingBuffer
+
+TIMEFRAME_MS = {
+    '1m': 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '30m': 30 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+}
+
+
+def merge_candles(first: List[float], second: List[float]) -> List[float]:
+    """合并两根相邻K线：开盘取前者，收盘取后者，高低取极值，成交量相加"""
+    return [
+        first[0],
+        first[1],
+        max(first[2], second[2]),
+        min(first[3], second[3]),
+        second[4],
+        first[5] + second[5],
+    ]
+
+
+class _TimeframeState:
+    """单个目标周期的聚合状态"""
+
+    def __init__(self, timeframe: str, capacity: int):
+        self.timeframe = timeframe
+        self.period_ms = TIMEFRAME_MS[timeframe]
+        self.finished = CandleRingBuffer(capacity)
+        self.bucket: Optional[int] = None
+        self.closed: Optional[List[float]] = None  # 当前周期内已收盘的1分钟K线聚合结果
+        self.count = 0
+
+    def bucket_of(self, timestamp: float) -> int:
+        """按UTC对齐的周期起始时间"""
+        return int(timestamp) - int(timestamp) % self.period_ms
+
+    def fold(self, candle: List[float]):
+        """把一根已收盘的1分钟K线并入聚合状态"""
+        bucket = self.bucket_of(candle[0])
+        if bucket != self.bucket:
+            if self.closed is not None:
+                self.finished.append(self.closed)
+            self.bucket = bucket
+            self.closed = [bucket] + list(candle[1:6])
+            self.count = 1
+        else:
+            self.closed = merge_candles(self.closed, candle)
+            self.count += 1
+
+
+class CandleResampler:
+    """由1分钟K线流增量维护多个周期的K线
+
+    1分钟K线以与交易所相同的方式推送：时间戳相同的K线表示未收盘K线的
+    更新，会原位替换；更新的时间戳表示上一根已收盘。每根1分钟K线的
+    处理代价为常数。最后一根聚合K线可能尚未完整（partial），可通过
+    is_partial 判断。
+    """
+
+    BASE_TIMEFRAME = '1m'
+
+    def __init__(self, timeframes: Sequence[str] = ('5m', '15m', '1h', '4h', '1d'),
+                 capacity: int = 500):
+        self.base_ms = TIMEFRAME_MS[self.BASE_TIMEFRAME]
+        self.timeframes = tuple(timeframes)
+        self.capacity = capacity
+        self.reset()
+
+    def reset(self):
+        """清空全部聚合状态"""
+        self.states: Dict[str, _TimeframeState] = {
+            timeframe: _TimeframeState(timeframe, self.capacity) for timeframe in self.timeframes
+        }
+        self.forming: Optional[List[float]] = None
+
+    def seed(self, ohlcv: List[List[float]]):
+        """用1分钟历史K线重新初始化"""
+        self.reset()
+        self.ingest(ohlcv)
+
+    def ingest(self, ohlcv: List[List[float]]):
+        """吸收一批1分钟K线，已处理过的K线会被跳过"""
+        for candle in ohlcv:
+            self.update(candle)
+
+    def update(self, candle: List[float]):
+        """处理一根1分钟K线 [timestamp, open, high, low, close, volume]"""
+        candle = [float(value) for value in candle[:6]]
+        if self.forming is not None:
+            if candle[0] < self.forming[0]:
+                return
+            if candle[0] > self.forming[0]:
+                # 上一根1分钟K线已收盘，并入各周期
+                for state in self.states.values():
+                    state.fold(self.forming)
+        self.forming = candle
+
+    def get_candles(self, timeframe: str, limit: int = None,
+                    include_partial: bool = True) -> List[List[float]]:
+        """返回指定周期的K线，include_partial=False 时去掉不完整的最后一根"""
+        if timeframe == self.BASE_TIMEFRAME:
+            raise ValueError("1分钟K线请直接使用原始数据")
+        state = self.states.get(timeframe)
+        if state is None:
+            raise ValueError(f"未配置的周期: {timeframe}")
+
+        candles = state.finished.to_list()
+        current = state.closed
+        if self.forming is not None:
+            forming_bucket = state.bucket_of(self.forming[0])
+            if current is not None and forming_bucket == state.bucket:
+                current = merge_candles(current, self.forming)
+            else:
+                if current is not None:
+                    candles.append(current)
+                current = [forming_bucket] + self.forming[1:6]
+        if current is not None and (include_partial or not self.is_partial(timeframe)):
+            candles.append(current)
+
+        return candles[-limit:] if limit else candles
+
+    def is_partial(self, timeframe: str, now_ms: float = None) -> bool:
+        """指定周期的最后一根K线是否不完整
+
+        最后一根聚合K线不完整的两种情况：其中的1分钟K线数量不足一个周期，
+        或者它包含的最新1分钟K线（forming）尚未到收盘时间。最新1分钟K线
+        开启了新周期时，最后一根聚合K线只由它构成。
+        """
+        state = self.states[timeframe]
+        expected = state.period_ms // self.base_ms
+        if self.forming is None:
+            return state.closed is not None and state.count < expected
+
+        if state.closed is not None and state.bucket_of(self.forming[0]) == state.bucket:
+            count = state.count + 1
+        else:
+            count = 1
+        now_ms = time.time() * 1000 if now_ms is None else now_ms
+        return count < expected or now_ms < self.forming[0] + self.base_ms
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据源健康评分
+后台线程持续探测各数据源，维护EWMA延迟、错误率和熔断器状态，
+交易主循环只读取当前排名
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+
+class CircuitBreaker:
+    """单个数据源的熔断器
+
+    CLOSED: 正常使用；连续失败达到阈值后进入 OPEN
+    OPEN: 不再使用，等待 reset_timeout 后进入 HALF_OPEN
+    HALF_OPEN: 只允许轻量探测，成功则恢复 CLOSED，失败则重新 OPEN
+    """
+
+    CLOSED = 'CLOSED'
+    OPEN = 'OPEN'
+    HALF_OPEN = 'HALF_OPEN'
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+
+    def allow_request(self) -> bool:
+        """是否允许向该数据源发请求（OPEN 超时后转为 HALF_OPEN）"""
+        if self.state == self.OPEN and time.time() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        return self.state != self.OPEN
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.state = self.CLOSED
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                print(f"🔌 熔断器打开 (连续失败 {self.consecutive_failures} 次)")
+            self.state = self.OPEN
+            self.opened_at = time.time()
+
+
+class SourceHealthMonitor:
+    """数据源健康监控器
+
+    每个数据源的 EWMA 延迟、EWMA 错误率和熔断器状态直接写回
+    data_sources 中对应的字典（ewma_latency / error_rate / circuit_state）。
+    """
+
+    def __init__(self, data_sources: List[Dict], probe: Callable[[Dict], float],
+                 interval: float = 30, alpha: float = 0.3,
+                 failure_threshold: int = 3, reset_timeout: float = 60):
+        """
+        Args:
+            data_sources: 数据源配置列表
+            probe: 轻量探测函数，成功时返回延迟（秒），失败时抛出异常
+            interval: 后台探测间隔（秒）
+            alpha: EWMA平滑系数
+        """
+        self.data_sources = data_sources
+        self.probe = probe
+        self.interval = interval
+        self.alpha = alpha
+        self.breakers = {
+            source['exchange_id']: CircuitBreaker(failure_threshold, reset_timeout)
+            for source in data_sources
+        }
+        self.ranking: List[Dict] = []
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(max_workers=len(data_sources),
+                                            thread_name_prefix='source-health')
+
+    def start(self):
+        """启动后台监控线程"""
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='source-health-monitor', daemon=True)
+        self._thread.start()
+        print(f"🩺 数据源健康监控已启动 (间隔 {self.interval} 秒)")
+
+    def stop(self):
+        """停止后台监控线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+        self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.probe_all()
+            self._stop_event.wait(self.interval)
+
+    def probe_all(self):
+        """并发探测所有熔断器允许的数据源"""
+        futures = [
+            self._executor.submit(self._probe_source, source)
+            for source in self.data_sources
+            if self.breakers[source['exchange_id']].allow_request()
+        ]
+        wait(futures, timeout=self.interval)
+
+    def _probe_source(self, source: Dict):
+        try:
+            latency = self.probe(source)
+            self.record(source, True, latency)
+        except Exception as e:
+            print(f"⚠️ {source['name']} 健康探测失败: {e}")
+            self.record(source, False)
+
+    def record(self, source: Dict, success: bool, latency: float = None):
+        """记录一次请求结果（后台探测和主循环中的实际请求都会调用）"""
+        with self._lock:
+            breaker = self.breakers[source['exchange_id']]
+            if success:
+                breaker.record_success()
+                if latency is not None:
+                    previous = source.get('ewma_latency')
+                    source['ewma_latency'] = latency if previous is None else (
+                        self.alpha * latency + (1 - self.alpha) * previous)
+                    source['response_time'] = latency
+            else:
+                breaker.record_failure()
+
+            error = 0.0 if success else 1.0
+            source['error_rate'] = self.alpha * error + (1 - self.alpha) * source.get('error_rate', 0.0)
+            source['circuit_state'] = breaker.state
+            source['available'] = breaker.state == CircuitBreaker.CLOSED and 'ewma_latency' in source
+            source['last_test_time'] = time.time()
+
+            self._update_ranking()
+
+    @staticmethod
+    def score(source: Dict) -> float:
+        """数据源评分，越小越好：EWMA延迟按错误率放大"""
+        return source['ewma_latency'] / max(1 - source.get('error_rate', 0.0), 0.05)
+
+    def _update_ranking(self):
+        ranked = [source for source in self.data_sources if source.get('available')]
+        ranked.sort(key=lambda source: (self.score(source), source['priority']))
+        # 整体替换列表，读取方无需加锁
+        self.ranking = ranked
+
+    def get_ranking(self) -> List[Dict]:
+        """当前可用数据源排名（最佳在前）"""
+        return self.ranking
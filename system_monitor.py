@@ -24,6 +24,9 @@ class SystemMonitor:
         self.api_response_times = []
         self.error_count = 0
         self.last_health_check = None
+        self.cache_lookups = 0
+        self.cache_hits = 0
+        self.cache_saved_seconds = 0.0
         
     def record_api_call(self, success: bool, response_time: float):
         """记录API调用"""
@@ -36,6 +39,13 @@ class SystemMonitor:
         if len(self.api_response_times) > 100:
             self.api_response_times.pop(0)
     
+    def record_cache_lookup(self, hit: bool, saved_latency: float = 0.0):
+        """记录AI分析缓存查询，saved_latency 为命中时省去的调用耗时"""
+        self.cache_lookups += 1
+        if hit:
+            self.cache_hits += 1
+            self.cache_saved_seconds += saved_latency
+    
     def record_error(self, error_type: str = "general"):
         """记录错误"""
         self.error_count += 1
@@ -61,6 +71,9 @@ class SystemMonitor:
             # 平均响应时间
             avg_response_time = sum(self.api_response_times) / len(self.api_response_times) if self.api_response_times else 0
             
+            # AI分析缓存命中率
+            cache_hit_rate = (self.cache_hits / self.cache_lookups * 100) if self.cache_lookups > 0 else 0
+            
             # 运行时间
             uptime = (datetime.now() - self.start_time).total_seconds() / 3600  # 小时
             
@@ -73,6 +86,8 @@ class SystemMonitor:
                 'average_response_time': round(avg_response_time, 3),
                 'api_call_count': self.api_call_count,
                 'error_count': self.error_count,
+                'cache_hit_rate': round(cache_hit_rate, 2),
+                'cache_saved_seconds': round(self.cache_saved_seconds, 2),
                 'uptime_hours': round(uptime, 2)
             }
             
@@ -162,6 +177,8 @@ class SystemMonitor:
         print(f"内存使用率: {metrics.get('memory_usage', 0):.1f}%")
         print(f"磁盘使用率: {metrics.get('disk_usage', 0):.1f}%")
         print(f"错误次数: {metrics.get('error_count', 0)}")
+        print(f"AI缓存命中率: {metrics.get('cache_hit_rate', 0):.1f}% "
+              f"(节省 {metrics.get('cache_saved_seconds', 0):.1f} 秒)")
         
         if health['warnings']:
             print("\n⚠️ 警告:")
@@ -182,6 +199,7 @@ class SystemMonitor:
 - CPU使用率: {metrics.get('cpu_usage', 0):.1f}%
 - 内存使用率: {metrics.get('memory_usage', 0):.1f}%
 - 错误次数: {metrics.get('error_count', 0)}
+- AI缓存命中率: {metrics.get('cache_hit_rate', 0):.1f}% (节省 {metrics.get('cache_saved_seconds', 0):.1f}秒)
         """.strip()
 
 # 全局监控实例
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""pytest配置：把仓库根目录加入导入路径（各模块均为顶层模块）"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""AnalysisCache 分析结果缓存测试"""
+
+import analysis_cache
+from analysis_cache import AnalysisCache
+
+SIGNAL = {'signal': 'BUY', 'confidence': 'HIGH', 'reason': '测试'}
+
+
+def make_cache(tmp_path, **kwargs):
+    return AnalysisCache(db_path=str(tmp_path / 'cache.db'), **kwargs)
+
+
+def test_hit_returns_copy_and_latency(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put(('a',), SIGNAL, latency=3.5)
+
+    hit = cache.get(('a',))
+    assert hit == {'signal_data': SIGNAL, 'latency': 3.5}
+    hit['signal_data']['signal'] = 'SELL'
+    assert cache.get(('a',))['signal_data']['signal'] == 'BUY'
+    assert cache.get(('b',)) is None
+    assert cache.get_stats()['hits'] == 2
+    assert cache.get_stats()['saved_seconds'] == 7.0
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    clock = {'now': 1000.0}
+    monkeypatch.setattr(analysis_cache.time, 'time', lambda: clock['now'])
+    cache = make_cache(tmp_path, ttl=60)
+    cache.put(('a',), SIGNAL)
+
+    clock['now'] += 59
+    assert cache.get(('a',)) is not None
+    clock['now'] += 2
+    assert cache.get(('a',)) is None
+    assert cache.get_stats()['size'] == 0
+
+    # 过期条目同时从SQLite删除，重启后不会被载入
+    assert make_cache(tmp_path, ttl=3600).get_stats()['size'] == 0
+
+
+def test_lru_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, maxsize=2)
+    cache.put(('a',), SIGNAL)
+    cache.put(('b',), SIGNAL)
+    assert cache.get(('a',)) is not None
+    cache.put(('c',), SIGNAL)
+
+    assert cache.get(('b',)) is None
+    assert cache.get(('a',)) is not None
+    assert cache.get(('c',)) is not None
+
+    reloaded = make_cache(tmp_path, maxsize=2)
+    assert reloaded.get(('b',)) is None
+
+
+def test_reload_from_sqlite(tmp_path, monkeypatch):
+    clock = {'now': 1000.0}
+    monkeypatch.setattr(analysis_cache.time, 'time', lambda: clock['now'])
+    cache = make_cache(tmp_path, ttl=100)
+    cache.put(('old',), SIGNAL, latency=1.0)
+    clock['now'] += 50
+    cache.put(('new',), dict(SIGNAL, signal='SELL'), latency=2.0)
+
+    clock['now'] += 60
+    reloaded = make_cache(tmp_path, ttl=100)
+    assert reloaded.get(('old',)) is None
+    assert reloaded.get(('new',)) == {'signal_data': dict(SIGNAL, signal='SELL'), 'latency': 2.0}
+
+
+def test_reload_keeps_most_recently_used(tmp_path, monkeypatch):
+    clock = {'now': 1000.0}
+    monkeypatch.setattr(analysis_cache.time, 'time', lambda: clock['now'])
+    cache = make_cache(tmp_path, maxsize=3)
+    for key in ('a', 'b', 'c'):
+        clock['now'] += 1
+        cache.put((key,), SIGNAL)
+    clock['now'] += 1
+    cache.get(('a',))
+
+    reloaded = make_cache(tmp_path, maxsize=2)
+    assert reloaded.get_stats()['size'] == 2
+    assert reloaded.get(('b',)) is None
+    assert reloaded.get(('a',)) is not None
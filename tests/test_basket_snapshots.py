@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""观察列表二维批量指标计算测试"""
+
+import numpy as np
+import pytest
+
+import indicators
+from indicator_engine import StreamingIndicatorEngine
+from intelligent_data_source import IntelligentDataSource
+
+PERIOD = 15 * 60 * 1000
+
+
+def random_ohlcv(count, seed):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+    return [[i * PERIOD, close, close * 1.01, close * 0.99, close, 1.0] for i, close in enumerate(closes)]
+
+
+def test_batch_matches_per_symbol_engine():
+    basket = {'BTC/USDT': random_ohlcv(96, 1), 'ETH/USDT': random_ohlcv(96, 2), 'NEW/USDT': random_ohlcv(30, 3)}
+    snapshots = IntelligentDataSource.build_basket_snapshots(basket)
+    assert set(snapshots) == set(basket)
+
+    for symbol, ohlcv in basket.items():
+        engine = StreamingIndicatorEngine()
+        engine.seed(ohlcv)
+        expected = engine.snapshot()
+        actual = snapshots[symbol]
+        assert actual['price'] == expected['price']
+        assert actual['price_change'] == pytest.approx(expected['price_change'])
+        assert actual['kline_data'] == expected['kline_data']
+        for key in indicators.TECHNICAL_DATA_KEYS:
+            assert actual['technical_data'][key] == pytest.approx(expected['technical_data'][key], rel=1e-9), key
+
+
+def test_short_series_skipped():
+    snapshots = IntelligentDataSource.build_basket_snapshots({'A/USDT': random_ohlcv(1, 1), 'B/USDT': []})
+    assert snapshots == {}
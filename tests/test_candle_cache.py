@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""OHLCVCache 增量K线缓存测试"""
+
+import candle_cache
+from candle_cache import CandleRingBuffer, OHLCVCache
+
+PERIOD = 15 * 60 * 1000
+
+
+class FakeExchange:
+    """按本地时钟加偏移生成K线的假交易所"""
+
+    def __init__(self, clock, offset_ms=0):
+        self.clock = clock
+        self.offset_ms = offset_ms
+        self.calls = []
+
+    def parse_timeframe(self, timeframe):
+        return PERIOD // 1000
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        self.calls.append({'since': since, 'limit': limit})
+        venue_now = self.clock['now'] + self.offset_ms
+        current_bar = venue_now - venue_now % PERIOD
+        if since is None:
+            since = current_bar - (limit - 1) * PERIOD
+        bars = []
+        timestamp = since
+        while timestamp <= current_bar and len(bars) < limit:
+            bars.append([timestamp, 1.0, 2.0, 0.5, timestamp / PERIOD, 10.0])
+            timestamp += PERIOD
+        return bars
+
+
+def make_cache(monkeypatch, now, offset_ms=0, capacity=8):
+    clock = {'now': now}
+    monkeypatch.setattr(candle_cache.time, 'time', lambda: clock['now'] / 1000)
+    return OHLCVCache(capacity=capacity), FakeExchange(clock, offset_ms), clock
+
+
+def test_incremental_fetch_replaces_open_bar_and_appends(monkeypatch):
+    cache, exchange, clock = make_cache(monkeypatch, 100 * PERIOD + 1000)
+    first = cache.fetch_ohlcv(exchange, 'fake', 'BTC/USDT', '15m', limit=5)
+    assert first[-1][0] == 100 * PERIOD
+
+    clock['now'] = 102 * PERIOD + 1000
+    result = cache.fetch_ohlcv(exchange, 'fake', 'BTC/USDT', '15m', limit=5)
+    assert exchange.calls[-1] == {'since': 100 * PERIOD, 'limit': 4}
+    assert [c[0] for c in result] == [i * PERIOD for i in range(98, 103)]
+    assert cache.stats['incremental_fetches'] == 1
+    assert cache.stats['full_fetches'] == 1
+
+
+def test_venue_clock_ahead_at_bar_boundary_stays_incremental(monkeypatch):
+    # 本地时钟距下一根K线还差 500ms，交易所时钟快 1 秒，已经开出新K线
+    cache, exchange, clock = make_cache(monkeypatch, 101 * PERIOD - 2000, offset_ms=1000)
+    cache.fetch_ohlcv(exchange, 'fake', 'BTC/USDT', '15m', limit=5)
+
+    clock['now'] = 101 * PERIOD - 500
+    result = cache.fetch_ohlcv(exchange, 'fake', 'BTC/USDT', '15m', limit=5)
+    assert result[-1][0] == 101 * PERIOD
+    assert cache.stats == {'full_fetches': 1, 'incremental_fetches': 1,
+                           'candles_fetched': 7}
+
+
+def test_gap_in_response_falls_back_to_full_fetch(monkeypatch):
+    cache, exchange, clock = make_cache(monkeypatch, 100 * PERIOD + 1000)
+    cache.fetch_ohlcv(exchange, 'fake', 'BTC/USDT', '15m', limit=5)
+
+    clock['now'] = 102 * PERIOD + 1000
+    original = exchange.fetch_ohlcv
+
+    def fetch_with_gap(symbol, timeframe, since=None, limit=None):
+        bars = original(symbol, timeframe, since=since, limit=limit)
+        return [bar for bar in bars if bar[0] != 101 * PERIOD] if since else bars
+
+    exchange.fetch_ohlcv = fetch_with_gap
+    result = cache.fetch_ohlcv(exchange, 'fake', 'BTC/USDT', '15m', limit=5)
+    assert [c[0] for c in result] == [i * PERIOD for i in range(98, 103)]
+    assert cache.stats['full_fetches'] == 2
+    assert cache.stats['incremental_fetches'] == 0
+
+
+def test_long_downtime_skips_incremental_request(monkeypatch):
+    cache, exchange, clock = make_cache(monkeypatch, 100 * PERIOD + 1000)
+    cache.fetch_ohlcv(exchange, 'fake', 'BTC/USDT', '15m', limit=5)
+
+    clock['now'] = 120 * PERIOD + 1000
+    result = cache.fetch_ohlcv(exchange, 'fake', 'BTC/USDT', '15m', limit=5)
+    assert exchange.calls[-1]['since'] is None
+    assert result[-1][0] == 120 * PERIOD
+    assert cache.stats['full_fetches'] == 2
+
+
+def test_ring_buffer_rollover_keeps_newest():
+    buffer = CandleRingBuffer(3)
+    for i in range(5):
+        buffer.append([i])
+    assert buffer.to_list() == [[2], [3], [4]]
+    buffer.replace_last([40])
+    assert buffer.last() == [40]
+    assert buffer.to_list() == [[2], [3], [40]]
+
+
+def test_incremental_fetches_roll_over_capacity(monkeypatch):
+    cache, exchange, clock = make_cache(monkeypatch, 100 * PERIOD + 1000, capacity=6)
+    cache.fetch_ohlcv(exchange, 'fake', 'BTC/USDT', '15m', limit=5)
+
+    for bar in range(101, 105):
+        clock['now'] = bar * PERIOD + 1000
+        result = cache.fetch_ohlcv(exchange, 'fake', 'BTC/USDT', '15m', limit=5)
+        assert [c[0] for c in result] == [i * PERIOD for i in range(bar - 4, bar + 1)]
+
+    assert len(cache.get_buffer('fake', 'BTC/USDT', '15m')) == 6
+    assert cache.stats['incremental_fetches'] == 4
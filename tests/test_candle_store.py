@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""CandleStore 列式K线存储测试"""
+
+from candle_store import CandleStore
+
+PERIOD = 15 * 60 * 1000
+
+
+def candles(start, count, price=100.0):
+    return [[start + i * PERIOD, price + i, price + i + 1, price + i - 1, price + i + 0.5, 10.0]
+            for i in range(count)]
+
+
+def test_series_are_keyed_by_exchange(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.append('binance', 'BTC/USDT', '15m', candles(0, 3, 100.0))
+    store.append('okx', 'BTC/USDT', '15m', candles(PERIOD, 3, 200.0))
+
+    binance = CandleStore.to_ohlcv(store.tail('binance', 'BTC/USDT', '15m', 10))
+    okx = CandleStore.to_ohlcv(store.tail('okx', 'BTC/USDT', '15m', 10))
+    assert [c[0] for c in binance] == [0, PERIOD, 2 * PERIOD]
+    assert [c[1] for c in okx] == [200.0, 201.0, 202.0]
+    assert store.exchanges('BTC/USDT', '15m') == ['okx', 'binance']
+
+
+def test_tail_zero_is_empty(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.append('binance', 'BTC/USDT', '15m', candles(0, 5))
+    assert len(store.tail('binance', 'BTC/USDT', '15m', 0)['close']) == 0
+    assert len(store.tail('binance', 'BTC/USDT', '15m', 2)['close']) == 2
+    assert len(store.tail('okx', 'BTC/USDT', '15m', 2)['close']) == 0
+
+
+def test_append_overwrites_forming_candle(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.append('binance', 'BTC/USDT', '15m', candles(0, 2))
+    updated = candles(PERIOD, 1, 500.0)
+    assert store.append('binance', 'BTC/USDT', '15m', updated) == 0
+
+    rows = CandleStore.to_ohlcv(store.tail('binance', 'BTC/USDT', '15m', 5))
+    assert len(rows) == 2
+    assert rows[-1][1] == 500.0
+
+
+def test_contiguous_tail_drops_history_before_gap(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.append('binance', 'BTC/USDT', '15m', candles(0, 3))
+    store.append('binance', 'BTC/USDT', '15m', candles(10 * PERIOD, 4))
+
+    columns = CandleStore.contiguous_tail(store.tail('binance', 'BTC/USDT', '15m', 100), PERIOD)
+    assert columns['timestamp'].tolist() == [10 * PERIOD, 11 * PERIOD, 12 * PERIOD, 13 * PERIOD]
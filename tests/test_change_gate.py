@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""ChangeDetectionGate 变化检测闸门测试"""
+
+import pytest
+
+from change_gate import ChangeDetectionGate
+
+
+def market(price=100000.0, rsi=50.0, macd=10.0, macd_signal=5.0):
+    return {'price': price, 'technical_data': {'rsi': rsi, 'macd': macd, 'macd_signal': macd_signal}}
+
+
+@pytest.fixture
+def gate():
+    gate = ChangeDetectionGate(price_change_pct=0.3, rsi_delta=3.0, max_skips=2)
+    gate.mark_analyzed(market(), '模拟交易')
+    return gate
+
+
+def test_first_round_always_analyzes():
+    should, reason = ChangeDetectionGate().evaluate(market(), '模拟交易')
+    assert should
+    assert reason == "首次分析"
+
+
+def test_unchanged_market_skips(gate):
+    should, reason = gate.evaluate(market(price=100100.0, rsi=51.0), '模拟交易')
+    assert not should
+    assert "无实质变化" in reason
+
+
+def test_price_move_triggers(gate):
+    should, reason = gate.evaluate(market(price=99650.0), '模拟交易')
+    assert should
+    assert "价格变化" in reason
+
+
+def test_rsi_move_triggers(gate):
+    should, reason = gate.evaluate(market(rsi=46.9), '模拟交易')
+    assert should
+    assert "RSI" in reason
+
+
+def test_macd_cross_triggers(gate):
+    should, reason = gate.evaluate(market(macd=4.0), '模拟交易')
+    assert should
+    assert "死叉" in reason
+
+
+def test_mode_change_triggers(gate):
+    should, reason = gate.evaluate(market(), '实盘交易')
+    assert should
+    assert "交易模式变化" in reason
+
+
+def test_max_skips_forces_analysis(gate):
+    for _ in range(2):
+        assert not gate.evaluate(market(), '模拟交易')[0]
+        gate.mark_skipped()
+    should, reason = gate.evaluate(market(), '模拟交易')
+    assert should
+    assert "强制分析" in reason
+
+    gate.mark_analyzed(market(), '模拟交易')
+    assert gate.skipped == 0
+    assert not gate.evaluate(market(), '模拟交易')[0]
+
+
+def test_skips_compare_against_last_analysis(gate):
+    # 多轮小幅漂移累计超过阈值时仍会触发（比较基准是上次实际分析时的特征）
+    assert not gate.evaluate(market(price=100200.0), '模拟交易')[0]
+    gate.mark_skipped()
+    should, _ = gate.evaluate(market(price=100350.0), '模拟交易')
+    assert should
+
+
+def test_nan_feature_counts_as_changed(gate):
+    # NaN 与任何值比较都为 False，不能被当作“无变化”而跳过
+    should, reason = gate.evaluate(market(rsi=float('nan')), '模拟交易')
+    assert should
+    assert "rsi" in reason
+
+
+def test_nan_baseline_counts_as_changed():
+    gate = ChangeDetectionGate()
+    gate.mark_analyzed(market(macd=float('nan')), '模拟交易')
+    should, reason = gate.evaluate(market(), '模拟交易')
+    assert should
+    assert "macd" in reason
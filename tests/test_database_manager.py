@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""DatabaseManager LLM调用统计测试"""
+
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from database_manager import DatabaseManager
+
+PRICING = {'cache_hit': 0.1, 'cache_miss': 1.0, 'output': 2.0}
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseManager(str(tmp_path / 'dashboard.db'))
+
+
+def call(timestamp, latency, status='OK', **tokens):
+    return dict({'timestamp': timestamp.isoformat(), 'model': 'deepseek-chat', 'purpose': 'analysis',
+                 'latency': latency, 'ttft': latency and latency / 4, 'prompt_tokens': 1000,
+                 'completion_tokens': 100, 'cached_tokens': 600, 'status': status}, **tokens)
+
+
+def test_daily_latency_percentiles_and_cost(db):
+    today = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    for latency in range(1, 11):
+        db.save_llm_call(call(today + timedelta(seconds=latency), float(latency)))
+    db.save_llm_call(call(today, None, status='ERROR', prompt_tokens=0, completion_tokens=0,
+                          cached_tokens=0, parse_success=False))
+    db.save_llm_call(call(today - timedelta(days=1), 30.0, status='LATE', parse_success=False))
+
+    stats = db.get_llm_call_stats(days=7, pricing=PRICING)
+    assert [day['date'] for day in stats] == [(today - timedelta(days=1)).date().isoformat(),
+                                             today.date().isoformat()]
+
+    day = stats[1]
+    assert day['calls'] == 11
+    assert day['errors'] == 1
+    assert day['late'] == 0
+    assert day['parse_failures'] == 0
+    assert day['latency_p50'] == pytest.approx(5.5)
+    assert day['latency_p95'] == pytest.approx(9.55)
+    assert day['ttft_p50'] == pytest.approx(5.5 / 4)
+    assert day['prompt_tokens'] == 10000
+    assert day['cached_tokens'] == 6000
+    assert day['cache_hit_rate'] == pytest.approx(0.6)
+    assert day['cost'] == pytest.approx((6000 * 0.1 + 4000 * 1.0 + 1000 * 2.0) / 1e6)
+
+    assert stats[0]['late'] == 1
+    assert stats[0]['parse_failures'] == 1
+    assert 'cost' not in db.get_llm_call_stats(days=7)[0]
+
+
+@pytest.fixture(params=['TEST-14', 'TEST+12'])
+def local_timezone(request):
+    # 两个极端时区下，任一时刻至少有一个的本地日期与UTC日期不同
+    previous = os.environ.get('TZ')
+    os.environ['TZ'] = request.param
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ['TZ']
+    else:
+        os.environ['TZ'] = previous
+    time.tzset()
+
+
+def test_window_uses_local_dates(db, local_timezone):
+    first_day = datetime.combine(datetime.now().date() - timedelta(days=2), datetime.min.time())
+    db.save_llm_call(call(first_day + timedelta(seconds=1), 1.0))
+    db.save_llm_call(call(first_day - timedelta(seconds=1), 2.0))
+
+    stats = db.get_llm_call_stats(days=2)
+    assert [day['date'] for day in stats] == [first_day.date().isoformat()]
+    assert stats[0]['calls'] == 1
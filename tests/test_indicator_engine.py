@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""流式指标引擎与 indicators.py 批量计算核心的一致性测试"""
+
+import math
+
+import numpy as np
+import pytest
+
+import indicators
+from indicator_engine import StreamingIndicatorEngine
+
+PERIOD = 15 * 60 * 1000
+
+
+def random_ohlcv(count, seed=1):
+    rng = np.random.default_rng(seed)
+    closes = 50000 * np.exp(np.cumsum(rng.normal(0, 0.004, count)))
+    return [[i * PERIOD, close * 0.999, close * 1.003, close * 0.996, close, float(rng.uniform(1, 50))]
+            for i, close in enumerate(closes)]
+
+
+def kernel_technical_data(ohlcv):
+    close = np.array([candle[4] for candle in ohlcv])
+    values = indicators.compute_indicators(close)
+    return {key: float(indicators.last_valid(values[key])) for key in indicators.TECHNICAL_DATA_KEYS}
+
+
+def assert_matches(actual, expected):
+    assert set(actual) == set(indicators.TECHNICAL_DATA_KEYS)
+    for key in indicators.TECHNICAL_DATA_KEYS:
+        if math.isnan(expected[key]):
+            assert math.isnan(actual[key]), key
+        else:
+            assert actual[key] == pytest.approx(expected[key], rel=1e-9, abs=1e-7), key
+
+
+@pytest.mark.parametrize('count', [3, 15, 30, 60, 300])
+def test_seed_matches_kernels(count):
+    ohlcv = random_ohlcv(count)
+    engine = StreamingIndicatorEngine()
+    engine.seed(ohlcv)
+    assert_matches(engine.get_technical_data(), kernel_technical_data(ohlcv))
+
+
+def test_incremental_updates_match_kernels():
+    ohlcv = random_ohlcv(200, seed=7)
+    engine = StreamingIndicatorEngine()
+    engine.seed(ohlcv[:120])
+    for end in range(120, 200, 10):
+        engine.ingest(ohlcv[end - 5:end + 10])
+        assert_matches(engine.get_technical_data(), kernel_technical_data(ohlcv[:end + 10]))
+
+
+def test_forming_candle_replacement_matches_kernels():
+    ohlcv = random_ohlcv(100, seed=3)
+    engine = StreamingIndicatorEngine()
+    engine.seed(ohlcv)
+
+    replaced = list(ohlcv)
+    last = list(replaced[-1])
+    last[4] *= 1.02
+    replaced[-1] = last
+    engine.update(last)
+    assert_matches(engine.get_technical_data(), kernel_technical_data(replaced))
+
+
+def test_snapshot_needs_two_candles():
+    engine = StreamingIndicatorEngine()
+    assert engine.snapshot() is None
+    engine.seed(random_ohlcv(1))
+    assert engine.snapshot() is None
+    engine.update(random_ohlcv(2)[1])
+    assert engine.snapshot()['price'] == random_ohlcv(2)[1][4]
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""指标注册表与窗口记忆缓存测试"""
+
+import numpy as np
+import pytest
+
+import indicators
+from indicator_registry import IndicatorMemo, indicator_registry
+
+
+def window(count=60, seed=5):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+    timestamps = np.arange(count, dtype=np.int64) * 60000
+    return timestamps, close
+
+
+def test_resolve_orders_dependencies_first():
+    order = indicator_registry.resolve(['macd_signal'])
+    assert order.index('ema_12') < order.index('macd') < order.index('macd_signal')
+    assert 'rsi' not in order
+
+
+def test_unknown_indicator_rejected():
+    with pytest.raises(KeyError):
+        indicator_registry.resolve(['nope'])
+
+
+def test_registry_matches_kernels():
+    _, close = window()
+    values = indicator_registry.compute(['rsi', 'macd_signal', 'bb_upper'], close)
+    expected = indicators.compute_indicators(close)
+    for name in values:
+        np.testing.assert_allclose(values[name], expected[name], equal_nan=True)
+
+
+def test_memo_reuses_unchanged_window():
+    memo = IndicatorMemo(indicator_registry, maxsize=2)
+    timestamps, close = window()
+    first = memo.compute('BTC/USDT', '15m', ['rsi'], timestamps, close)
+    second = memo.compute('BTC/USDT', '15m', ['rsi'], timestamps, close.copy())
+    assert second['rsi'] is first['rsi']
+    assert memo.get_stats()['hits'] == 1
+
+    # 未收盘K线更新后内容改变，得到新窗口
+    updated = close.copy()
+    updated[-1] *= 1.01
+    third = memo.compute('BTC/USDT', '15m', ['rsi'], timestamps, updated)
+    assert third['rsi'] is not first['rsi']
+    assert memo.get_stats()['misses'] == 2
+
+
+def test_memo_evicts_least_recently_used():
+    memo = IndicatorMemo(indicator_registry, maxsize=1)
+    timestamps, close = window()
+    memo.compute('BTC/USDT', '15m', ['sma_5'], timestamps, close)
+    memo.compute('ETH/USDT', '15m', ['sma_5'], timestamps, close)
+    stats = memo.get_stats()
+    assert stats['size'] == 1
+    assert stats['evictions'] == 1
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""IntelligentDataSource 对冲请求和批量行情测试（使用可控延迟的假交易所）"""
+
+import time
+
+import ccxt
+import pytest
+
+from source_health import CircuitBreaker
+
+from intelligent_data_source import IntelligentDataSource
+
+PERIOD = 15 * 60 * 1000
+
+
+class FakeExchange:
+    """按固定延迟返回K线的假交易所"""
+
+    def __init__(self, exchange_id, latency=0.0, error=None, symbol_errors=None):
+        self.id = exchange_id
+        self.latency = latency
+        self.error = error
+        self.symbol_errors = symbol_errors or {}
+        self.has = {'fetchTickers': False}
+        self.calls = 0
+
+    def parse_timeframe(self, timeframe):
+        return PERIOD // 1000
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.error:
+            raise self.error
+        if symbol in self.symbol_errors:
+            raise self.symbol_errors[symbol]
+        return [[i * PERIOD, 100.0, 101.0, 99.0, 100.0, 1.0] for i in range(limit)]
+
+
+class FakePool:
+    """替代全局 exchange_pool，按 exchange_id 返回假交易所"""
+
+    def __init__(self, exchanges):
+        self.exchanges = exchanges
+
+    def get(self, exchange_id, config):
+        return self.exchanges[exchange_id]
+
+    def throttle(self, exchange_id):
+        pass
+
+    def record_success(self, exchange_id):
+        pass
+
+    def record_failure(self, exchange_id):
+        pass
+
+
+@pytest.fixture
+def data_source(tmp_path, monkeypatch):
+    monkeypatch.setenv('CANDLE_STORE_PATH', str(tmp_path))
+    source = IntelligentDataSource()
+    # 只有 OKX（最快）和 Binance 探测成功
+    source.health_monitor.record(source.data_sources[0], True, 0.1)
+    source.health_monitor.record(source.data_sources[1], True, 0.2)
+    source.current_source = source.data_sources[0]
+    source.last_check_time = time.time()
+    yield source
+    for executor in (source._probe_executor, source._fetch_executor,
+                     source._symbol_executor, source.health_monitor._executor):
+        executor.shutdown(wait=False)
+
+
+def use_exchanges(source, **exchanges):
+    source.exchange_pool = FakePool({exchange_id: FakeExchange(exchange_id, **options)
+                                     for exchange_id, options in exchanges.items()})
+    return source.exchange_pool.exchanges
+
+
+def test_hedge_delay_uses_default_until_min_samples(data_source):
+    primary = data_source.data_sources[0]
+    samples = data_source.fetch_latencies['okx']
+    samples.extend([0.05] * (data_source.hedge_min_samples - 1))
+    assert data_source._get_hedge_delay(primary) == data_source.hedge_default_delay
+
+    samples.clear()
+    samples.extend([0.05 * i for i in range(1, 21)])
+    assert data_source._get_hedge_delay(primary) == pytest.approx(1.0)
+
+
+def test_hedge_delay_has_floor(data_source):
+    data_source.fetch_latencies['okx'].extend([0.01] * 20)
+    assert data_source._get_hedge_delay(data_source.data_sources[0]) == data_source.hedge_min_delay
+
+
+def test_fast_primary_is_not_hedged(data_source):
+    exchanges = use_exchanges(data_source, okx={'latency': 0.0}, binance={'latency': 0.0})
+    source, ohlcv = data_source.fetch_ohlcv_hedged('BTC/USDT', '15m', 5)
+    assert source['exchange_id'] == 'okx'
+    assert len(ohlcv) == 5
+    assert exchanges['binance'].calls == 0
+
+
+def test_slow_primary_loses_to_secondary(data_source):
+    exchanges = use_exchanges(data_source, okx={'latency': 1.0}, binance={'latency': 0.0})
+    data_source.fetch_latencies['okx'].extend([0.05] * 20)
+
+    start = time.time()
+    source, ohlcv = data_source.fetch_ohlcv_hedged('BTC/USDT', '15m', 5)
+    elapsed = time.time() - start
+
+    assert source['exchange_id'] == 'binance'
+    assert exchanges['binance'].calls == 1
+    assert data_source.hedge_min_delay <= elapsed < 0.8
+
+
+def test_failed_secondary_falls_back_to_primary(data_source):
+    use_exchanges(data_source, okx={'latency': 0.4}, binance={'error': RuntimeError('down')})
+    data_source.fetch_latencies['okx'].extend([0.05] * 20)
+
+    source, _ = data_source.fetch_ohlcv_hedged('BTC/USDT', '15m', 5)
+    assert source['exchange_id'] == 'okx'
+
+
+def test_bad_symbol_leaves_breaker_closed(data_source):
+    bad = {f'BAD{i}/USDT': ccxt.BadSymbol(f'BAD{i}/USDT 不存在') for i in range(5)}
+    use_exchanges(data_source, okx={'symbol_errors': bad})
+
+    results = data_source.get_market_data(['BTCUSDT'] + list(bad), limit=5)
+    assert list(results) == ['BTC/USDT']
+    assert data_source.health_monitor.breakers['okx'].state == CircuitBreaker.CLOSED
+    assert data_source.data_sources[0]['available']
+
+
+def test_network_errors_open_breaker(data_source):
+    down = {f'ALT{i}/USDT': ccxt.NetworkError('连接被重置') for i in range(3)}
+    use_exchanges(data_source, okx={'symbol_errors': down})
+
+    data_source.get_market_data(list(down), limit=5)
+    assert data_source.health_monitor.breakers['okx'].state == CircuitBreaker.OPEN
+    assert not data_source.data_sources[0]['available']
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""llm_analyzer 增量JSON解析、截止时间兜底、批量分析与集成投票测试"""
+
+import json
+import threading
+
+import pytest
+
+from llm_analyzer import (DeadlineRunner, IncrementalJSONParser, LLMDeadlineExceeded, build_batch_messages,
+                          combine_votes, estimate_tokens, parse_batch_signals, parse_ensemble_members,
+                          quorum_signal, rule_based_signal, split_batches, timed_call)
+
+REPLY = {
+    "signal": "BUY",
+    "confidence": "HIGH",
+    "reason": "突破 \"关键\" 阻力位, 量能放大 {确认}",
+    "stop_loss": 98500.5,
+    "take_profit": 104000,
+    "meta": {"tags": ["a", "b"], "ok": True},
+}
+
+
+def feed_all(parser, text, size):
+    completed = []
+    for start in range(0, len(text), size):
+        completed.extend(parser.feed(text[start:start + size]))
+    return completed
+
+
+@pytest.mark.parametrize('size', [1, 3, 7, 1000])
+def test_fields_match_json_loads_for_any_chunking(size):
+    text = json.dumps(REPLY, ensure_ascii=False)
+    parser = IncrementalJSONParser()
+    completed = feed_all(parser, text, size)
+    assert parser.complete
+    assert parser.fields == REPLY
+    assert completed == list(REPLY)
+
+
+def test_string_field_completes_at_closing_quote():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"signal": "SE') == []
+    assert parser.feed('LL", "confidence"') == ['signal']
+    assert parser.fields == {'signal': 'SELL'}
+    assert not parser.complete
+
+
+def test_number_field_completes_at_delimiter():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"stop_loss": 98000') == []
+    assert parser.feed('.5}') == ['stop_loss']
+    assert parser.fields['stop_loss'] == 98000.5
+    assert parser.complete
+
+
+def test_prefix_before_brace_ignored():
+    parser = IncrementalJSONParser()
+    feed_all(parser, '```json\n{"signal": "HOLD", "confidence": "LOW"}\n```', 5)
+    assert parser.fields == {'signal': 'HOLD', 'confidence': 'LOW'}
+    assert parser.complete
+
+
+def test_text_after_object_ignored():
+    parser = IncrementalJSONParser()
+    parser.feed('{"signal": "HOLD"} {"signal": "BUY"}')
+    assert parser.fields == {'signal': 'HOLD'}
+
+
+def vote(signal, confidence='MEDIUM', stop_loss=95.0, take_profit=105.0, member='m'):
+    return {'signal': signal, 'confidence': confidence, 'reason': f"{signal} 理由",
+            'stop_loss': stop_loss, 'take_profit': take_profit, 'member': member}
+
+
+def test_quorum_requires_agreeing_members_and_lead():
+    assert quorum_signal([vote('BUY')], 2) is None
+    assert quorum_signal([vote('BUY'), vote('BUY', 'LOW')], 2) == 'BUY'
+    # 两票同意但加权票数不领先
+    votes = [vote('BUY', 'LOW'), vote('BUY', 'LOW'), vote('SELL', 'HIGH')]
+    assert quorum_signal(votes, 2) is None
+    assert quorum_signal(votes + [vote('BUY', 'LOW')], 2) is None
+    assert quorum_signal(votes + [vote('BUY', 'MEDIUM')], 2) == 'BUY'
+
+
+def test_unanimous_vote_keeps_confidence():
+    votes = [vote('SELL', 'HIGH', 110.0, 90.0), vote('SELL', 'HIGH', 112.0, 88.0), vote('SELL', 'HIGH', 111.0, 89.0)]
+    result = combine_votes(votes, 3)
+    assert result['signal'] == 'SELL'
+    assert result['confidence'] == 'HIGH'
+    assert result['stop_loss'] == 111.0
+    assert result['take_profit'] == 89.0
+    assert result['votes'] == {'SELL': 9.0}
+
+
+def test_split_vote_downgrades_confidence():
+    result = combine_votes([vote('BUY', 'HIGH'), vote('BUY', 'HIGH'), vote('HOLD', 'LOW')], 3)
+    assert result['signal'] == 'BUY'
+    assert result['confidence'] == 'MEDIUM'
+
+
+def test_weighted_tie_falls_back_to_hold():
+    result = combine_votes([vote('BUY', 'HIGH'), vote('SELL', 'HIGH')], 2)
+    assert result['signal'] == 'HOLD'
+    assert result['confidence'] == 'LOW'
+    assert '成员意见分歧' in result['reason']
+
+    result = combine_votes([vote('BUY', 'MEDIUM'), vote('SELL', 'MEDIUM'), vote('HOLD', 'MEDIUM')], 3)
+    assert result['signal'] == 'HOLD'
+    assert result['confidence'] == 'LOW'
+
+
+def test_no_votes():
+    assert combine_votes([], 3) is None
+
+
+def test_parse_ensemble_members():
+    members = parse_ensemble_members('deepseek-chat@0.1, @0.7 ,deepseek-reasoner@0@http://127.0.0.1:8900')
+    assert members == [
+        {'model': 'deepseek-chat', 'temperature': 0.1, 'base_url': None},
+        {'model': 'deepseek-chat', 'temperature': 0.7, 'base_url': None},
+        {'model': 'deepseek-reasoner', 'temperature': 0.0, 'base_url': 'http://127.0.0.1:8900'},
+    ]
+
+
+def snapshot(rsi, macd, macd_signal, price=100000.0):
+    return {'price': price, 'timestamp': '2024-01-01 00:00:00',
+            'technical_data': {'rsi': rsi, 'macd': macd, 'macd_signal': macd_signal}}
+
+
+@pytest.fixture
+def runner():
+    runner = DeadlineRunner(max_workers=2)
+    yield runner
+    runner.shutdown()
+
+
+def test_fast_call_returns_before_deadline(runner):
+    late = []
+    assert runner.run(lambda x: x * 2, 1.0, 21, on_late=lambda *a: late.append(a)) == 42
+    assert late == []
+    assert runner.stats == {'calls': 1, 'timeouts': 0, 'late_results': 0}
+
+
+def test_slow_call_falls_back_and_reports_late_result(runner):
+    release = threading.Event()
+    arrived = threading.Event()
+    late = []
+
+    def slow_llm(model):
+        release.wait(5)
+        return f"{model} 回复"
+
+    def on_late(result, latency):
+        late.append((result, latency))
+        arrived.set()
+
+    price_data = snapshot(rsi=25.0, macd=12.0, macd_signal=8.0)
+    try:
+        runner.run(timed_call(slow_llm), 0.05, model='deepseek-chat', on_late=on_late)
+        signal_data = None
+    except LLMDeadlineExceeded:
+        signal_data = rule_based_signal(price_data, 'AI超时，规则信号')
+
+    assert signal_data['signal'] == 'BUY'
+    assert signal_data['confidence'] == 'LOW'
+    assert signal_data['reason'].startswith('AI超时，规则信号')
+    assert late == []
+
+    release.set()
+    assert arrived.wait(2)
+    (result, call_latency), latency = late[0]
+    assert result == "deepseek-chat 回复"
+    assert latency >= call_latency > 0.05
+    assert runner.stats == {'calls': 1, 'timeouts': 1, 'late_results': 1}
+
+
+def test_late_failure_skips_callback(runner):
+    release = threading.Event()
+    late = []
+
+    def failing_llm():
+        release.wait(5)
+        raise RuntimeError("连接中断")
+
+    with pytest.raises(LLMDeadlineExceeded):
+        runner.run(failing_llm, 0.05, on_late=lambda *a: late.append(a))
+    release.set()
+    runner._executor.shutdown(wait=True)
+    assert late == []
+    assert runner.stats['late_results'] == 0
+
+
+@pytest.mark.parametrize('rsi, macd, macd_signal, expected', [
+    (25.0, 12.0, 8.0, 'BUY'),
+    (75.0, 8.0, 12.0, 'SELL'),
+    (25.0, 8.0, 12.0, 'HOLD'),
+    (50.0, 12.0, 8.0, 'HOLD'),
+])
+def test_rule_based_signal(rsi, macd, macd_signal, expected):
+    signal_data = rule_based_signal(snapshot(rsi, macd, macd_signal))
+    assert signal_data['signal'] == expected
+    assert signal_data['confidence'] == 'LOW'
+    stop_below = signal_data['stop_loss'] < 100000.0 < signal_data['take_profit']
+    assert stop_below == (expected != 'SELL')
+
+
+def batch_reply(*symbols, **overrides):
+    return json.dumps([dict({'symbol': symbol, 'signal': 'BUY', 'confidence': 'MEDIUM', 'reason': '测试',
+                             'stop_loss': 90, 'take_profit': 110}, **overrides.get(symbol, {}))
+                       for symbol in symbols], ensure_ascii=False)
+
+
+def test_split_batches_respects_token_budget():
+    rows = [f"COIN{i:02d}/USDT,1.234,0.50,55.0,0.01,0.02" for i in range(20)]
+    base = sum(estimate_tokens(message['content']) for message in build_batch_messages([], 'm', 'LOW'))
+    row_cost = estimate_tokens(rows[0]) + 1 + 80
+    budget = base + 3 * row_cost
+
+    batches = split_batches(rows, budget, 'm', 'LOW')
+    assert [len(batch) for batch in batches] == [3] * 6 + [2]
+    assert [row for batch in batches for row in batch] == rows
+    for batch in batches:
+        prompt = sum(estimate_tokens(message['content']) for message in build_batch_messages(batch, 'm', 'LOW'))
+        assert prompt + 80 * len(batch) <= budget
+
+
+def test_split_batches_oversized_row_gets_own_batch():
+    rows = ['A,1', 'B' * 2000, 'C,1']
+    base = sum(estimate_tokens(message['content']) for message in build_batch_messages([], '', ''))
+    assert split_batches(rows, base + 200) == [['A,1'], ['B' * 2000], ['C,1']]
+    assert split_batches(rows, 10 ** 6) == [rows]
+
+
+def test_parse_batch_signals_drops_missing_and_extra_symbols():
+    text = "分析如下：\n" + batch_reply('btc/usdt', 'DOGE/USDT', 'ETH/USDT', 'BTC/USDT',
+                                  **{'BTC/USDT': {'signal': 'SELL'}})
+    parsed = parse_batch_signals(text, ['BTC/USDT', 'ETH/USDT', 'SOL/USDT'])
+
+    assert set(parsed) == {'BTC/USDT', 'ETH/USDT'}
+    # 大小写不敏感匹配，重复出现时保留第一个
+    assert parsed['BTC/USDT']['signal'] == 'BUY'
+
+
+def test_parse_batch_signals_skips_invalid_items():
+    text = batch_reply('BTC/USDT', 'ETH/USDT', **{'ETH/USDT': {'confidence': 'MAYBE'}})
+    assert set(parse_batch_signals(text, ['BTC/USDT', 'ETH/USDT'])) == {'BTC/USDT'}
+
+
+def test_parse_batch_signals_accepts_wrapped_object():
+    text = '{"signals": ' + batch_reply('BTC/USDT') + '}'
+    assert set(parse_batch_signals(text, ['BTC/USDT'])) == {'BTC/USDT'}
+    assert parse_batch_signals('抱歉，无法分析', ['BTC/USDT']) == {}
+    assert parse_batch_signals('', ['BTC/USDT']) == {}
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""紧凑提示词编码与token预算测试"""
+
+from prompt_builder import COMPACT_DROP_ORDER, build_compact_messages, estimate_tokens
+
+
+def price_data():
+    closes = [60850.0, 60520.0, 60310.0, 60150.0, 60000.0]
+    return {
+        'price': 60000.0,
+        'price_change': -0.25,
+        'technical_data': {
+            'rsi': 27.5, 'macd': -35.2, 'macd_signal': -48.9,
+            'sma_5': 60310.0, 'sma_20': 61020.0, 'sma_50': 61480.0,
+            'bb_upper': 62100.0, 'bb_lower': 59700.0,
+        },
+        'kline_data': [{'open': close + 30, 'high': close + 80, 'low': close - 60, 'close': close,
+                        'volume': 600.0 + i} for i, close in enumerate(closes)],
+    }
+
+
+def prompt_tokens(messages):
+    return sum(estimate_tokens(message['content']) for message in messages)
+
+
+def header(messages):
+    return messages[1]['content'].splitlines()[0].split(',')
+
+
+def test_no_budget_keeps_everything():
+    messages, dropped = build_compact_messages(price_data(), '模拟交易', 'MEDIUM')
+    assert dropped == []
+    assert header(messages) == ['price', 'chg', 'rsi', 'macd', 'macd_sig', 'sma5', 'sma20', 'sma50', 'bb_up', 'bb_lo']
+    lines = messages[1]['content'].splitlines()
+    kline_start = lines.index('kline:o,h,l,c,v') + 1
+    assert len(lines[kline_start:-2]) == 5
+
+
+def test_budget_at_full_size_drops_nothing():
+    full, _ = build_compact_messages(price_data(), '模拟交易', 'MEDIUM')
+    messages, dropped = build_compact_messages(price_data(), '模拟交易', 'MEDIUM', prompt_tokens(full))
+    assert dropped == []
+    assert messages == full
+
+
+def test_oldest_klines_dropped_first():
+    full, _ = build_compact_messages(price_data(), '模拟交易', 'MEDIUM')
+    messages, dropped = build_compact_messages(price_data(), '模拟交易', 'MEDIUM', prompt_tokens(full) - 1)
+    assert dropped == ['kline×1']
+    content = messages[1]['content']
+    assert '60880' not in content          # 最旧一根（开盘 60880）被丢弃
+    assert '60030,60080,59940,60000' in content  # 当前K线保留
+    assert prompt_tokens(messages) <= prompt_tokens(full) - 1
+
+
+def test_drop_order_after_klines():
+    no_kline = price_data()
+    no_kline['kline_data'] = []
+    base, _ = build_compact_messages(no_kline, '模拟交易', 'MEDIUM')
+    budget = prompt_tokens(base) - 1
+
+    messages, dropped = build_compact_messages(price_data(), '模拟交易', 'MEDIUM', budget)
+    assert dropped[0] == 'kline×5'
+    assert len(dropped) >= 2
+    assert dropped[1:] == list(COMPACT_DROP_ORDER[1:len(dropped)])
+    assert 'kline:' not in messages[1]['content']
+    assert prompt_tokens(messages) <= budget
+
+
+def test_required_columns_survive_tiny_budget():
+    messages, dropped = build_compact_messages(price_data(), '模拟交易', 'MEDIUM', 1)
+    assert dropped == ['kline×5', 'bb_lo', 'bb_up', 'sma50', 'sma20', 'sma5']
+    assert header(messages) == ['price', 'chg', 'rsi', 'macd', 'macd_sig']
+    lines = messages[1]['content'].splitlines()
+    assert lines[-2:] == ['mode=模拟交易', 'min_confidence=MEDIUM']
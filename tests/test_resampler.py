@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""CandleResampler 多周期重采样测试"""
+
+import pytest
+
+from resampler import TIMEFRAME_MS, CandleResampler
+
+MINUTE = TIMEFRAME_MS['1m']
+START = 1_700_000_100_000 - 1_700_000_100_000 % TIMEFRAME_MS['1d']
+
+
+def minute_candles(count, start=START):
+    return [[start + i * MINUTE, 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 1.0] for i in range(count)]
+
+
+def test_aggregates_closed_buckets():
+    resampler = CandleResampler(timeframes=('5m',))
+    resampler.seed(minute_candles(11))
+
+    candles = resampler.get_candles('5m', include_partial=False)
+    assert [c[0] for c in candles] == [START, START + 5 * MINUTE]
+    first = candles[0]
+    assert first[1] == 100.0       # 第一根的开盘
+    assert first[2] == 105.0       # 最高价
+    assert first[3] == 99.0        # 最低价
+    assert first[4] == 104.5       # 最后一根的收盘
+    assert first[5] == 5.0         # 成交量求和
+
+
+def test_forming_candle_replaced_in_place():
+    resampler = CandleResampler(timeframes=('5m',))
+    resampler.seed(minute_candles(3))
+    resampler.update([START + 2 * MINUTE, 102.0, 150.0, 90.0, 120.0, 4.0])
+
+    current = resampler.get_candles('5m')[-1]
+    assert current[2] == 150.0
+    assert current[3] == 90.0
+    assert current[4] == 120.0
+    assert current[5] == 6.0
+
+    # 早于未收盘K线的推送被忽略
+    resampler.update([START + MINUTE, 1.0, 1.0, 1.0, 1.0, 1.0])
+    assert resampler.get_candles('5m')[-1] == current
+
+
+def test_is_partial_while_bucket_incomplete():
+    resampler = CandleResampler(timeframes=('5m',))
+    resampler.seed(minute_candles(3))
+    assert resampler.is_partial('5m', now_ms=START + 10 * MINUTE)
+
+
+def test_is_partial_tracks_forming_close_time():
+    resampler = CandleResampler(timeframes=('5m',))
+    resampler.seed(minute_candles(5))
+    last_open = START + 4 * MINUTE
+
+    # 最后一根1分钟K线未到收盘时间
+    assert resampler.is_partial('5m', now_ms=last_open + MINUTE // 2)
+    # 最后一根1分钟K线已收盘，周期内5根齐全
+    assert not resampler.is_partial('5m', now_ms=last_open + MINUTE)
+    assert len(resampler.get_candles('5m', include_partial=False)) == 1
+
+
+def test_new_bucket_forming_is_partial():
+    resampler = CandleResampler(timeframes=('5m',))
+    resampler.seed(minute_candles(6))
+    candles = resampler.get_candles('5m')
+    assert [c[0] for c in candles] == [START, START + 5 * MINUTE]
+    assert resampler.is_partial('5m', now_ms=START + 60 * MINUTE)
+    assert len(resampler.get_candles('5m', include_partial=False)) == 1
+
+
+def test_unknown_timeframe_rejected():
+    resampler = CandleResampler(timeframes=('5m',))
+    with pytest.raises(ValueError):
+        resampler.get_candles('1h')
+    with pytest.raises(ValueError):
+        resampler.get_candles('1m')
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""source_health 熔断器与健康评分测试"""
+
+import source_health
+from source_health import CircuitBreaker, SourceHealthMonitor
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_failures == 1
+
+
+def test_half_open_after_timeout(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(source_health.time, 'time', lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    assert not breaker.allow_request()
+
+    now[0] += 60
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # 半开状态下一次成功即恢复
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_failure_reopens(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(source_health.time, 'time', lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    for _ in range(3):
+        breaker.record_failure()
+    now[0] += 10
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened_at == now[0]
+    assert not breaker.allow_request()
+
+
+def test_monitor_record_updates_source():
+    sources = [{'name': 'A', 'exchange_id': 'a', 'priority': 1},
+               {'name': 'B', 'exchange_id': 'b', 'priority': 2}]
+    monitor = SourceHealthMonitor(sources, probe=lambda source: 0.0, alpha=0.5, failure_threshold=1)
+    try:
+        monitor.record(sources[0], True, 0.2)
+        monitor.record(sources[0], True, 0.4)
+        monitor.record(sources[1], True, 0.1)
+        assert abs(sources[0]['ewma_latency'] - 0.3) < 1e-9
+        assert [source['name'] for source in monitor.get_ranking()] == ['B', 'A']
+
+        monitor.record(sources[1], False)
+        assert sources[1]['circuit_state'] == CircuitBreaker.OPEN
+        assert not sources[1]['available']
+        assert [source['name'] for source in monitor.get_ranking()] == ['A']
+    finally:
+        monitor._executor.shutdown(wait=False)
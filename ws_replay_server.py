@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地WebSocket行情回放服务器
+回放 market_stream.record_frames 录制的帧，用于离线测试行情订阅
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.server import serve
+
+# 随仓库提供的示例帧（Binance U本位合约 btcusdt@kline_15m / btcusdt@ticker 格式）
+SAMPLE_FRAMES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  'samples', 'ws_frames_btcusdt_15m.jsonl')
+
+
+def frame_stream_name(frame: Dict) -> Optional[str]:
+    """根据帧内容推断其所属的订阅频道名"""
+    data = frame.get('data', frame)
+    event = data.get('e')
+    symbol = str(data.get('s', '')).lower()
+    if event == 'kline':
+        return f"{symbol}@kline_{data['k']['i']}"
+    if event == '24hrTicker':
+        return f"{symbol}@ticker"
+    return frame.get('stream')
+
+
+def load_frames(path: str) -> List[Dict]:
+    """读取录制文件，每行 {"delay": 秒, "frame": {...}}"""
+    frames = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                frames.append(json.loads(line))
+    return frames
+
+
+class ReplayServer:
+    """Binance兼容的行情回放服务器
+
+    客户端发送 SUBSCRIBE 后，按录制时的间隔（除以 speed）推送其订阅
+    频道的帧。disconnect_after 可让服务器在推送若干帧后主动断开，
+    用于测试客户端的重连和重新订阅。
+    """
+
+    def __init__(self, frames: List[Dict], host: str = '127.0.0.1', port: int = 8765,
+                 speed: float = 1.0, loop: bool = False, disconnect_after: int = 0):
+        self.frames = frames
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.loop = loop
+        self.disconnect_after = disconnect_after
+        self.connection_count = 0
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def _handler(self, connection):
+        self.connection_count += 1
+        try:
+            self._replay(connection)
+        except ConnectionClosed:
+            pass
+
+    def _replay(self, connection):
+        subscriptions = set()
+        sent = 0
+
+        # 等待订阅请求
+        while not subscriptions:
+            request = json.loads(connection.recv())
+            if request.get('method') == 'SUBSCRIBE':
+                subscriptions.update(request.get('params', []))
+                connection.send(json.dumps({'result': None, 'id': request.get('id')}))
+
+        while True:
+            for item in self.frames:
+                frame = item.get('frame', item)
+                if frame_stream_name(frame) not in subscriptions:
+                    continue
+                delay = item.get('delay', 0) / self.speed if self.speed > 0 else 0
+                if delay > 0:
+                    time.sleep(delay)
+                connection.send(json.dumps(frame))
+                sent += 1
+                if self.disconnect_after and sent >= self.disconnect_after:
+                    connection.close()
+                    return
+            if not self.loop:
+                break
+
+    def start(self):
+        """在后台线程启动服务器"""
+        self._server = serve(self._handler, self.host, self.port)
+        self._thread = threading.Thread(target=self._server.serve_forever, name='ws-replay', daemon=True)
+        self._thread.start()
+        print(f"🎞️ 行情回放服务器已启动: {self.url} ({len(self.frames)} 帧)")
+
+    def stop(self):
+        """停止服务器"""
+        if self._server:
+            self._server.shutdown()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='本地WebSocket行情回放服务器')
+    parser.add_argument('frames', nargs='?', default=SAMPLE_FRAMES_PATH,
+                        help='record_frames 录制的帧文件（默认使用 samples/ 下的示例帧）')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--speed', type=float, default=1.0, help='回放倍速，0表示不等待')
+    parser.add_argument('--loop', action='store_true', help='循环回放')
+    parser.add_argument('--disconnect-after', type=int, default=0, help='推送N帧后主动断开')
+    args = parser.parse_args()
+
+    server = ReplayServer(load_frames(args.frames), args.host, args.port,
+                          args.speed, args.loop, args.disconnect_after)
+    server.start()
+    print("⏹️ 按 Ctrl+C 停止")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()